@@ -6,9 +6,11 @@
 """
 
 import asyncio
+import logging
 import os
 import sys
 import uuid
+from dataclasses import asdict
 from typing import Dict, List, Any
 
 # 添加项目根目录到 Python 路径
@@ -18,6 +20,9 @@ from src.proposer.graph import create_graph
 from src.proposer.graph import ProposalInput
 
 
+logging.basicConfig(level=logging.INFO)
+
+
 async def main():
     """运行提案工作流示例"""
     
@@ -31,6 +36,7 @@ async def main():
             "proposer_model": "qwen-max",  # 提案生成器使用的模型
             "critic_model": "qwen-plus",   # 评估器使用的模型
             "optimizer_model": "qwen-max", # 优化器使用的模型
+            "stream_optimizer": True,      # 流式输出优化后的提案
             "max_iterations": 2,           # 最大迭代次数
             "excellent_score": 8.0         # 优秀评分标准
         }
@@ -56,12 +62,18 @@ async def main():
     # 创建初始状态
     initial_state = ProposalInput(
         input=input_text,
-        PLACEHOLDER_FOR_SECRET_ID,
+        constraints=constraints,
         goals=goals
     )
     
-    # 运行工作流
-    result = await workflow.ainvoke(initial_state.__dict__, config=config)
+    # 运行工作流，实时打印提案生成/优化过程中的输出片段
+    async for message, metadata in workflow.astream(
+        asdict(initial_state), config=config, stream_mode="messages"
+    ):
+        if metadata.get("langgraph_node") == "propose" and message.content:
+            print(message.content, end="", flush=True)
+    
+    result = (await workflow.aget_state(config)).values
     
     # 打印结果
     print("\n=== 提案工作流执行结果 ===")
@@ -81,7 +93,7 @@ async def main():
     print("\n各维度评估:")
     for focus, evaluation in final_evaluation['dimensions'].items():
         print(f"- {focus}: {evaluation['score']:.2f}")
-        print(f"  评论: {evaluation['comments']}")
+        print(f"  建议: {'; '.join(evaluation['suggestions'])}")
     
     # 打印改进建议
     print("\n改进建议:")
@@ -1,12 +1,18 @@
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Mapping, Optional, Sequence, Union
 from langsmith import traceable
-from .prompts import CRITIC_PROMPTS, CRITIC_USER_PROMPT_TEMPLATE
-from proposer.utils import init_custom_chat_model
+from .prompts import (
+    Focus,
+    CRITIC_PROMPTS,
+    CRITIC_SYSTEM_PROMPT,
+    CRITIC_USER_PROMPT_TEMPLATE,
+    MULTI_CRITIC_SYSTEM_PROMPT
+)
+from proposer.utils import init_structured_model, ainvoke_with_retry, format_goals, format_constraints
+from proposer.cache import SemanticCache, make_cache_key
+import asyncio
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,21 @@ class EvaluationResponse(BaseModel):
     evaluations: Dict[str, GoalEvaluation] = Field(description="Evaluation results for each goal")
     overall_score: float = Field(description="Overall score between 1-10")
 
+class MultiFocusEvaluation(BaseModel):
+    """多维度合并评估响应"""
+    dimensions: Dict[str, GoalEvaluation] = Field(description="Evaluation result for each focus, keyed by focus name")
+    overall_score: float = Field(description="Overall score between 1-10")
+    overall_feedback: str = Field(description="Overall feedback on the proposal")
+
+# 各评估重点默认使用的模型：结构性检查使用轻量模型，深度推理使用较大模型
+FOCUS_MODEL_MAP: Dict[Focus, str] = {
+    Focus.DEFAULT: "qwen-turbo",
+    Focus.COMPLETENESS: "qwen-turbo",
+    Focus.LOGIC: "qwen-plus",
+    Focus.INNOVATION: "qwen-plus",
+    Focus.FEASIBILITY: "qwen-plus",
+}
+
 class CriticAgent:
     """评估代理
     
@@ -27,7 +48,17 @@ class CriticAgent:
     提供针对性的评估。
     """
     
-    def __init__(self, model: str = "qwen-plus", api_version: str = "v1", focus: Optional[str] = None):
+    def __init__(
+        self,
+        model: str = "qwen-plus",
+        api_version: str = "v1",
+        focus: Optional[Union[str, Focus]] = None,
+        cache: Optional[SemanticCache] = None,
+        route_by_focus: bool = False,
+        focus_models: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+        max_retries: int = 0
+    ):
         """初始化评估代理
         
         Args:
@@ -35,24 +66,64 @@ class CriticAgent:
             api_version: API版本
             focus: 评估重点，可选值：logic, completeness, innovation, feasibility
                   如果为None，则使用默认的通用评估模板
+            cache: 可选的评估结果缓存，命中时跳过模型调用
+            route_by_focus: 是否按评估重点选择模型，为False时所有评估重点都使用 model
+            focus_models: 按评估重点选择模型时覆盖 FOCUS_MODEL_MAP 的映射，键为评估重点名称
+            timeout: 单次模型调用的超时秒数，为None时不限制
+            max_retries: 模型调用超时后的最大重试次数
         """
-        self.model = init_custom_chat_model(model).with_structured_output(EvaluationResponse)
-        self.focus = focus or "default"
+        try:
+            self.focus = Focus(focus or Focus.DEFAULT)
+        except ValueError:
+            raise ValueError(f"Unsupported focus: {focus}. Must be one of: {[f.value for f in Focus]}")
+        self.cache = cache
+        self.timeout = timeout
+        self.max_retries = max_retries
         
-        if self.focus not in CRITIC_PROMPTS:
-            raise ValueError(f"Unsupported focus: {focus}. Must be one of: {list(CRITIC_PROMPTS.keys())}")
+        if route_by_focus:
+            model = {**FOCUS_MODEL_MAP, **(focus_models or {})}.get(self.focus, model)
+        self.model_name = model
+        self.model = init_structured_model(model, EvaluationResponse)
         
-        # 定义系统提示模板
-        self.system_prompt_template = PromptTemplate(
-            template=CRITIC_PROMPTS[self.focus],
-            input_variables=[]
-        )
+        # 系统提示在各评估重点之间共用，评估重点对应的评估要求渲染到用户提示末尾
+        self.system_message = SystemMessage(content=CRITIC_SYSTEM_PROMPT)
+        self.rubric = CRITIC_PROMPTS[self.focus]
         
-        # 定义用户提示模板
-        self.user_prompt_template = PromptTemplate(
-            template=CRITIC_USER_PROMPT_TEMPLATE,
-            input_variables=["input", "proposal_content", "goals_text", "constraints_text", "focus"]
-        )
+        # 用户提示模板，调用时通过 str.format_map 渲染
+        self.user_prompt_template = CRITIC_USER_PROMPT_TEMPLATE
+
+    def _build_messages(
+        self,
+        input: str,
+        proposal_content: str,
+        goals: List[str],
+        constraints: List[Dict[str, str]],
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """构造一次评估请求的消息列表"""
+        # 模板中不变的问题、目标和约束在前，提案其次，评估要求在最后，
+        # 各轮、各评估重点的请求共享尽可能长的前缀，便于命中服务端的前缀缓存
+        user_msg = HumanMessage(content=self.user_prompt_template.format_map({
+            "input": input,
+            "proposal_content": proposal_content,
+            "goals_text": goals_text if goals_text is not None else format_goals(goals),
+            "constraints_text": constraints_text if constraints_text is not None else format_constraints(constraints),
+            "rubric": self.rubric,
+            "focus": self.focus
+        }))
+        return [self.system_message, user_msg]
+
+    @staticmethod
+    def _to_result(evaluation: EvaluationResponse) -> Dict[str, Any]:
+        """将模型输出转换为标准评估结果格式"""
+        return {
+            "score": evaluation.overall_score / 10.0,  # 转换为0-1范围
+            "suggestions": [
+                f"{goal}: {eval_result.suggestions}"
+                for goal, eval_result in evaluation.evaluations.items()
+            ]
+        }
 
     @traceable(name="evaluate_proposal", run_type="chain")
     async def evaluate_proposal(
@@ -60,7 +131,9 @@ class CriticAgent:
         input: str,
         proposal_content: str,
         goals: List[str],
-        constraints: List[Dict[str, str]]
+        constraints: List[Dict[str, str]],
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
     ) -> Dict[str, Any]:
         """评估提案
         
@@ -69,37 +142,195 @@ class CriticAgent:
             proposal_content: 提案内容
             goals: 目标列表
             constraints: 约束条件列表
+            goals_text: 预先格式化的目标文本，多个评估代理共用时可避免重复格式化
+            constraints_text: 预先格式化的约束条件文本
             
         Returns:
             Dict[str, Any]: 评估结果，包含分数和改进建议
         """
         try:
-            # 准备系统消息
-            system_msg = SystemMessage(content=self.system_prompt_template.format())
-            
-            # 准备用户消息
-            user_msg = HumanMessage(content=self.user_prompt_template.format(
-                input=input,
-                proposal_content=proposal_content,
-                goals_text="\n".join(f"- {goal}" for goal in goals),
-                constraints_text="\n".join(f"- {c['type']}: {c['value']}" for c in constraints),
-                focus=self.focus
-            ))
+            # 同一评估重点、问题、目标和约束下，相同或高度相似的提案直接复用评估结果
+            cache_scope = make_cache_key(self.focus, input, goals, constraints)
+            if self.cache is not None:
+                cached = await self.cache.aget(cache_scope, proposal_content)
+                if cached is not None:
+                    return cached
             
             # 评估提案
-            evaluation = await self.model.ainvoke(
-                input=[system_msg, user_msg]
+            evaluation = await ainvoke_with_retry(
+                self.model,
+                self._build_messages(
+                    input, proposal_content, goals, constraints, goals_text, constraints_text
+                ),
+                self.timeout,
+                self.max_retries
             )
+            result = self._to_result(evaluation)
+            
+            if self.cache is not None:
+                await self.cache.aput(cache_scope, proposal_content, result)
+            
+            return result
+
+        except Exception as e:
+            logger.error("评估提案时出错: %s", e, exc_info=True)
+            raise
+
+    @traceable(name="evaluate_proposals_batch", run_type="chain")
+    async def evaluate_proposals_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: int = 8
+    ) -> List[Dict[str, Any]]:
+        """批量评估多个提案
+        
+        未命中缓存的提案并发调用模型，并发数受 max_concurrency 限制；
+        每次调用与 evaluate_proposal 一样经过调用隔板，并按 timeout 和 max_retries 超时重试。
+        
+        Args:
+            items: 待评估的提案列表，每项为 evaluate_proposal 的关键字参数
+                （input、proposal_content、goals、constraints，以及可选的 goals_text、constraints_text）
+            max_concurrency: 同时进行的模型调用数上限
+            
+        Returns:
+            List[Dict[str, Any]]: 与 items 顺序一致的评估结果
+        """
+        try:
+            results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+            scopes = [
+                make_cache_key(self.focus, item["input"], item["goals"], item["constraints"])
+                for item in items
+            ]
+            
+            # 先查缓存，只把未命中的提案交给模型
+            pending = []
+            for i, item in enumerate(items):
+                if self.cache is not None:
+                    results[i] = await self.cache.aget(scopes[i], item["proposal_content"])
+                if results[i] is None:
+                    pending.append(i)
+            
+            if pending:
+                semaphore = asyncio.Semaphore(max_concurrency)
+                
+                async def evaluate_one(item: Dict[str, Any]) -> EvaluationResponse:
+                    async with semaphore:
+                        return await ainvoke_with_retry(
+                            self.model,
+                            self._build_messages(**item),
+                            self.timeout,
+                            self.max_retries
+                        )
+                
+                evaluations = await asyncio.gather(*(evaluate_one(items[i]) for i in pending))
+                for i, evaluation in zip(pending, evaluations):
+                    results[i] = self._to_result(evaluation)
+                    if self.cache is not None:
+                        await self.cache.aput(scopes[i], items[i]["proposal_content"], results[i])
+            
+            return results
+
+        except Exception as e:
+            logger.error("批量评估提案时出错: %s", e, exc_info=True)
+            raise
+
+
+class MultiCriticAgent:
+    """多维度合并评估代理
+    
+    将多个评估重点的评估要求合并到一次模型调用中，问题、提案、目标和约束只发送一次，
+    一次请求即可得到所有维度的评估结果。
+    """
+    
+    def __init__(
+        self,
+        model: str = "qwen-plus",
+        api_version: str = "v1",
+        focuses: Sequence[Union[str, Focus]] = (
+            Focus.LOGIC, Focus.COMPLETENESS, Focus.INNOVATION, Focus.FEASIBILITY
+        ),
+        timeout: Optional[float] = None,
+        max_retries: int = 0
+    ):
+        """初始化多维度评估代理
+        
+        Args:
+            model: 使用的模型名称
+            api_version: API版本
+            focuses: 需要评估的维度列表，每个维度必须是 Focus 的取值
+            timeout: 单次模型调用的超时秒数，为None时不限制
+            max_retries: 模型调用超时后的最大重试次数
+        """
+        unsupported = [focus for focus in focuses if focus not in CRITIC_PROMPTS]
+        if unsupported:
+            raise ValueError(f"Unsupported focus: {unsupported}. Must be one of: {[f.value for f in Focus]}")
+        
+        self.focuses = [Focus(focus) for focus in focuses]
+        self.model = init_structured_model(model, MultiFocusEvaluation)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        
+        # 合并各维度的评估要求作为系统提示
+        self.system_message = SystemMessage(content=MULTI_CRITIC_SYSTEM_PROMPT.format_map({
+            "rubrics": "\n".join(f"[{focus}] {CRITIC_PROMPTS[focus].strip()}" for focus in self.focuses),
+            "focus_names": ", ".join(self.focuses)
+        }))
+        
+        # 用户提示模板与单维度评估共用
+        self.user_prompt_template = CRITIC_USER_PROMPT_TEMPLATE
+
+    @traceable(name="evaluate_proposal_multi", run_type="chain")
+    async def evaluate_proposal(
+        self,
+        input: str,
+        proposal_content: str,
+        goals: List[str],
+        constraints: List[Dict[str, str]],
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """一次性评估提案的所有维度
+        
+        Args:
+            input: 输入问题
+            proposal_content: 提案内容
+            goals: 目标列表
+            constraints: 约束条件列表
+            goals_text: 预先格式化的目标文本
+            constraints_text: 预先格式化的约束条件文本
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: 各维度的评估结果，格式与 CriticAgent.evaluate_proposal 一致
+            
+        Raises:
+            ValueError: 模型返回的结果缺少某些维度时抛出
+        """
+        try:
+            user_msg = HumanMessage(content=self.user_prompt_template.format_map({
+                "input": input,
+                "proposal_content": proposal_content,
+                "goals_text": goals_text if goals_text is not None else format_goals(goals),
+                "constraints_text": constraints_text if constraints_text is not None else format_constraints(constraints),
+                "rubric": "按系统提示中各维度的评估要求分别评估。\n",
+                "focus": "、".join(self.focuses)
+            }))
+            
+            evaluation = await ainvoke_with_retry(
+                self.model, [self.system_message, user_msg], self.timeout, self.max_retries
+            )
+            
+            missing = [focus for focus in self.focuses if focus not in evaluation.dimensions]
+            if missing:
+                raise ValueError(f"评估结果缺少维度: {missing}")
             
-            # 转换为标准输出格式
             return {
-                "score": evaluation.overall_score / 10.0,  # 转换为0-1范围
-                "suggestions": [
-                    f"{goal}: {eval_result.suggestions}"
-                    for goal, eval_result in evaluation.evaluations.items()
-                ]
+                focus: {
+                    "score": evaluation.dimensions[focus].score / 10.0,  # 转换为0-1范围
+                    "suggestions": [evaluation.dimensions[focus].suggestions]
+                }
+                for focus in self.focuses
             }
 
         except Exception as e:
-            logger.error(f"评估提案时出错: {e}")
+            logger.error("多维度评估提案时出错: %s", e, exc_info=True)
             raise
@@ -1,38 +1,65 @@
+from enum import StrEnum
 from typing import Dict
 
-CRITIC_PROMPTS = {
-    "default": """作为专业评估专家，您需要对提案进行全面评估。评分标准为1-10分。
+
+class Focus(StrEnum):
+    """评估重点"""
+    DEFAULT = "default"
+    LOGIC = "logic"
+    COMPLETENESS = "completeness"
+    INNOVATION = "innovation"
+    FEASIBILITY = "feasibility"
+
+
+CRITIC_PROMPTS: Dict[Focus, str] = {
+    Focus.DEFAULT: """作为专业评估专家，您需要对提案进行全面评估。评分标准为1-10分。
 请根据提案内容、目标和约束条件进行评估，给出具体分数和改进建议，只需要建议和改进，无需额外的评语。
 """,
-    "logic": """作为逻辑分析专家，您需要评估提案的逻辑性和结构性，包括论述的连贯性、因果关系和结构完整性。
+    Focus.LOGIC: """作为逻辑分析专家，您需要评估提案的逻辑性和结构性，包括论述的连贯性、因果关系和结构完整性。
 请根据提案内容给出评分和具体的改进建议，只需要建议和改进，无需额外的评语。
 """,
 
-    "completeness": """作为完整性评估专家，您需要评估提案的覆盖度和细节完整性，确保没有遗漏重要内容。
+    Focus.COMPLETENESS: """作为完整性评估专家，您需要评估提案的覆盖度和细节完整性，确保没有遗漏重要内容。
 请根据提案内容给出评分和具体的改进建议，只需要建议和改进，无需额外的评语。
 """,
 
-    "innovation": """作为创新评估专家，您需要评估提案的创新性和独特性，关注解决方案的新颖程度和实用价值。
+    Focus.INNOVATION: """作为创新评估专家，您需要评估提案的创新性和独特性，关注解决方案的新颖程度和实用价值。
 请根据提案内容给出评分和具体的改进建议，只需要建议和改进，无需额外的评语。
 """,
 
-    "feasibility": """作为可行性评估专家，您需要评估提案的实施可行性，包括技术可行性、资源需求和实施风险。
+    Focus.FEASIBILITY: """作为可行性评估专家，您需要评估提案的实施可行性，包括技术可行性、资源需求和实施风险。
 请根据提案内容给出评分和具体的改进建议，只需要建议和改进，无需额外的评语。
 """
 }
 
+# 各评估重点共用的系统提示，具体的评估要求在用户提示末尾
+CRITIC_SYSTEM_PROMPT = """作为专业评估专家，您需要按照给定的评估要求对提案进行评估。评分标准为1-10分。
+只需要给出具体分数、建议和改进，无需额外的评语。
+"""
+
 CRITIC_USER_PROMPT_TEMPLATE = """请评估以下提案：
 
 问题：{input}
 
-提案内容：
-{proposal_content}
-
 目标：
 {goals_text}
 
 约束条件：
 {constraints_text}
 
+提案内容：
+{proposal_content}
+
+评估要求：
+{rubric}
 请根据以上内容进行评估。特别关注提案的{focus}方面。
 """
+
+
+MULTI_CRITIC_SYSTEM_PROMPT = """作为专业评估专家团队，您需要同时从多个维度对提案进行评估。评分标准为1-10分。
+各维度的评估要求如下：
+
+{rubrics}
+
+请分别给出每个维度的评分和具体的改进建议，并以维度名称（{focus_names}）为键返回各维度的评估结果。
+"""
@@ -1,22 +1,23 @@
-from typing import Dict, List, Any, Optional, Union
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import PromptTemplate
-from pydantic import BaseModel, Field
-from langsmith import traceable
+from typing import AsyncIterator, Dict, List, Any, Optional, Union
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, Field, ValidationError
+import asyncio
+import hashlib
 import logging
-import json
 import numpy as np
-from collections import defaultdict
-from proposer.utils import init_custom_chat_model
+import orjson
+from proposer.utils import init_custom_chat_model, init_structured_model, ainvoke_with_retry, astream_with_limits
+from proposer.cache import ResponseCache, make_messages_key
 from .prompts import (
     OPTIMIZER_SYSTEM_PROMPT, 
     ANALYSIS_SYSTEM_PROMPT,
     OPTIMIZER_ANALYSIS_PROMPT,
-    OPTIMIZER_OPTIMIZATION_PROMPT
+    OPTIMIZER_OPTIMIZATION_PROMPT,
+    OPTIMIZER_FUSED_PROMPT,
+    REFERENCE_ITEM_TEMPLATE
 )
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AnalysisResult(BaseModel):
@@ -24,44 +25,236 @@ class AnalysisResult(BaseModel):
     key_issues: List[str] = Field(description="需要改进的关键问题")
     suggestions: Dict[str, List[str]] = Field(description="各维度的改进建议")
 
+    def to_markdown(self) -> str:
+        """渲染为优化提示中使用的 Markdown 文本"""
+        parts = ["## 关键问题", *(f"- {issue}" for issue in self.key_issues), "\n## 改进建议"]
+        for dimension, suggestions in self.suggestions.items():
+            parts.append(f"\n### {dimension}")
+            parts.extend(f"- {suggestion}" for suggestion in suggestions)
+        return "\n".join(parts)
+
+class OptimizationBundle(BaseModel):
+    """分析与优化的合并结果"""
+    analysis: AnalysisResult = Field(description="评估结果的分析")
+    optimized_proposal: str = Field(description="优化后的完整提案")
+
+# 维度平均得分（10分制）低于该值时视为需要改进的关键问题
+KEY_ISSUE_SCORE = 7.0
+
+# 每条参考资料保留的正文字符数
+REFERENCE_CONTENT_CHARS = 200
+
+# 参考资料部分的总字符预算，超出时丢弃排序靠后的参考资料
+REFERENCES_MAX_CHARS = 2000
+
+class _JsonObjectScanner:
+    """增量扫描流式文本，定位第一个顶层 JSON 对象的结束位置"""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> int:
+        """扫描新到达的文本片段
+        
+        Args:
+            text: 文本片段
+            
+        Returns:
+            顶层对象在该片段中闭合时返回闭合位置之后的下标，否则返回 -1
+        """
+        for i, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth:
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    return i + 1
+        return -1
+
 class OptimizerAgent:
     """提案优化器
     
-    基于评估历史和改进建议优化提案内容。使用两轮对话实现：
+    基于评估历史和改进建议优化提案内容。默认通过两轮对话完成：
     1. 第一轮：分析评估结果和历史记录，生成关键问题和建议
     2. 第二轮：基于分析结果优化提案
+    开启合并模式（fused=True）时通过一次结构化调用同时完成分析和优化，结构化输出失败时退回上述两轮对话。
     """
 
-    def __init__(self, model: str = "qwen-max", api_version: str = "v1"):
-        """初始化提案优化器"""
-        self.model = init_custom_chat_model(model)
+    def __init__(
+        self,
+        model: str = "qwen-max",
+        api_version: str = "v1",
+        fused: bool = False,
+        excellent_score: float = 8.5,
+        speculative: bool = False,
+        enable_cache: bool = False,
+        timeout: Optional[float] = None,
+        max_retries: int = 0,
+        max_tokens: Optional[int] = None,
+        analysis_max_tokens: Optional[int] = None
+    ):
+        """初始化提案优化器
         
-        # 定义系统提示模板
-        self.system_prompt = PromptTemplate(
-            template=OPTIMIZER_SYSTEM_PROMPT,
-            input_variables=[],
-        )
+        Args:
+            model: 模型名称
+            api_version: API版本
+            fused: 是否将分析和优化合并为一次模型调用
+            excellent_score: 优秀评分标准（10分制），所有维度均达到时不再调用模型优化
+            speculative: 两轮优化时，是否在分析的同时直接基于评估结果投机生成优化提案
+            enable_cache: 是否缓存模型响应，提示完全相同时直接复用上次的结果
+            timeout: 单次模型调用的超时秒数，为None时不限制
+            max_retries: 模型调用超时后的最大重试次数
+            max_tokens: 优化阶段单次生成的最大 token 数
+            analysis_max_tokens: 分析阶段单次生成的最大 token 数
+        """
+        self.model = init_custom_chat_model(model, max_tokens=max_tokens)
+        self.analysis_model = init_custom_chat_model(model, max_tokens=analysis_max_tokens)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self.analysis_max_tokens = analysis_max_tokens
+        self.fused = fused
+        self.excellent_score = excellent_score
+        self.speculative = speculative
+        self.cache = ResponseCache() if enable_cache else None
+        
+        # 参考资料的格式化结果，按内容缓存，并发的多次运行各自命中自己的参考资料
+        self._references_cache = ResponseCache(maxsize=32)
+        
+        # 系统提示不含变量，初始化时构造一次即可复用
+        self.system_message = SystemMessage(content=OPTIMIZER_SYSTEM_PROMPT)
 
-        # 定义分析系统提示模板
-        self.anal_system_prompt = PromptTemplate(
-            template=ANALYSIS_SYSTEM_PROMPT,
-            input_variables=[],
-        )
+        # 分析阶段的系统提示
+        self.analysis_system_message = SystemMessage(content=ANALYSIS_SYSTEM_PROMPT)
+
+        # 用户提示模板，调用时通过 str.format_map 渲染
+        self.analysis_prompt = OPTIMIZER_ANALYSIS_PROMPT
+        self.optimization_prompt = OPTIMIZER_OPTIMIZATION_PROMPT
+        self.fused_prompt = OPTIMIZER_FUSED_PROMPT
 
-        # 分析提示模板
-        self.analysis_prompt = PromptTemplate(
-            template=OPTIMIZER_ANALYSIS_PROMPT,
-            input_variables=["evaluation_results"]
+        # 创建结构化输出的分析模型
+        self.structured_analyzer = init_structured_model(
+            model, AnalysisResult, max_tokens=analysis_max_tokens
+        )
+        
+        # 结构化输出失败时使用的流式分析，JSON 对象闭合后即停止生成
+        self.streaming_analyzer = RunnableLambda(self._astream_json_object)
+        
+        # 创建结构化输出的合并优化模型
+        self.structured_optimizer = init_structured_model(
+            model, OptimizationBundle, max_tokens=max_tokens
         )
 
-        # 优化提示模板
-        self.optimization_prompt = PromptTemplate(
-            template=OPTIMIZER_OPTIMIZATION_PROMPT,
-            input_variables=["current_proposal", "analysis_result", "references"]
+    async def _ainvoke(
+        self,
+        runnable: Runnable,
+        messages: List[BaseMessage],
+        namespace: str,
+        max_tokens: Optional[int] = None
+    ) -> Any:
+        """调用模型，提示完全相同时复用缓存的响应
+        
+        Args:
+            runnable: 需要调用的模型
+            messages: 消息列表
+            namespace: 调用标识，区分向不同模型发送的相同消息
+            max_tokens: 本次调用的输出 token 上限，用于预留 TPM 额度，默认为 max_tokens
+            
+        Returns:
+            模型响应
+        """
+        max_tokens = max_tokens or self.max_tokens
+        if self.cache is None:
+            return await ainvoke_with_retry(
+                runnable, messages, self.timeout, self.max_retries, max_tokens=max_tokens
+            )
+        
+        key = make_messages_key(namespace, messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug("命中模型响应缓存: %s", namespace)
+            return cached
+        
+        result = await ainvoke_with_retry(
+            runnable, messages, self.timeout, self.max_retries, max_tokens=max_tokens
         )
+        self.cache.put(key, result)
+        return result
 
-        # 创建结构化输出的分析模型
-        self.structured_analyzer = self.model.with_structured_output(AnalysisResult)
+    async def _astream_json_object(self, messages: List[BaseMessage]) -> AIMessage:
+        """流式调用分析模型，第一个顶层 JSON 对象闭合后立即停止
+        
+        分析结果通常在 JSON 之后还会附带说明文字，提前结束可以省去这部分生成时间。
+        只通过 _ainvoke 调用，整个流式输出都在 ainvoke_with_retry 预留的额度和超时之内。
+        
+        Args:
+            messages: 消息列表
+            
+        Returns:
+            截止到 JSON 对象闭合处的模型输出；没有 JSON 对象时为完整输出
+        """
+        scanner = _JsonObjectScanner()
+        parts = []
+        stream = self.analysis_model.astream(messages)
+        try:
+            async for chunk in stream:
+                text = chunk.content
+                end = scanner.feed(text)
+                if end != -1:
+                    parts.append(text[:end])
+                    break
+                parts.append(text)
+        finally:
+            await stream.aclose()
+        
+        return AIMessage(content="".join(parts))
+
+    @staticmethod
+    def _analyze_evaluations(
+        evaluations: List[Dict[str, Any]],
+        issue_score: float = KEY_ISSUE_SCORE
+    ) -> Dict[str, Any]:
+        """统计各评估维度的平均得分
+        
+        Args:
+            evaluations: 评估结果列表，每项的 dimensions 为各维度的评估结果
+            issue_score: 平均得分低于该值的维度视为关键问题
+            
+        Returns:
+            包含 avg_scores（各维度10分制平均分）和 key_issues（需要改进的维度）的字典
+        """
+        focuses = sorted({
+            focus
+            for evaluation in evaluations
+            for focus in evaluation.get("dimensions", {})
+        })
+        if not focuses:
+            return {"avg_scores": {}, "key_issues": []}
+        
+        column = {focus: i for i, focus in enumerate(focuses)}
+        scores = np.full((len(evaluations), len(focuses)), np.nan)
+        for row, evaluation in enumerate(evaluations):
+            for focus, result in evaluation.get("dimensions", {}).items():
+                scores[row, column[focus]] = result["score"]
+        
+        # 评估器输出的分数为0-1范围，转换为10分制
+        avg_scores = np.nanmean(scores, axis=0) * 10.0
+        
+        return {
+            "avg_scores": {focus: float(score) for focus, score in zip(focuses, avg_scores)},
+            "key_issues": [focuses[i] for i in np.flatnonzero(avg_scores < issue_score)]
+        }
 
     def _format_evaluations(self, evaluations: List[Dict[str, Any]]) -> str:
         """格式化评估结果
@@ -75,9 +268,11 @@ class OptimizerAgent:
         if not evaluations:
             return "暂无评估结果"
         
-        # 只使用最新的评估结果
-        latest_eval = evaluations[-1]
-        return json.dumps(latest_eval, ensure_ascii=False, indent=2)
+        # 只使用最新的评估结果；顶层 suggestions 是各维度建议的汇总，与 dimensions 重复，不再发送
+        latest_eval = {
+            key: value for key, value in evaluations[-1].items() if key != "suggestions"
+        }
+        return orjson.dumps(latest_eval, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
 
     def _format_analysis_result(self, analysis: Union[AnalysisResult, str]) -> str:
         """格式化分析结果
@@ -88,24 +283,35 @@ class OptimizerAgent:
         Returns:
             格式化后的分析结果字符串
         """
-        if isinstance(analysis, str):
-            return analysis
-            
-        result = []
-        
-        # 关键问题
-        result.append("## 关键问题")
-        for issue in analysis.key_issues:
-            result.append(f"- {issue}")
-        
-        # 改进建议
-        result.append("\n## 改进建议")
-        for dimension, suggestions in analysis.suggestions.items():
-            result.append(f"\n### {dimension}")
-            for suggestion in suggestions:
-                result.append(f"- {suggestion}")
+        return analysis if isinstance(analysis, str) else analysis.to_markdown()
+
+    @staticmethod
+    def _compact_references(
+        references: List[Dict[str, Any]],
+        content_chars: int = REFERENCE_CONTENT_CHARS,
+        max_chars: int = REFERENCES_MAX_CHARS
+    ) -> List[Dict[str, str]]:
+        """压缩参考资料，只保留标题和正文摘要
         
-        return "\n".join(result)
+        Args:
+            references: 参考资料列表，按相关性排序
+            content_chars: 每条参考资料保留的正文字符数
+            max_chars: 所有参考资料的总字符预算
+            
+        Returns:
+            压缩后的参考资料列表，每项包含 title 和 content
+        """
+        compacted = []
+        total = 0
+        for ref in references:
+            metadata = ref.get("metadata") or {}
+            title = str(metadata.get("title") or metadata.get("source") or ref.get("type", ""))
+            content = str(ref.get("content", ""))[:content_chars]
+            total += len(title) + len(content)
+            if compacted and total > max_chars:
+                break
+            compacted.append({"title": title, "content": content})
+        return compacted
 
     def _format_references(self, references: Optional[List[Dict[str, Any]]]) -> str:
         """格式化参考资料
@@ -118,15 +324,46 @@ class OptimizerAgent:
         """
         if not references:
             return "暂无参考资料"
+        
+        # 迭代之间参考资料通常不变，内容相同时直接复用之前的格式化结果
+        cache_key = hashlib.blake2b(
+            orjson.dumps(references, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16
+        ).hexdigest()
+        cached = self._references_cache.get(cache_key)
+        if cached is not None:
+            return cached
             
-        result = []
-        for i, ref in enumerate(references, 1):
-            result.append(f"## 参考资料 {i}")
-            for key, value in ref.items():
-                result.append(f"- {key}: {value}")
-            result.append("")  # 空行分隔
+        formatted = "\n".join(
+            REFERENCE_ITEM_TEMPLATE.format(index=i, **ref)
+            for i, ref in enumerate(self._compact_references(references), 1)
+        )
+        self._references_cache.put(cache_key, formatted)
             
-        return "\n".join(result)
+        return formatted
+
+    def _is_already_excellent(self, evaluations: List[Dict[str, Any]]) -> bool:
+        """判断提案是否已经无需优化
+        
+        只看最新一轮评估：历史上的高分不能说明当前提案已经优秀，
+        否则仲裁判定需要继续优化的提案会被原样返回。
+        
+        Args:
+            evaluations: 评估结果列表
+            
+        Returns:
+            最新评估没有关键问题且所有维度评分都达到优秀标准时返回True
+        """
+        analysis = self._analyze_evaluations(evaluations[-1:])
+        avg_scores = analysis["avg_scores"]
+        if not avg_scores or analysis["key_issues"]:
+            return False
+        
+        if min(avg_scores.values()) >= self.excellent_score:
+            logger.info("提案各维度均已达到优秀标准，跳过优化: %s", avg_scores)
+            return True
+        
+        return False
 
     async def optimize_proposal(
         self,
@@ -145,38 +382,272 @@ class OptimizerAgent:
             优化后的提案
         """
         try:
-            # 第一轮：分析评估结果
-            analysis_messages = [
-                SystemMessage(content=self.anal_system_prompt.format()),
-                HumanMessage(content=self.analysis_prompt.format(
-                    evaluation_results=self._format_evaluations(evaluations)
-                ))
-            ]
-            
-            # 执行分析
-            try:
-                # 使用结构化输出直接获取AnalysisResult
-                analysis_result = await self.structured_analyzer.ainvoke(input=analysis_messages)
-            except Exception as e:
-                # 如果结构化输出失败，回退到普通输出
-                analysis_result = await self.model.ainvoke(input=analysis_messages)
-                analysis_result = analysis_result.content
-            
-            # 第二轮：根据分析结果优化提案
-            optimization_messages = [
-                SystemMessage(content=self.system_prompt.format()),
-                HumanMessage(content=self.optimization_prompt.format(
-                    current_proposal=current_proposal,
-                    analysis_result=self._format_analysis_result(analysis_result),
-                    references=self._format_references(references)
-                ))
-            ]
-            
-            # 执行优化
-            optimization_result = await self.model.ainvoke(input=optimization_messages)
+            if self._is_already_excellent(evaluations):
+                return current_proposal
             
-            return optimization_result.content
+            result = None
+            if self.fused:
+                try:
+                    result = await self._optimize_fused(current_proposal, evaluations, references)
+                except Exception as e:
+                    # 结构化输出失败时退回两轮对话
+                    logger.warning("合并优化失败，退回两轮优化: %s", e)
+            
+            if result is None:
+                result = await self._optimize_two_round(current_proposal, evaluations, references)
+            
+            return result
             
         except Exception as e:
-            logger.error(f"优化提案失败: {str(e)}")
+            logger.error("优化提案失败: %s", e, exc_info=True)
             raise
+
+    async def _optimize_fused(
+        self,
+        current_proposal: str,
+        evaluations: List[Dict[str, Any]],
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """通过一次结构化调用完成分析和优化
+        
+        Args:
+            current_proposal: 当前提案
+            evaluations: 评估结果列表
+            references: 可选的参考资料
+            
+        Returns:
+            优化后的提案
+        """
+        messages = [
+            self.system_message,
+            HumanMessage(content=self.fused_prompt.format_map({
+                "current_proposal": current_proposal,
+                "evaluation_results": self._format_evaluations(evaluations),
+                "references": self._format_references(references)
+            }))
+        ]
+        
+        bundle = await self._ainvoke(self.structured_optimizer, messages, "fused")
+        
+        return bundle.optimized_proposal
+
+    async def optimize_proposal_stream(
+        self,
+        current_proposal: str,
+        evaluations: List[Dict[str, Any]],
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[str]:
+        """流式优化提案
+        
+        先完成评估结果分析，再以流式方式生成优化后的提案，调用方可以在生成过程中
+        逐步展示或保存内容。
+        
+        Args:
+            current_proposal: 当前提案
+            evaluations: 评估结果列表
+            references: 可选的参考资料
+            
+        Yields:
+            优化后提案的文本片段
+        """
+        try:
+            if self._is_already_excellent(evaluations):
+                yield current_proposal
+                return
+            
+            optimization_messages = await self._build_optimization_messages(
+                current_proposal, evaluations, references
+            )
+            
+            async for chunk in astream_with_limits(
+                self.model, optimization_messages, self.timeout, max_tokens=self.max_tokens
+            ):
+                if chunk.content:
+                    yield chunk.content
+                    
+        except Exception as e:
+            logger.error("流式优化提案失败: %s", e, exc_info=True)
+            raise
+
+    async def _analyze(
+        self,
+        evaluations: List[Dict[str, Any]]
+    ) -> Union[AnalysisResult, str]:
+        """第一轮：分析评估结果
+        
+        Args:
+            evaluations: 评估结果列表
+            
+        Returns:
+            结构化的分析结果，结构化输出失败时为模型返回的文本
+        """
+        analysis_messages = [
+            self.analysis_system_message,
+            HumanMessage(content=self.analysis_prompt.format_map({
+                "evaluation_results": self._format_evaluations(evaluations)
+            }))
+        ]
+        
+        try:
+            # 使用结构化输出直接获取AnalysisResult
+            return await self._ainvoke(
+                self.structured_analyzer, analysis_messages, "analysis", self.analysis_max_tokens
+            )
+        except Exception as e:
+            # 如果结构化输出失败，回退到普通输出，并尽量解析为 AnalysisResult
+            analysis_result = await self._ainvoke(
+                self.streaming_analyzer, analysis_messages, "analysis_text", self.analysis_max_tokens
+            )
+            return self._coerce_analysis(analysis_result.content)
+
+    @staticmethod
+    def _coerce_analysis(content: str) -> Union[AnalysisResult, str]:
+        """将普通输出的分析文本解析为 AnalysisResult
+        
+        模型通常仍会返回 JSON（可能包裹在 Markdown 代码块中），取最外层的 JSON 对象
+        直接用 pydantic 校验解析；解析失败时保留原始文本。
+        
+        Args:
+            content: 模型返回的分析文本
+            
+        Returns:
+            解析成功时为 AnalysisResult，否则为原始文本
+        """
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end < start:
+            return content
+        
+        try:
+            return AnalysisResult.model_validate_json(content[start:end + 1])
+        except ValidationError:
+            return content
+
+    def _optimization_messages(
+        self,
+        current_proposal: str,
+        analysis_text: str,
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> List[BaseMessage]:
+        """第二轮：构造优化阶段的消息
+        
+        Args:
+            current_proposal: 当前提案
+            analysis_text: 格式化后的分析结果
+            references: 可选的参考资料
+            
+        Returns:
+            优化阶段的消息列表
+        """
+        return [
+            self.system_message,
+            HumanMessage(content=self.optimization_prompt.format_map({
+                "current_proposal": current_proposal,
+                "analysis_result": analysis_text,
+                "references": self._format_references(references)
+            }))
+        ]
+
+    async def _build_optimization_messages(
+        self,
+        current_proposal: str,
+        evaluations: List[Dict[str, Any]],
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> List[BaseMessage]:
+        """分析评估结果并构造优化阶段的消息
+        
+        Args:
+            current_proposal: 当前提案
+            evaluations: 评估结果列表
+            references: 可选的参考资料
+            
+        Returns:
+            优化阶段的消息列表
+        """
+        analysis_result = await self._analyze(evaluations)
+        return self._optimization_messages(
+            current_proposal, self._format_analysis_result(analysis_result), references
+        )
+
+    async def _optimize_two_round(
+        self,
+        current_proposal: str,
+        evaluations: List[Dict[str, Any]],
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """通过分析、优化两轮对话优化提案
+        
+        Args:
+            current_proposal: 当前提案
+            evaluations: 评估结果列表
+            references: 可选的参考资料
+            
+        Returns:
+            优化后的提案
+        """
+        if self.speculative:
+            return await self._optimize_speculative(current_proposal, evaluations, references)
+        
+        optimization_messages = await self._build_optimization_messages(
+            current_proposal, evaluations, references
+        )
+        
+        # 执行优化
+        optimization_result = await self._ainvoke(self.model, optimization_messages, "optimization")
+        
+        return optimization_result.content
+
+    async def _optimize_speculative(
+        self,
+        current_proposal: str,
+        evaluations: List[Dict[str, Any]],
+        references: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """分析与投机优化并发执行的两轮优化
+        
+        分析的同时，直接以原始评估结果代替分析结果发起一次优化调用，两者先完成的一方决定结果：
+        - 投机优化先完成：直接采用投机结果，取消分析
+        - 分析先完成（或投机调用失败）：取消投机调用，按分析结果正常优化
+        
+        任何情况下最多只有两次串行的模型调用，不会在投机结果之后再重新优化。
+        
+        Args:
+            current_proposal: 当前提案
+            evaluations: 评估结果列表
+            references: 可选的参考资料
+            
+        Returns:
+            优化后的提案
+        """
+        analysis_task = asyncio.create_task(self._analyze(evaluations))
+        spec_task = asyncio.create_task(self._ainvoke(
+            self.model,
+            self._optimization_messages(
+                current_proposal, self._format_evaluations(evaluations), references
+            ),
+            "optimization"
+        ))
+        
+        try:
+            done, _ = await asyncio.wait(
+                {analysis_task, spec_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            if spec_task in done and spec_task.exception() is None:
+                logger.info("投机优化先于分析完成，采用投机优化结果")
+                return spec_task.result().content
+            
+            spec_task.cancel()
+            analysis_result = await analysis_task
+            optimization_result = await self._ainvoke(
+                self.model,
+                self._optimization_messages(
+                    current_proposal, self._format_analysis_result(analysis_result), references
+                ),
+                "optimization"
+            )
+            return optimization_result.content
+            
+        finally:
+            for task in (analysis_task, spec_task):
+                if not task.done():
+                    task.cancel()
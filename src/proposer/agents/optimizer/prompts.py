@@ -2,32 +2,51 @@ OPTIMIZER_SYSTEM_PROMPT = """您是提案优化专家。基于评估历史和改
 
 ANALYSIS_SYSTEM_PROMPT = """根据评估结果分析提案的关键问题和建议。"""
 
-OPTIMIZER_ANALYSIS_PROMPT = """请分析评估结果：
-
-# 评估结果
-{evaluation_results}
-
-请分析以下几个方面：
+OPTIMIZER_ANALYSIS_PROMPT = """请分析评估结果，分析以下几个方面：
 1. 主要问题和不足
 2. 改进方向和建议
 3. 需要优化的关键点
 
-请给出结构化的分析结果。"""
+请给出结构化的分析结果。
+
+# 评估结果
+{evaluation_results}"""
+
+OPTIMIZER_OPTIMIZATION_PROMPT = """请基于分析结果优化提案。
+
+请根据分析结果中的key_issues和suggestions对提案进行优化。重点关注：
+1. 针对每个关键问题进行改进
+2. 采纳相关的具体建议
+3. 参考成功经验
+
+生成一个优化后的提案版本。
 
-OPTIMIZER_OPTIMIZATION_PROMPT = """基于以上分析，请优化提案。
+# 参考资料
+{references}
 
 # 当前提案
 {current_proposal}
 
 # 分析结果
-{analysis_result}
+{analysis_result}"""
+
+OPTIMIZER_FUSED_PROMPT = """请先分析评估结果，再基于分析优化提案。
+
+请依次完成：
+1. 分析主要问题和不足，给出需要改进的关键问题（key_issues）和各维度的改进建议（suggestions）
+2. 针对每个关键问题进行改进，采纳相关的具体建议，参考成功经验，生成优化后的完整提案（optimized_proposal）
 
 # 参考资料
 {references}
 
-请根据分析结果中的key_issues和suggestions对提案进行优化。重点关注：
-1. 针对每个关键问题进行改进
-2. 采纳相关的具体建议
-3. 参考成功经验
+# 当前提案
+{current_proposal}
+
+# 评估结果
+{evaluation_results}"""
 
-生成一个优化后的提案版本。"""
\ No newline at end of file
+# 单条参考资料的格式，条目之间以空行分隔
+REFERENCE_ITEM_TEMPLATE = """## 参考资料 {index}
+- title: {title}
+- content: {content}
+"""
@@ -1,47 +1,55 @@
-from langchain_core.messages import HumanMessage, SystemMessage
-from typing import Dict, List, Any, Optional
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-from proposer.utils import init_custom_chat_model
-from .prompts import PROPOSER_SYSTEM_PROMPT, PROPOSER_BASE_PROMPT, PROPOSER_RAG_PROMPT
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from typing import AsyncIterator, Dict, List, Any, Optional
+from proposer.utils import init_custom_chat_model, ainvoke_with_retry, astream_with_limits, format_goals, format_constraints
+from proposer.cache import ResponseCache, make_messages_key
+from .prompts import (
+    PROPOSER_SYSTEM_PROMPT,
+    PROPOSER_BASE_PROMPT,
+    PROPOSER_RAG_PROMPT,
+    CASE_REFERENCE_TEMPLATE,
+    DOCUMENT_REFERENCE_TEMPLATE
+)
+import asyncio
 import logging
 from langsmith import traceable
 
 logger = logging.getLogger(__name__)
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 
 class ProposerAgent:
     """提案生成器，负责生成提案内容"""
     
-    def __init__(self, model: str = "qwen-max", api_version: str = "v1"):
+    def __init__(
+        self,
+        model: str = "qwen-max",
+        api_version: str = "v1",
+        enable_cache: bool = False,
+        timeout: Optional[float] = None,
+        max_retries: int = 0,
+        max_tokens: Optional[int] = None
+    ):
         """初始化提案生成器
         
         Args:
             model: 模型名称
             api_version: API版本
+            enable_cache: 是否缓存模型响应，提示完全相同时直接复用上次生成的提案
+            timeout: 单次模型调用的超时秒数，为None时不限制
+            max_retries: 模型调用超时后的最大重试次数
+            max_tokens: 单次生成的最大 token 数
         """
-        self.model = init_custom_chat_model(model)
+        self.model = init_custom_chat_model(model, max_tokens=max_tokens)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self.cache = ResponseCache() if enable_cache else None
         
-        # 定义系统提示模板
-        self.system_prompt = PromptTemplate(
-            template=PROPOSER_SYSTEM_PROMPT,
-            input_variables=[],
-            partial_variables={}
-        )
+        # 系统提示不含变量，初始化时构造一次即可复用
+        self.system_message = SystemMessage(content=PROPOSER_SYSTEM_PROMPT)
         
-        # 定义用户提示模板（基础版本）
-        self.base_prompt = PromptTemplate(
-            template=PROPOSER_BASE_PROMPT,
-            input_variables=["input", "goals_text", "constraints_text"]
-        )
-        
-        # 定义用户提示模板（RAG增强版本）
-        self.rag_prompt = PromptTemplate(
-            template=PROPOSER_RAG_PROMPT,
-            input_variables=["input", "goals_text", "constraints_text", "references_text"]
-        )
+        # 用户提示模板（基础版本和RAG增强版本），调用时通过 str.format_map 渲染
+        self.base_prompt = PROPOSER_BASE_PROMPT
+        self.rag_prompt = PROPOSER_RAG_PROMPT
         
     def _format_references(self, references: List[Dict[str, Any]]) -> str:
         """格式化参考资料
@@ -52,19 +60,17 @@ class ProposerAgent:
         Returns:
             格式化后的参考资料文本
         """
-        formatted_refs = []
-        for i, ref in enumerate(references):
-            if ref.get("type") == "case":
-                # 处理历史案例
-                formatted_refs.append(f"历史案例 {i+1}:\n{ref['content']}")
-            else:
-                # 处理RAG检索的文档
-                formatted_refs.append(
-                    f"参考文档 {i+1}:\n{ref['content']}\n"
-                    f"来源: {ref.get('metadata', {}).get('source', '未知')}"
-                )
-        
-        return "\n\n".join(formatted_refs)
+        return "\n\n".join(
+            # 历史案例只展示内容，RAG检索的文档附带来源
+            CASE_REFERENCE_TEMPLATE.format(index=i, content=ref["content"])
+            if ref.get("type") == "case"
+            else DOCUMENT_REFERENCE_TEMPLATE.format(
+                index=i,
+                content=ref["content"],
+                source=ref.get("metadata", {}).get("source", "未知")
+            )
+            for i, ref in enumerate(references, 1)
+        )
         
     def _validate_input(self, input: str, constraints: List[Dict], goals: List[str]):
         """验证输入参数
@@ -83,13 +89,66 @@ class ProposerAgent:
             if "type" not in constraint or "value" not in constraint:
                 raise ValueError("each constraint must have 'type' and 'value' fields")
     
+    def _build_messages(
+        self,
+        input: str,
+        constraints: List[Dict],
+        goals: List[str],
+        references: Optional[List[Dict[str, Any]]] = None,
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """验证输入并构造生成提案的消息列表
+        
+        Args:
+            input: 输入信息
+            constraints: 约束条件列表
+            goals: 目标列表
+            references: 可选的参考资料列表
+            goals_text: 预先格式化的目标文本，为None时根据 goals 格式化
+            constraints_text: 预先格式化的约束条件文本，为None时根据 constraints 格式化
+            
+        Returns:
+            发送给模型的消息列表
+        """
+        # 验证输入
+        self._validate_input(input, constraints, goals)
+        
+        # 格式化目标和约束条件，调用方已格式化时直接复用
+        if goals_text is None:
+            goals_text = format_goals(goals)
+        if constraints_text is None:
+            constraints_text = format_constraints(constraints)
+        
+        # 准备用户消息
+        if references:
+            # 使用RAG增强版本的提示
+            references_text = self._format_references(references)
+            user_msg = HumanMessage(content=self.rag_prompt.format_map({
+                "input": input,
+                "goals_text": goals_text,
+                "constraints_text": constraints_text,
+                "references_text": references_text
+            }))
+        else:
+            # 使用基础版本的提示
+            user_msg = HumanMessage(content=self.base_prompt.format_map({
+                "input": input,
+                "goals_text": goals_text,
+                "constraints_text": constraints_text
+            }))
+        
+        return [self.system_message, user_msg]
+    
     @traceable(name="generate_proposal", run_type="chain")
     async def generate(
         self,
         input: str,
         constraints: List[Dict],
         goals: List[str],
-        references: Optional[List[Dict[str, Any]]] = None
+        references: Optional[List[Dict[str, Any]]] = None,
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
     ) -> str:
         """生成提案
         
@@ -98,45 +157,109 @@ class ProposerAgent:
             constraints: 约束条件列表
             goals: 目标列表
             references: 可选的参考资料列表
+            goals_text: 预先格式化的目标文本
+            constraints_text: 预先格式化的约束条件文本
             
         Returns:
             生成的提案文本
         """
         try:
-            # 验证输入
-            self._validate_input(input, constraints, goals)
+            # 生成提案
+            messages = self._build_messages(
+                input, constraints, goals, references, goals_text, constraints_text
+            )
+            cache_key = make_messages_key("generate", messages) if self.cache is not None else None
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
-            # 格式化目标和约束条件
-            goals_text = "\n".join(f"- {goal}" for goal in goals)
-            constraints_text = "\n".join(f"- {c['type']}: {c['value']}" for c in constraints)
+            response = await ainvoke_with_retry(
+                self.model, messages, self.timeout, self.max_retries, max_tokens=self.max_tokens
+            )
             
-            # 准备系统消息
-            system_msg = SystemMessage(content=self.system_prompt.format())
+            if cache_key is not None:
+                self.cache.put(cache_key, response.content)
             
-            # 准备用户消息
-            if references:
-                # 使用RAG增强版本的提示
-                references_text = self._format_references(references)
-                user_msg = HumanMessage(content=self.rag_prompt.format(
-                    input=input,
-                    goals_text=goals_text,
-                    constraints_text=constraints_text,
-                    references_text=references_text
-                ))
-            else:
-                # 使用基础版本的提示
-                user_msg = HumanMessage(content=self.base_prompt.format(
-                    input=input,
-                    goals_text=goals_text,
-                    constraints_text=constraints_text
-                ))
+            return response.content
             
-            # 生成提案
-            messages = [system_msg, user_msg]
-            response = await self.model.ainvoke(input=messages)
+        except Exception as e:
+            logger.error("生成提案失败: %s", e, exc_info=True)
+            raise
+
+    async def generate_stream(
+        self,
+        input: str,
+        constraints: List[Dict],
+        goals: List[str],
+        references: Optional[List[Dict[str, Any]]] = None,
+        goals_text: Optional[str] = None,
+        constraints_text: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """流式生成提案
+        
+        模型一开始解码就逐段返回内容，调用方无需等待整篇提案生成完毕；
+        与 generate 共用响应缓存和调用隔板，命中缓存时一次性返回缓存的提案。
+        
+        Args:
+            input: 输入信息
+            constraints: 约束条件列表
+            goals: 目标列表
+            references: 可选的参考资料列表
+            goals_text: 预先格式化的目标文本
+            constraints_text: 预先格式化的约束条件文本
             
-            return response.content
+        Yields:
+            提案的文本片段
+        """
+        try:
+            messages = self._build_messages(
+                input, constraints, goals, references, goals_text, constraints_text
+            )
+            cache_key = make_messages_key("generate", messages) if self.cache is not None else None
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    yield cached
+                    return
             
+            chunks = []
+            async for chunk in astream_with_limits(
+                self.model, messages, self.timeout, max_tokens=self.max_tokens
+            ):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, "".join(chunks))
+                
         except Exception as e:
-            logger.error(f"生成提案失败: {e}")
+            logger.error("流式生成提案失败: %s", e, exc_info=True)
             raise
+
+    @traceable(name="generate_proposals_batch", run_type="chain")
+    async def generate_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: int = 8
+    ) -> List[str]:
+        """批量生成提案
+        
+        各提案的生成请求并发执行，同时进行的模型调用数受 max_concurrency 限制。
+        
+        Args:
+            items: 生成请求列表，每项为 generate 的关键字参数
+                （input、constraints、goals，以及可选的 references）
+            max_concurrency: 同时进行的模型调用数上限
+            
+        Returns:
+            与 items 顺序一致的提案文本列表
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_one(item: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.generate(**item)
+        
+        return await asyncio.gather(*(generate_one(item) for item in items))
@@ -1,7 +1,9 @@
 PROPOSER_SYSTEM_PROMPT = """您是提案生成专家。基于输入、目标和约束条件生成一个新的提案。
 """
 
-PROPOSER_BASE_PROMPT = """基于以下背景，生成详细的创新方案：
+PROPOSER_BASE_PROMPT = """请基于下面给出的背景生成详细的创新方案，确保内容尽量详细，并满足所有目标和约束条件。
+
+# 背景
 {input}
 
 # 目标
@@ -9,11 +11,15 @@ PROPOSER_BASE_PROMPT = """基于以下背景，生成详细的创新方案：
 
 # 约束条件
 {constraints_text}
-
-请确保内容尽量详细，并满足所有目标和约束条件。
 """
 
-PROPOSER_RAG_PROMPT = """基于以下背景和参考资料，生成详细的创新方案：
+PROPOSER_RAG_PROMPT = """请基于下面给出的背景和参考资料生成详细的创新方案。
+
+要求：
+1. 充分利用参考资料中的相关信息
+2. 确保满足所有目标和约束条件
+
+# 背景
 {input}
 
 # 目标
@@ -24,8 +30,12 @@ PROPOSER_RAG_PROMPT = """基于以下背景和参考资料，生成详细的创
 
 # 参考资料
 {references_text}
+"""
 
-要求：
-1. 充分利用参考资料中的相关信息
-2. 确保满足所有目标和约束条件
-"""
\ No newline at end of file
+# 参考资料条目的格式：历史案例和 RAG 检索到的文档
+CASE_REFERENCE_TEMPLATE = """历史案例 {index}:
+{content}"""
+
+DOCUMENT_REFERENCE_TEMPLATE = """参考文档 {index}:
+{content}
+来源: {source}"""
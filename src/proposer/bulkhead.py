@@ -0,0 +1,232 @@
+"""LLM 调用的准入控制
+
+同一事件循环内的所有模型调用共用一个隔板（bulkhead），同时限制：
+1. 并发请求数
+2. 每分钟请求数（RPM）
+3. 每分钟 token 数（TPM），按调用前估算的输入和输出 token 计
+
+asyncio 的信号量和锁只能在一个事件循环中使用，因此每个事件循环各自创建隔板，
+各隔板使用进程内统一配置的限制。
+
+超出限制的调用排队等待，或在交互场景下立即拒绝，避免触发服务端限流后的连锁重试。
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Sequence, Tuple
+import asyncio
+import functools
+import logging
+import threading
+import time
+import weakref
+
+from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+# 限流统计的时间窗口（秒）
+WINDOW_SECONDS = 60.0
+
+
+class BulkheadRejected(RuntimeError):
+    """不等待模式下超出限制时抛出"""
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """估算消息列表的输入 token 数
+
+    通义千问等模型的中文文本大约每个字符 0.6~1 个 token，这里按每个字符一个 token
+    估算，作为偏保守的上界，不依赖具体模型的分词器。
+
+    Args:
+        messages: 消息列表
+
+    Returns:
+        估算的 token 数
+    """
+    return sum(len(message.content) for message in messages if isinstance(message.content, str))
+
+
+class LLMBulkhead:
+    """并发数、RPM 和 TPM 三重限制的调用隔板"""
+
+    def __init__(
+        self,
+        max_concurrent: int = 10,
+        tpm: int = 300_000,
+        rpm: int = 500,
+        wait: bool = True
+    ):
+        """初始化隔板
+
+        Args:
+            max_concurrent: 同时进行的调用数上限
+            tpm: 每分钟 token 数上限
+            rpm: 每分钟请求数上限
+            wait: 超出限制时是否排队等待，为False时立即抛出 BulkheadRejected
+        """
+        self.max_concurrent = max_concurrent
+        self.tpm = tpm
+        self.rpm = rpm
+        self.wait = wait
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # 并发上限调小后尚未收回的名额数，由之后结束的调用依次收回
+        self._pending_shrink = 0
+        self._lock = asyncio.Lock()
+        self._window: Deque[Tuple[float, int]] = deque()
+        self._window_tokens = 0
+
+    def update(
+        self,
+        max_concurrent: int,
+        tpm: int,
+        rpm: int,
+        wait: bool
+    ) -> None:
+        """原地调整限制，正在进行和排队的调用不受影响
+
+        需要在隔板所属的事件循环中调用。
+
+        Args:
+            max_concurrent: 同时进行的调用数上限
+            tpm: 每分钟 token 数上限
+            rpm: 每分钟请求数上限
+            wait: 超出限制时是否排队等待
+        """
+        delta = max_concurrent - self.max_concurrent
+        self.max_concurrent = max_concurrent
+        self.tpm = tpm
+        self.rpm = rpm
+        self.wait = wait
+
+        # 调大时先抵消尚未收回的名额，其余直接释放给信号量
+        while delta > 0 and self._pending_shrink:
+            self._pending_shrink -= 1
+            delta -= 1
+        for _ in range(delta):
+            self._semaphore.release()
+        if delta < 0:
+            self._pending_shrink -= delta
+
+    def _prune(self, now: float) -> None:
+        """移出时间窗口之外的调用记录"""
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _delay(self, tokens: int) -> Optional[float]:
+        """计算本次调用需要等待的秒数
+
+        Returns:
+            可以立即放行时返回 None，否则返回距离最早一条记录过期的秒数
+        """
+        now = time.monotonic()
+        self._prune(now)
+        # 窗口为空时总是放行，单次估算超过 TPM 的调用也不会被永久阻塞
+        if not self._window or (
+            len(self._window) < self.rpm and self._window_tokens + tokens <= self.tpm
+        ):
+            self._window.append((now, tokens))
+            self._window_tokens += tokens
+            return None
+        return self._window[0][0] + WINDOW_SECONDS - now
+
+    @asynccontextmanager
+    async def reserve(self, tokens: int) -> AsyncIterator[None]:
+        """为一次调用预留额度，退出上下文时释放并发名额
+
+        Args:
+            tokens: 本次调用估算的输入与输出 token 总数
+
+        Raises:
+            BulkheadRejected: 不等待模式下并发数或速率超出限制
+        """
+        if not self.wait and self._semaphore.locked():
+            raise BulkheadRejected(f"并发调用数已达上限 {self.max_concurrent}")
+
+        await self._semaphore.acquire()
+        try:
+            # 加锁排队，保证先到的调用先获得额度
+            async with self._lock:
+                while (delay := self._delay(tokens)) is not None:
+                    if not self.wait:
+                        raise BulkheadRejected(f"调用速率超出限制（RPM {self.rpm}，TPM {self.tpm}）")
+                    logger.debug("调用速率达到上限，等待 %.2f 秒", delay)
+                    await asyncio.sleep(delay)
+            yield
+        finally:
+            if self._pending_shrink:
+                self._pending_shrink -= 1
+            else:
+                self._semaphore.release()
+
+
+# 新建隔板使用的限制，由 configure_llm_bulkhead 设置
+_llm_limits: Dict[str, Any] = {
+    "max_concurrent": 10,
+    "tpm": 300_000,
+    "rpm": 500,
+    "wait": True
+}
+
+# 各事件循环的隔板，事件循环被回收后对应的隔板随之释放
+_llm_bulkheads: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMBulkhead]" = (
+    weakref.WeakKeyDictionary()
+)
+_llm_bulkheads_lock = threading.Lock()
+
+
+def get_llm_bulkhead() -> LLMBulkhead:
+    """获取当前事件循环的调用隔板
+
+    Returns:
+        LLMBulkhead: 当前事件循环内所有模型调用共用的隔板，首次获取时按当前配置创建
+    """
+    loop = asyncio.get_running_loop()
+    with _llm_bulkheads_lock:
+        bulkhead = _llm_bulkheads.get(loop)
+        if bulkhead is None:
+            bulkhead = _llm_bulkheads[loop] = LLMBulkhead(**_llm_limits)
+    return bulkhead
+
+
+def configure_llm_bulkhead(
+    max_concurrent: int = 10,
+    tpm: int = 300_000,
+    rpm: int = 500,
+    wait: bool = True
+) -> None:
+    """配置调用隔板的限制
+
+    之后新建的隔板使用新的限制；已有的隔板不替换，在各自的事件循环中原地调整，
+    正在进行和排队的调用仍受同一个隔板约束。
+
+    Args:
+        max_concurrent: 同时进行的调用数上限
+        tpm: 每分钟 token 数上限
+        rpm: 每分钟请求数上限
+        wait: 超出限制时是否排队等待
+    """
+    limits = {"max_concurrent": max_concurrent, "tpm": tpm, "rpm": rpm, "wait": wait}
+
+    with _llm_bulkheads_lock:
+        if limits == _llm_limits:
+            return
+        _llm_limits.update(limits)
+        bulkheads = list(_llm_bulkheads.items())
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    for loop, bulkhead in bulkheads:
+        if loop is running:
+            bulkhead.update(**limits)
+        else:
+            try:
+                loop.call_soon_threadsafe(functools.partial(bulkhead.update, **limits))
+            except RuntimeError:
+                # 事件循环已关闭，其隔板不会再被使用
+                pass
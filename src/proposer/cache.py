@@ -0,0 +1,200 @@
+"""LLM 调用结果缓存
+
+为评估等迭代中反复出现的 LLM 调用提供两级缓存：
+1. L1：基于输入内容哈希的精确匹配 LRU 缓存
+2. L2：基于文本向量余弦相似度的语义匹配缓存（可选，需要提供 Embeddings）
+
+另外提供按完整消息内容精确匹配、带过期时间的模型响应缓存。
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import copy
+import hashlib
+import logging
+import time
+
+import numpy as np
+import orjson
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: Any) -> str:
+    """根据任意可 JSON 序列化的内容生成稳定的缓存键
+
+    Args:
+        *parts: 参与计算缓存键的内容
+
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    payload = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def make_messages_key(namespace: str, messages: Sequence[BaseMessage]) -> str:
+    """根据完整的消息列表生成缓存键
+    
+    Args:
+        namespace: 调用标识，区分发送相同消息的不同模型（如结构化输出与普通输出）
+        messages: 发送给模型的消息列表
+        
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    return make_cache_key(namespace, [(message.type, message.content) for message in messages])
+
+
+class ResponseCache:
+    """带过期时间的模型响应 LRU 缓存
+    
+    迭代过程中完全相同的提示会重复发送，命中缓存时直接返回上次的响应。
+    缓存值按引用返回，调用方不应修改。
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0):
+        """初始化缓存
+        
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目的有效期（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        """查找缓存
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            未过期时返回缓存值，否则返回 None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 需要缓存的值
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class SemanticCache:
+    """两级语义缓存
+
+    缓存条目按 scope 分组：scope 描述不变的上下文（如评估重点、问题、目标和约束），
+    text 为可能小幅变化的内容（如提案正文）。精确匹配要求 scope 与 text 完全一致；
+    语义匹配只在同一 scope 内比较 text 的向量相似度。
+    """
+
+    # 保留最近计算的查询向量数，aget 未命中后紧接着的 aput 直接复用
+    RECENT_VECTORS = 32
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        maxsize: int = 256,
+        similarity_threshold: float = 0.95,
+        max_scopes: int = 64
+    ):
+        """初始化缓存
+
+        Args:
+            embeddings: 可选的向量模型，提供时启用语义匹配
+            maxsize: 精确匹配缓存的最大条目数，也是每个 scope 保留的向量条目数
+            similarity_threshold: 语义命中所需的最小余弦相似度
+            max_scopes: 语义匹配保留的 scope 数，超出时淘汰最久未使用的 scope
+        """
+        self.embeddings = embeddings
+        self.maxsize = maxsize
+        self.similarity_threshold = similarity_threshold
+        self.max_scopes = max_scopes
+        self._exact: "OrderedDict[str, Any]" = OrderedDict()
+        self._vectors: "OrderedDict[str, List[Tuple[np.ndarray, Any]]]" = OrderedDict()
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """计算归一化后的文本向量"""
+        vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aget(self, scope: str, text: str) -> Optional[Any]:
+        """查找缓存
+
+        Args:
+            scope: 上下文标识
+            text: 待匹配的文本
+
+        Returns:
+            命中时返回缓存值的副本，否则返回 None
+        """
+        key = make_cache_key(scope, text)
+        if key in self._exact:
+            self._exact.move_to_end(key)
+            return copy.deepcopy(self._exact[key])
+
+        entries = self._vectors.get(scope)
+        if self.embeddings is None or not entries:
+            return None
+
+        self._vectors.move_to_end(scope)
+        query = await self._embed(text)
+        self._recent[key] = query
+        while len(self._recent) > self.RECENT_VECTORS:
+            self._recent.popitem(last=False)
+        matrix = np.stack([vector for vector, _ in entries])
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            logger.debug("语义缓存命中，相似度 %.4f", similarities[best])
+            return copy.deepcopy(entries[best][1])
+
+        return None
+
+    async def aput(self, scope: str, text: str, value: Any) -> None:
+        """写入缓存
+
+        Args:
+            scope: 上下文标识
+            text: 对应的文本
+            value: 需要缓存的值
+        """
+        key = make_cache_key(scope, text)
+        self._exact[key] = copy.deepcopy(value)
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.maxsize:
+            self._exact.popitem(last=False)
+
+        if self.embeddings is not None:
+            # aget 未命中时已经计算过该文本的向量，不再重复请求向量化服务
+            vector = self._recent.pop(key, None)
+            if vector is None:
+                vector = await self._embed(text)
+            entries = self._vectors.setdefault(scope, [])
+            entries.append((vector, copy.deepcopy(value)))
+            del entries[:-self.maxsize]
+            self._vectors.move_to_end(scope)
+            while len(self._vectors) > self.max_scopes:
+                self._vectors.popitem(last=False)
@@ -0,0 +1,118 @@
+"""工作流检查点的压缩序列化
+
+提案和评估在迭代中不断增长，MemorySaver 为每个通道的每个版本保存一份序列化结果。
+这里在默认序列化器外包一层 zlib 压缩，较大的通道值（提案列表、评估列表）压缩后保存，
+中文长文本通常可以压缩到原来的三分之一左右；较小的值原样保存，避免无谓的压缩开销。
+
+工作流状态基本都是由字符串、数字、列表和字典组成的纯 JSON 数据，这类值直接用 orjson
+序列化；其他类型（消息对象、元组等）仍交给默认序列化器，保证反序列化后类型不变。
+"""
+
+from typing import Any, Optional, Tuple
+import zlib
+
+import orjson
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# 压缩后的数据在类型标记后追加的后缀
+COMPRESSED_SUFFIX = "+zlib"
+
+# 小于该字节数的序列化结果不压缩
+MIN_COMPRESS_BYTES = 1024
+
+# 使用 orjson 序列化的值的类型标记
+ORJSON_TYPE = "orjson"
+
+# 可以无损往返 JSON 的标量类型；bool 是 int 的子类，按精确类型判断时需要单独列出
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _is_plain_json(obj: Any) -> bool:
+    """判断对象是否只由 JSON 原生类型组成，经 JSON 往返后类型和取值都不变
+
+    只按容器元素逐个检查，提案等长字符串作为叶子节点不会被遍历。
+    """
+    obj_type = type(obj)
+    if obj_type in _JSON_SCALARS:
+        # 非有限浮点数无法表示为 JSON
+        return obj_type is not float or obj - obj == 0
+    if obj_type is list:
+        return all(_is_plain_json(item) for item in obj)
+    if obj_type is dict:
+        return all(type(key) is str and _is_plain_json(value) for key, value in obj.items())
+    return False
+
+
+class CompressedSerializer(SerializerProtocol):
+    """纯 JSON 数据使用 orjson、较大的序列化结果进行 zlib 压缩的序列化器"""
+
+    def __init__(
+        self,
+        serde: Optional[SerializerProtocol] = None,
+        level: int = 6,
+        min_bytes: int = MIN_COMPRESS_BYTES
+    ):
+        """初始化序列化器
+
+        Args:
+            serde: 负责序列化非纯 JSON 数据的序列化器，默认为 JsonPlusSerializer
+            level: zlib 压缩级别
+            min_bytes: 小于该字节数的结果不压缩
+        """
+        self.serde = serde or JsonPlusSerializer()
+        self.level = level
+        self.min_bytes = min_bytes
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        """序列化并在结果足够大时压缩
+
+        Args:
+            obj: 需要序列化的对象
+
+        Returns:
+            (类型标记, 数据)，压缩过的数据类型标记带有 COMPRESSED_SUFFIX 后缀
+        """
+        try:
+            type_, data = ORJSON_TYPE, orjson.dumps(obj) if _is_plain_json(obj) else None
+        except orjson.JSONEncodeError:
+            # 超出 64 位范围的整数等 orjson 不支持的值
+            data = None
+        if data is None:
+            type_, data = self.serde.dumps_typed(obj)
+        if len(data) < self.min_bytes:
+            return type_, data
+        return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        """按类型标记解压并反序列化
+
+        Args:
+            data: dumps_typed 返回的 (类型标记, 数据)
+
+        Returns:
+            反序列化后的对象
+        """
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_ = type_[:-len(COMPRESSED_SUFFIX)]
+            payload = zlib.decompress(payload)
+        if type_ == ORJSON_TYPE:
+            return orjson.loads(payload)
+        return self.serde.loads_typed((type_, payload))
+
+
+def create_checkpointer() -> MemorySaver:
+    """创建保存压缩检查点的内存检查点存储
+
+    Returns:
+        MemorySaver: 使用 CompressedSerializer 的检查点存储
+    """
+    return MemorySaver(serde=CompressedSerializer())
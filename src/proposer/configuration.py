@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field, fields
-from typing import Annotated, Optional, Dict, Any
+from typing import Annotated, Optional, Dict, Any, Tuple
 
 from langchain_core.runnables import RunnableConfig, ensure_config
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True)
 class Configuration:
-    """The configuration for the proposal workflow."""
+    """The configuration for the proposal workflow.
+
+    Instances are immutable and hashable, so they can be used as cache keys
+    for the agents built from them.
+    """
 
     # 主模型配置
     model: Annotated[str, {"__template_metadata__": {"kind": "llm"}}] = field(
@@ -48,6 +52,166 @@ class Configuration:
         },
     )
 
+    # 评估器模型路由
+    route_critic_models: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the per-focus critics pick their model from the focus "
+            "model map (a smaller model for structural checks, a larger one for "
+            "reasoning-heavy dimensions) instead of critic_model. The merged multi-focus "
+            "critic always uses critic_model."
+        },
+    )
+
+    # 各评估重点使用的模型
+    critic_focus_models: Tuple[Tuple[str, str], ...] = field(
+        default=(),
+        metadata={
+            "description": "Per-focus model overrides used when route_critic_models is "
+            "enabled, as a mapping from focus name to model name. Focuses not listed use "
+            "the built-in focus model map."
+        },
+    )
+
+    # 流式优化
+    stream_proposer: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the initial proposal is streamed token by token, so "
+            "consumers can read it via stream_mode='messages' while it is being generated."
+        },
+    )
+
+    stream_optimizer: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the optimizer streams the refined proposal token by token. "
+            "Streaming uses the two-round analyze/optimize path, so consumers can read the "
+            "proposal via stream_mode='messages' while it is being generated."
+        },
+    )
+
+    # 初始提案缓存
+    enable_proposal_cache: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to reuse a previously generated initial proposal when the "
+            "same or a near-identical input arrives with the same goals, constraints and "
+            "retrieved references. Off by default, so every run generates a fresh proposal."
+        },
+    )
+
+    # 模型响应缓存
+    enable_response_cache: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the proposer and optimizer reuse a cached model response "
+            "when the prompt is exactly the same, across runs for up to an hour. Off by "
+            "default, so every run calls the model."
+        },
+    )
+
+    # 提案缓存的语义相似度阈值
+    proposal_cache_threshold: float = field(
+        default=0.95,
+        metadata={
+            "description": "The minimum cosine similarity between input embeddings for a "
+            "cached proposal to be reused."
+        },
+    )
+
+    # 合并分析与优化
+    optimizer_fused: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the optimizer analyzes the evaluations and rewrites the "
+            "proposal in a single structured LLM call. By default the two-round "
+            "analyze/optimize path is used."
+        },
+    )
+
+    # 投机优化
+    speculative_optimizer: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether the two-round optimizer starts a speculative optimization "
+            "from the raw evaluations while the analysis call is still running. Lowers latency "
+            "when the analysis is slow, at the cost of an extra (possibly cancelled) LLM call."
+        },
+    )
+
+    # 投机迭代
+    speculative_refine: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to draft the next proposal from the previous round's "
+            "evaluation while the current proposal is being evaluated. When the round ends "
+            "in refine, the draft is used directly and the next propose step skips its LLM "
+            "call; otherwise the draft is discarded."
+        },
+    )
+
+    # 模型调用超时
+    llm_timeout: float = field(
+        default=120.0,
+        metadata={
+            "description": "Per-call timeout in seconds for proposer, critic and optimizer "
+            "LLM calls. A call that exceeds it is cancelled and retried."
+        },
+    )
+
+    # 模型调用重试次数
+    llm_max_retries: int = field(
+        default=2,
+        metadata={
+            "description": "How many times a timed-out LLM call is retried, with exponential backoff."
+        },
+    )
+
+    # 模型调用并发上限
+    llm_max_concurrency: int = field(
+        default=10,
+        metadata={
+            "description": "Maximum number of LLM calls in flight at once across all agents "
+            "on the same event loop."
+        },
+    )
+
+    # 每分钟请求数上限
+    llm_requests_per_minute: int = field(
+        default=500,
+        metadata={
+            "description": "Per-event-loop cap on LLM requests per minute. Calls over the cap "
+            "wait until the sliding window frees up."
+        },
+    )
+
+    # 每分钟 token 数上限
+    llm_tokens_per_minute: int = field(
+        default=300_000,
+        metadata={
+            "description": "Per-event-loop cap on estimated LLM tokens (prompt plus max output) "
+            "per minute."
+        },
+    )
+
+    # 提案生成的最大 token 数
+    proposal_max_tokens: int = field(
+        default=4096,
+        metadata={
+            "description": "Upper bound on tokens generated for a proposal, by both the "
+            "proposer and the optimizer."
+        },
+    )
+
+    # 评估分析的最大 token 数
+    analysis_max_tokens: int = field(
+        default=2048,
+        metadata={
+            "description": "Upper bound on tokens generated by the optimizer's analysis step."
+        },
+    )
+
     # 最大迭代次数
     max_iterations: int = field(
         default=3,
@@ -56,15 +220,64 @@ class Configuration:
         },
     )
 
+    # 保留的历史版本数
+    max_history: int = field(
+        default=0,
+        metadata={
+            "description": "How many of the most recent proposals and evaluations are kept in "
+            "the workflow state. Only the latest ones are read, so a small limit keeps state "
+            "and checkpoints small. 0 (the default) keeps the full history."
+        },
+    )
+
     # 优秀评分标准
     excellent_score: float = field(
         default=8.5,
         metadata={
-            "description": "The score threshold for considering a proposal excellent. "
-            "If the score is equal to or above this threshold, the workflow will stop."
+            "description": "The score threshold (on a 1-10 scale) for considering a proposal "
+            "excellent. If the score is equal to or above this threshold, the workflow will stop."
         },
     )
 
+    # 合并评估
+    merge_critics: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to evaluate all focuses in a single multi-focus LLM call "
+            "so the proposal context is sent once. If the merged response is invalid, the "
+            "per-focus critics are used as a fallback. Off by default."
+        },
+    )
+
+    # 评估结果缓存
+    enable_critic_cache: bool = field(
+        default=False,
+        metadata={
+            "description": "Whether to cache critic evaluations so that unchanged or "
+            "near-identical proposals skip the LLM call. A near-identical hit returns the "
+            "evaluation of an earlier revision, so leave this off when every refinement "
+            "must be re-evaluated."
+        },
+    )
+
+    # 评估缓存的语义相似度阈值
+    critic_cache_threshold: float = field(
+        default=0.95,
+        metadata={
+            "description": "The minimum cosine similarity between proposal embeddings "
+            "for a cached evaluation to be reused."
+        },
+    )
+
+    def __post_init__(self) -> None:
+        """Normalize critic_focus_models so the instance stays hashable."""
+        focus_models = self.critic_focus_models
+        if isinstance(focus_models, dict):
+            focus_models = focus_models.items()
+        object.__setattr__(self, "critic_focus_models", tuple(sorted(
+            (str(focus), model) for focus, model in focus_models
+        )))
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
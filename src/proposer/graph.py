@@ -1,20 +1,29 @@
-from typing import Dict, List, Any, Optional, Tuple, Union, Sequence
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple, Union, Sequence
 from typing_extensions import Annotated
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from langgraph.types import interrupt, Command
-from langgraph.checkpoint.memory import MemorySaver
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
+import asyncio
+import functools
+import itertools
 import logging
+import math
 import uuid
 from proposer.agents.proposer.core import ProposerAgent
-from proposer.agents.critic.core import CriticAgent
+from proposer.agents.critic.core import CriticAgent, MultiCriticAgent
+from proposer.agents.critic.prompts import Focus
 from proposer.agents.optimizer.core import OptimizerAgent
 from proposer.configuration import Configuration
+from proposer.utils import format_goals, format_constraints
+from proposer.cache import SemanticCache, make_cache_key
+from proposer.bulkhead import configure_llm_bulkhead
+from proposer.checkpoint import create_checkpointer
+from rag.embeddings import DashScopeEmbeddings
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class ProposalInput:
     """提案生成的输入参数"""
     input: str
@@ -22,15 +31,23 @@ class ProposalInput:
     goals: List[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class ProposalState(ProposalInput):
-    """提案工作流状态"""
+    """提案工作流状态
+    
+    各节点只返回自己修改过的字段，由 langgraph 合并到状态中，
+    不在每一步复制整个状态（尤其是不断增长的提案和评估列表）。
+    """
     proposals: List[str] = field(default_factory=list)  # 存储所有版本的提案
+    references: List[Dict[str, Any]] = field(default_factory=list)  # 首次生成时检索到的参考资料
+    goals_text: str = field(default="")  # 格式化后的目标文本，初始化时生成一次
+    constraints_text: str = field(default="")  # 格式化后的约束条件文本，初始化时生成一次
     evaluations: List[Dict[str, Any]] = field(default_factory=list)
     status: str = field(default="init")
     iteration: int = field(default=0)
     max_iterations: int = field(default=3)
     excellent_score: float = field(default=8.5)
+    speculative_proposal: Optional[str] = field(default=None)  # 评估期间投机生成的下一版提案
 
     @property
     def current_proposal(self) -> Optional[str]:
@@ -43,6 +60,64 @@ class ProposalState(ProposalInput):
         return self.evaluations[-1] if self.evaluations else None
 
 
+def _build_agents(
+    configuration: Configuration,
+    critic_cache: Optional[SemanticCache] = None
+) -> Tuple[ProposerAgent, Dict[Focus, CriticAgent], Optional[MultiCriticAgent], OptimizerAgent]:
+    """按配置构造工作流使用的代理
+    
+    Args:
+        configuration: 工作流配置
+        critic_cache: 评估代理共用的评估缓存
+        
+    Returns:
+        (提案生成代理, 各维度评估代理, 合并评估代理, 优化代理)
+    """
+    proposer = ProposerAgent(
+        model=configuration.proposer_model,
+        enable_cache=configuration.enable_response_cache,
+        timeout=configuration.llm_timeout,
+        max_retries=configuration.llm_max_retries,
+        max_tokens=configuration.proposal_max_tokens
+    )
+    
+    # 初始化多个评估代理，每个关注不同的方面
+    critics = {
+        focus: CriticAgent(
+            model=configuration.critic_model,
+            focus=focus,
+            cache=critic_cache,
+            route_by_focus=configuration.route_critic_models,
+            focus_models=dict(configuration.critic_focus_models),
+            timeout=configuration.llm_timeout,
+            max_retries=configuration.llm_max_retries
+        )
+        for focus in (Focus.LOGIC, Focus.COMPLETENESS, Focus.FEASIBILITY)
+    }
+    
+    # 合并评估代理，失败时退回上面的逐维度评估
+    multi_critic = MultiCriticAgent(
+        model=configuration.critic_model,
+        focuses=list(critics),
+        timeout=configuration.llm_timeout,
+        max_retries=configuration.llm_max_retries
+    ) if configuration.merge_critics else None
+    
+    optimizer = OptimizerAgent(
+        model=configuration.optimizer_model,
+        fused=configuration.optimizer_fused,
+        excellent_score=configuration.excellent_score,
+        speculative=configuration.speculative_optimizer,
+        enable_cache=configuration.enable_response_cache,
+        timeout=configuration.llm_timeout,
+        max_retries=configuration.llm_max_retries,
+        max_tokens=configuration.proposal_max_tokens,
+        analysis_max_tokens=configuration.analysis_max_tokens
+    )
+    
+    return proposer, critics, multi_critic, optimizer
+
+
 class ProposalWorkflow:
     """提案工作流
     
@@ -55,11 +130,59 @@ class ProposalWorkflow:
     """
     
     def __init__(self):
-        """初始化工作流"""
-        self.proposer = None
-        self.critics = {}  # 存储不同focus的评估代理
-        self.optimizer = None
-        self.configuration = None
+        """初始化工作流
+        
+        同一工作流可能并发运行多次（如 run_batch），每次运行的配置都从 RunnableConfig 中读取，
+        不保存在实例上；代理按配置构造并在本工作流内复用，代理本身不保存单次调用的状态。
+        """
+        # 按配置（以及评估缓存）缓存代理，相同配置的运行复用同一组代理，
+        # 避免每次运行都重新渲染提示、包装结构化输出模型
+        self._build_agents = functools.lru_cache(maxsize=8)(_build_agents)
+        self.semantic_caches: Dict[Tuple[str, float], SemanticCache] = {}  # 跨迭代、跨运行共享的语义缓存
+        self.embeddings = None  # 各语义缓存共用的向量模型
+        self.graph = None  # 编译后的工作流图，批量运行时共用
+    
+    def _get_embeddings(self) -> DashScopeEmbeddings:
+        """获取语义缓存共用的向量模型"""
+        if self.embeddings is None:
+            self.embeddings = DashScopeEmbeddings()
+        return self.embeddings
+    
+    def _get_semantic_cache(self, name: str, threshold: float) -> SemanticCache:
+        """获取指定用途和相似度阈值的语义缓存
+        
+        Args:
+            name: 缓存用途，如 "critic"、"proposal"
+            threshold: 相似度阈值
+            
+        Returns:
+            SemanticCache: 本工作流内共享的语义缓存
+        """
+        key = (name, threshold)
+        cache = self.semantic_caches.get(key)
+        if cache is None:
+            cache = self.semantic_caches[key] = SemanticCache(
+                embeddings=self._get_embeddings(),
+                similarity_threshold=threshold
+            )
+        return cache
+    
+    def _get_agents(
+        self,
+        configuration: Configuration
+    ) -> Tuple[ProposerAgent, Dict[Focus, CriticAgent], Optional[MultiCriticAgent], OptimizerAgent]:
+        """获取配置对应的代理
+        
+        Args:
+            configuration: 本次运行的配置
+            
+        Returns:
+            (提案生成代理, 各维度评估代理, 合并评估代理, 优化代理)
+        """
+        critic_cache = self._get_semantic_cache(
+            "critic", configuration.critic_cache_threshold
+        ) if configuration.enable_critic_cache else None
+        return self._build_agents(configuration, critic_cache)
     
     async def _init_agents(self, state: ProposalState, config: RunnableConfig) -> Dict[str, Any]:
         """初始化代理
@@ -69,33 +192,33 @@ class ProposalWorkflow:
             config: 运行时配置
             
         Returns:
-            更新后的状态
+            需要更新的状态字段
         """
         try:
             # 从配置中获取参数
-            self.configuration = Configuration.from_runnable_config(config)
+            configuration = Configuration.from_runnable_config(config)
             
-            # 初始化代理
-            self.proposer = ProposerAgent(model=self.configuration.proposer_model)
+            # 所有代理的模型调用共用同一组并发和速率限制
+            configure_llm_bulkhead(
+                max_concurrent=configuration.llm_max_concurrency,
+                tpm=configuration.llm_tokens_per_minute,
+                rpm=configuration.llm_requests_per_minute
+            )
             
-            # 初始化多个评估代理，每个关注不同的方面
-            critic_model = self.configuration.critic_model
-            self.critics = {
-                "logic": CriticAgent(model=critic_model, focus="logic"),
-                "completeness": CriticAgent(model=critic_model, focus="completeness"),
-                "feasibility": CriticAgent(model=critic_model, focus="feasibility")
-            }
+            # 提前构造本次运行使用的代理，之后的节点按同一配置直接取用
+            self._get_agents(configuration)
             
-            self.optimizer = OptimizerAgent(model=self.configuration.optimizer_model)
-            
-            # 更新状态中的配置参数
-            state.max_iterations = self.configuration.max_iterations
-            state.excellent_score = self.configuration.excellent_score
-            
-            return state.__dict__
+            # 更新状态中的配置参数；目标和约束条件在整个运行中不变，
+            # 格式化一次后供提案生成和各轮评估共用，各次调用的提示前缀也因此保持一致
+            return {
+                "max_iterations": configuration.max_iterations,
+                "excellent_score": configuration.excellent_score,
+                "goals_text": format_goals(state.goals),
+                "constraints_text": format_constraints(state.constraints)
+            }
         
         except Exception as e:
-            logger.error(f"初始化代理失败: {str(e)}")
+            logger.error("初始化代理失败: %s", e, exc_info=True)
             raise
     
     async def _wait_user_feedback(self, state: ProposalState) -> Dict[str, Any]:
@@ -105,7 +228,7 @@ class ProposalWorkflow:
             state: 当前状态
             
         Returns:
-            更新后的状态
+            需要更新的状态字段
         """
         # 获取最新的提案和评估结果
         latest_proposal = state.current_proposal
@@ -126,8 +249,9 @@ class ProposalWorkflow:
         )
         
         # 更新评估结果
+        update: Dict[str, Any] = {}
         if isinstance(evaluation_feedback, dict) and state.evaluations:
-            state.evaluations[-1].update(evaluation_feedback)
+            update["evaluations"] = [*state.evaluations[:-1], {**state.evaluations[-1], **evaluation_feedback}]
         
         # 获取用户的继续/停止决定
         action = interrupt(
@@ -140,124 +264,275 @@ class ProposalWorkflow:
         )
         
         # 更新状态
-        if action == "stop":
-            state.status = "completed"
-        else:
-            state.status = "refine"
+        update["status"] = "completed" if action == "stop" else "refine"
         
-        return state.__dict__
+        return update
 
-    async def _generate_proposal(self, state: ProposalState) -> Dict[str, Any]:
+    @staticmethod
+    def _append_history(history: List[Any], item: Any, limit: int) -> List[Any]:
+        """追加一个新版本，只保留最近若干个版本
+        
+        Args:
+            history: 已有的提案或评估列表
+            item: 新版本
+            limit: 保留的版本数，0 表示全部保留
+            
+        Returns:
+            新的列表，不修改 history
+        """
+        start = max(len(history) + 1 - limit, 0) if limit > 0 else 0
+        return [*history[start:], item]
+    
+    async def _retrieve_references(self, input: str) -> List[Dict[str, Any]]:
+        """检索与输入相关的参考资料
+        
+        相同输入复用进程内缓存的检索结果；向量检索是同步调用，放到线程中执行，
+        避免阻塞事件循环上的其他工作流。
+        
+        Args:
+            input: 输入问题
+            
+        Returns:
+            参考资料列表
+        """
+        from proposer.tools import retrieve_documents
+        retrieved_docs = await asyncio.to_thread(retrieve_documents, input)
+        
+        return [
+            {
+                "type": "document",
+                "content": doc["content"],
+                "metadata": doc["metadata"]
+            }
+            for doc in retrieved_docs
+        ]
+    
+    async def _generate_proposal(self, state: ProposalState, config: RunnableConfig) -> Dict[str, Any]:
         """生成或优化提案
         
         Args:
             state: 当前状态
+            config: 运行时配置
             
         Returns:
-            更新后的状态
+            需要更新的状态字段
         """
         try:
             current_state = state
+            configuration = Configuration.from_runnable_config(config)
+            proposer, _, _, optimizer = self._get_agents(configuration)
             
-            # 自动从 RAG 中检索相关文档
-            from proposer.tools import get_rag_tool
-            rag_tool = get_rag_tool()
-            references = []
-            retrieved_docs = rag_tool.retrieve(current_state.input)
+            if current_state.speculative_proposal is not None:
+                # 上一轮评估期间已经投机生成了下一版提案，直接采用
+                return {
+                    "iteration": current_state.iteration + 1,
+                    "proposals": self._append_history(
+                        current_state.proposals, current_state.speculative_proposal, configuration.max_history
+                    ),
+                    "speculative_proposal": None,
+                    "status": "generated"
+                }
             
-            for doc in retrieved_docs:
-                references.append({
-                    "type": "document",
-                    "content": doc["content"],
-                    "metadata": doc["metadata"]
-                })
+            update: Dict[str, Any] = {}
             
             if not current_state.proposals:
-                # 首次生成提案
-                proposal = await self.proposer.generate(
-                    input=current_state.input,
-                    constraints=current_state.constraints,
-                    goals=current_state.goals,
-                    references=references  # 传入检索到的参考资料
+                # 自动从 RAG 中检索相关文档；输入在迭代中不变，优化时直接复用保存在状态中的结果
+                references = await self._retrieve_references(current_state.input)
+                update["references"] = references
+                
+                # 首次生成提案；目标、约束和检索到的参考资料都相同时，
+                # 相同或高度相似的输入直接复用已生成的提案；检索缓存随索引版本失效，
+                # 知识库重新索引后参考资料变化，提案缓存也随之失效
+                cache_scope = make_cache_key(
+                    "proposal",
+                    configuration.proposer_model,
+                    current_state.goals,
+                    current_state.constraints,
+                    references
                 )
+                proposal = None
+                proposal_cache = self._get_semantic_cache(
+                    "proposal", configuration.proposal_cache_threshold
+                ) if configuration.enable_proposal_cache else None
+                if proposal_cache is not None:
+                    proposal = await proposal_cache.aget(cache_scope, current_state.input)
+                
+                if proposal is None:
+                    generate_kwargs = {
+                        "input": current_state.input,
+                        "constraints": current_state.constraints,
+                        "goals": current_state.goals,
+                        "references": references,  # 传入检索到的参考资料
+                        "goals_text": current_state.goals_text,
+                        "constraints_text": current_state.constraints_text
+                    }
+                    if configuration.stream_proposer:
+                        # 流式生成初始提案，生成的片段可通过 stream_mode="messages" 实时获取
+                        proposal = "".join([
+                            chunk async for chunk in proposer.generate_stream(**generate_kwargs)
+                        ])
+                    else:
+                        proposal = await proposer.generate(**generate_kwargs)
+                    if proposal_cache is not None:
+                        await proposal_cache.aput(cache_scope, current_state.input, proposal)
+            elif configuration.stream_optimizer:
+                # 流式优化现有提案，生成的片段可通过 stream_mode="messages" 实时获取
+                chunks = []
+                async for chunk in optimizer.optimize_proposal_stream(
+                    current_proposal=current_state.current_proposal,
+                    evaluations=current_state.evaluations,
+                    references=current_state.references  # 复用首次检索到的参考资料
+                ):
+                    chunks.append(chunk)
+                proposal = "".join(chunks)
             else:
                 # 优化现有提案
-                proposal = await self.optimizer.optimize_proposal(
+                proposal = await optimizer.optimize_proposal(
                     current_proposal=current_state.current_proposal,
                     evaluations=current_state.evaluations,
-                    references=references  # 传入检索到的参考资料
+                    references=current_state.references  # 复用首次检索到的参考资料
                 )
             
-            # 更新状态
-            current_state.iteration += 1
-            current_state.proposals.append(proposal)
-            current_state.status = "generated"
-            
-            return current_state.__dict__
+            # 更新状态；列表只复制引用，不复制提案文本
+            update.update({
+                "iteration": current_state.iteration + 1,
+                "proposals": self._append_history(current_state.proposals, proposal, configuration.max_history),
+                "status": "generated"
+            })
+            return update
         
         except Exception as e:
-            logger.error(f"生成提案失败: {str(e)}")
+            logger.error("生成提案失败: %s", e, exc_info=True)
             raise
     
-    async def _evaluate_proposal(self, state: ProposalState) -> Dict[str, Any]:
+    async def _evaluate_proposal(self, state: ProposalState, config: RunnableConfig) -> Dict[str, Any]:
         """评估提案
         
         Args:
             state: 当前状态
+            config: 运行时配置
             
         Returns:
-            更新后的状态
+            需要更新的状态字段
         """
+        speculative_task = None
         try:
             current_state = state
+            configuration = Configuration.from_runnable_config(config)
+            _, critics, multi_critic, optimizer = self._get_agents(configuration)
             
-            # 使用多个评估代理对提案进行多维度评估
-            evaluation_results = {}
-            
-            # 对每个维度进行评估
-            for focus, critic in self.critics.items():
-                result = await critic.evaluate_proposal(
-                    input=current_state.input,
-                    proposal_content=current_state.current_proposal,
-                    goals=current_state.goals,
-                    constraints=current_state.constraints
+            # 投机迭代：基于上一轮评估，在评估当前提案的同时生成下一版提案。
+            # 首轮没有可用的评估，最后一轮之后也不会再优化，这两种情况不投机
+            if (
+                configuration.speculative_refine
+                and current_state.evaluations
+                and current_state.iteration < current_state.max_iterations
+            ):
+                speculative_task = asyncio.create_task(
+                    self._draft_speculative_proposal(current_state, optimizer)
                 )
-                evaluation_results[focus] = result
             
-            # 计算综合评分（各维度的平均值）
-            overall_score = sum(result["score"] for result in evaluation_results.values()) / len(evaluation_results)
+            # 目标和约束条件文本在初始化时已格式化，所有评估维度直接复用
+            evaluation_kwargs = {
+                "input": current_state.input,
+                "proposal_content": current_state.current_proposal,
+                "goals": current_state.goals,
+                "constraints": current_state.constraints,
+                "goals_text": current_state.goals_text,
+                "constraints_text": current_state.constraints_text
+            }
+            
+            evaluation_results = None
+            if multi_critic is not None:
+                # 一次调用评估所有维度，提案上下文只发送一次
+                try:
+                    evaluation_results = await multi_critic.evaluate_proposal(**evaluation_kwargs)
+                except Exception as e:
+                    logger.warning("合并评估失败，退回逐维度评估: %s", e)
+            
+            if evaluation_results is None:
+                # 使用多个评估代理对提案进行多维度评估，各维度相互独立，并发执行；
+                # 任一维度失败时取消其余仍在进行的评估，不再为注定失败的一轮继续消耗 token
+                try:
+                    async with asyncio.TaskGroup() as task_group:
+                        tasks = {
+                            focus: task_group.create_task(critic.evaluate_proposal(**evaluation_kwargs))
+                            for focus, critic in critics.items()
+                        }
+                except ExceptionGroup as eg:
+                    # 保持与逐个评估时相同的异常类型
+                    raise eg.exceptions[0]
+                evaluation_results = {focus: task.result() for focus, task in tasks.items()}
+            
+            # 计算综合评分（各维度的平均值），fsum 避免浮点累加误差
+            scores = [result["score"] for result in evaluation_results.values()]
+            overall_score = math.fsum(scores) / len(scores)
             
-            # 整合评估结果
+            # 整合评估结果和所有维度的建议，跳过没有建议的维度
             combined_evaluation = {
                 "score": overall_score,
                 "dimensions": evaluation_results,
-                "suggestions": []
+                "suggestions": list(itertools.chain.from_iterable(
+                    [f"[{focus}] {suggestion}" for suggestion in result["suggestions"]]
+                    for focus, result in evaluation_results.items()
+                    if result.get("suggestions")
+                ))
             }
             
-            # 整合所有维度的建议
-            for focus, result in evaluation_results.items():
-                combined_evaluation["suggestions"].extend([
-                    f"[{focus}] {suggestion}" for suggestion in result.get("suggestions", [])
-                ])
-            
             # 更新状态
-            current_state.evaluations.append(combined_evaluation)
-            current_state.status = "evaluated"
+            update = {
+                "evaluations": self._append_history(
+                    current_state.evaluations, combined_evaluation, configuration.max_history
+                ),
+                "status": "evaluated"
+            }
+            
+            if speculative_task is not None:
+                # 只有本轮不会结束时才需要投机生成的提案，否则取消并丢弃；
+                # 评分为0-1范围，优秀标准为10分制
+                if overall_score * 10.0 < current_state.excellent_score:
+                    try:
+                        update["speculative_proposal"] = await speculative_task
+                    except Exception as e:
+                        # 投机失败不影响本轮评估，下一轮按常规流程优化
+                        logger.warning("投机生成提案失败，将按常规流程优化: %s", e)
+                    speculative_task = None
             
-            return current_state.__dict__
+            return update
             
         except Exception as e:
-            logger.error(f"评估提案失败: {str(e)}")
+            logger.error("评估提案失败: %s", e, exc_info=True)
             raise
+        
+        finally:
+            if speculative_task is not None and not speculative_task.done():
+                speculative_task.cancel()
+    
+    @staticmethod
+    async def _draft_speculative_proposal(state: ProposalState, optimizer: OptimizerAgent) -> str:
+        """基于已有评估投机生成下一版提案
+        
+        Args:
+            state: 当前状态，最新提案尚未评估
+            optimizer: 本次运行使用的优化代理
+            
+        Returns:
+            优化后的提案
+        """
+        return await optimizer.optimize_proposal(
+            current_proposal=state.current_proposal,
+            evaluations=list(state.evaluations),
+            references=state.references
+        )
     
-    async def _arbitrate(self, state: ProposalState) -> Union[str, Tuple[str, ProposalState]]:
+    async def _arbitrate(self, state: ProposalState) -> Dict[str, Any]:
         """仲裁决定是否需要继续优化
         
         Args:
             state: 当前状态
             
         Returns:
-            更新后的状态
+            需要更新的状态字段
         """
         try:
             # 获取最新的评估结果
@@ -266,18 +541,19 @@ class ProposalWorkflow:
             # 判断是否需要继续优化
             if state.iteration >= state.max_iterations:
                 # 达到最大迭代次数
-                state.status = "completed"
-            elif latest_evaluation["score"] >= state.excellent_score:
-                # 评分达到优秀标准
-                state.status = "completed"
+                status = "completed"
+            elif latest_evaluation["score"] * 10.0 >= state.excellent_score:
+                # 评分（0-1范围）换算为10分制后达到优秀标准
+                status = "completed"
             else:
                 # 需要继续优化
-                state.status = "refine"
+                return {"status": "refine"}
             
-            return state.__dict__
+            # 工作流结束，丢弃未使用的投机提案
+            return {"status": status, "speculative_proposal": None}
             
         except Exception as e:
-            logger.error(f"仲裁失败: {str(e)}")
+            logger.error("仲裁失败: %s", e, exc_info=True)
             raise
     
     def create_graph(self) -> Any:
@@ -315,13 +591,87 @@ class ProposalWorkflow:
         # 设置工作流名称
         workflow.name = "Proposal Workflow"
         
-        # 添加 checkpointer 支持 interrupt
-        checkpointer = MemorySaver()
+        # 添加 checkpointer 支持 interrupt，较大的通道值压缩后保存
+        checkpointer = create_checkpointer()
         workflow = workflow.compile(checkpointer=checkpointer)
         
         return workflow
 
 
+    def _get_graph(self) -> Any:
+        """获取编译后的工作流图，首次调用时编译"""
+        if self.graph is None:
+            self.graph = self.create_graph()
+        return self.graph
+    
+    async def astream_proposal(
+        self,
+        proposal_input: ProposalInput,
+        config: Optional[RunnableConfig] = None
+    ) -> AsyncIterator[str]:
+        """运行工作流并实时返回提案生成和优化过程中的文本片段
+        
+        需要在配置中开启 stream_proposer 和/或 stream_optimizer，
+        未开启流式的节点会在生成完成后一次性返回整段内容。
+        
+        Args:
+            proposal_input: 提案输入
+            config: 运行时配置，未指定 thread_id 时自动生成
+            
+        Yields:
+            提案的文本片段
+        """
+        config = config or {}
+        configurable = config.get("configurable") or {}
+        run_config = {
+            **config,
+            "configurable": {"thread_id": str(uuid.uuid4()), **configurable}
+        }
+        
+        async for message, metadata in self._get_graph().astream(
+            asdict(proposal_input), config=run_config, stream_mode="messages"
+        ):
+            if metadata.get("langgraph_node") == "propose" and message.content:
+                yield message.content
+    
+    async def run_batch(
+        self,
+        inputs: Sequence[ProposalInput],
+        config: Optional[RunnableConfig] = None,
+        concurrency: int = 8
+    ) -> List[Dict[str, Any]]:
+        """并发运行多个相互独立的提案工作流
+        
+        所有输入共用同一个编译后的工作流图和同一份配置，每个输入使用独立的线程ID，
+        各次运行的状态和配置互不影响；
+        模型调用同时受所在事件循环的调用隔板限制。
+        
+        Args:
+            inputs: 提案输入列表
+            config: 运行时配置，configurable 中的 thread_id 会被忽略
+            concurrency: 同时运行的工作流数上限
+            
+        Returns:
+            List[Dict[str, Any]]: 与 inputs 顺序一致的最终状态
+        """
+        graph = self._get_graph()
+        config = config or {}
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run_one(proposal_input: ProposalInput) -> Dict[str, Any]:
+            async with semaphore:
+                run_config = {
+                    **config,
+                    "configurable": {
+                        **(config.get("configurable") or {}),
+                        "thread_id": str(uuid.uuid4())
+                    }
+                }
+                return await graph.ainvoke(asdict(proposal_input), config=run_config)
+        
+        return await asyncio.gather(*(run_one(proposal_input) for proposal_input in inputs))
+
+
 def create_graph():
     """创建提案工作流图
     
@@ -4,19 +4,45 @@ These tools are intended as free examples to get started. For production use,
 consider implementing more robust and specialized tools tailored to your needs.
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
 import os
+import threading
 from dotenv import load_dotenv
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+from proposer.cache import ResponseCache, make_cache_key
 from rag.rag import RAGTool
 from rag.cos_document_processor import TencentCOSDocumentProcessor
 
 # 创建 RAG 工具实例
 _rag_tool = None
+_rag_tool_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# 默认提示模板中固定的角色和要求
+RAG_PROMPT_PREFIX = """你是一个专业的助手。请基于下面的参考文档回答用户的问题。
+
+要求：
+1. 请基于参考文档提供准确、相关的回答
+2. 如果参考文档中没有相关信息，请明确说明"抱歉，参考文档中没有相关信息"
+3. 回答要简洁、专业，并确保信息的准确性
+4. 如果需要引用具体内容，请说明出处
+
+"""
+
+# 默认提示模板中随每次调用变化的参考文档和问题
+RAG_PROMPT_SUFFIX = """参考文档:
+{context}
+
+用户问题: {question}
+
+请回答："""
+
 def get_rag_tool(prompt_template: Optional[str] = None) -> RAGTool:
     """获取或创建 RAG 工具实例
     
@@ -28,48 +54,141 @@ def get_rag_tool(prompt_template: Optional[str] = None) -> RAGTool:
     """
     global _rag_tool
     
-    if _rag_tool is None:
-        if prompt_template is None:
-            prompt_template = """你是一个专业的助手。请基于以下参考文档回答用户的问题。
-
-参考文档:
-{context}
-
-用户问题: {question}
-
-要求：
-1. 请基于参考文档提供准确、相关的回答
-2. 如果参考文档中没有相关信息，请明确说明"抱歉，参考文档中没有相关信息"
-3. 回答要简洁、专业，并确保信息的准确性
-4. 如果需要引用具体内容，请说明出处
-
-请回答："""
+    # 已创建时直接返回，不需要加锁
+    if _rag_tool is not None:
+        return _rag_tool
+    
+    # 并发的工具调用可能同时首次获取，加锁后再次检查，保证只创建一个实例（只建立一次索引）
+    with _rag_tool_lock:
+        if _rag_tool is None:
+            if prompt_template is None:
+                prompt_template = RAG_PROMPT_PREFIX + RAG_PROMPT_SUFFIX
         
-        # 获取环境变量中的 Tencent COS 凭证
-        secret_id = os.getenv("TENCENT_COS_SECRET_ID")
-        secret_key = os.getenv("TENCENT_COS_SECRET_KEY")
-        region = os.getenv("TENCENT_COS_REGION", "ap-shanghai")
-        bucket = os.getenv("TENCENT_COS_BUCKET", "rag-1309172277")
+            # 获取环境变量中的 Tencent COS 凭证
+            secret_id = os.getenv("TENCENT_COS_SECRET_ID")
+            secret_key = os.getenv("TENCENT_COS_SECRET_KEY")
+            region = os.getenv("TENCENT_COS_REGION", "ap-shanghai")
+            bucket = os.getenv("TENCENT_COS_BUCKET", "rag-1309172277")
         
-        # 检查必要的凭证是否存在
-        if not secret_id or not secret_key:
-            raise ValueError("TENCENT_COS_SECRET_ID 和 TENCENT_COS_SECRET_KEY 环境变量必须设置")
+            # 检查必要的凭证是否存在
+            if not secret_id or not secret_key:
+                raise ValueError("TENCENT_COS_SECRET_ID 和 TENCENT_COS_SECRET_KEY 环境变量必须设置")
         
-        # 创建 RAG 工具实例
-        _rag_tool = RAGTool(
-            prompt_template=prompt_template,
-            document_processor=TencentCOSDocumentProcessor(
-                secret_id=secret_id,
-                secret_key=secret_key,
-                region=region,
-                bucket=bucket
+            # 创建 RAG 工具实例
+            # 在后台建立索引，第一次检索时才等待索引就绪
+            _rag_tool = RAGTool(
+                prompt_template=prompt_template,
+                background_index=True,
+                document_processor=TencentCOSDocumentProcessor(
+                    secret_id=secret_id,
+                    secret_key=secret_key,
+                    region=region,
+                    bucket=bucket
+                )
             )
-        )
     
     return _rag_tool
 
-@tool
-def rag_search(query: str) -> str:
+def preload_rag_tool() -> threading.Thread:
+    """在后台线程中预先创建 RAG 工具
+    
+    在应用启动时调用，提前开始检查或建立向量索引，第一次检索时索引通常已经就绪。
+    
+    Returns:
+        执行预加载的后台线程
+    """
+    def preload() -> None:
+        try:
+            get_rag_tool()
+        except Exception as e:
+            logger.warning("预加载 RAG 工具失败: %s", e)
+    
+    thread = threading.Thread(target=preload, name="rag-tool-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+# 检索结果缓存的有效期（秒）
+RETRIEVE_CACHE_TTL = 600.0
+
+# 按 (索引版本, 规范化后的查询, k) 缓存的检索结果；检索在线程池中执行，读写需要加锁
+_retrieve_cache = ResponseCache(maxsize=128, ttl=RETRIEVE_CACHE_TTL)
+_retrieve_cache_lock = threading.Lock()
+
+
+def _cached_retrieve(query: str, k: int) -> Tuple[Dict[str, Any], ...]:
+    """按规范化后的查询缓存检索结果
+    
+    缓存键包含 RAG 工具的索引版本，索引重建或增量更新后旧的结果不再命中；
+    空结果不缓存，知识库补充文档后可以立即检索到。
+    """
+    rag_tool = get_rag_tool()
+    with _retrieve_cache_lock:
+        cached = _retrieve_cache.get(make_cache_key(rag_tool.index_version, query, k))
+    if cached is not None:
+        return cached
+    
+    # retrieve 会等待索引就绪，之后读取的版本即为本次检索使用的索引版本
+    documents = tuple(rag_tool.retrieve(query, k=k))
+    if documents:
+        with _retrieve_cache_lock:
+            _retrieve_cache.put(make_cache_key(rag_tool.index_version, query, k), documents)
+    return documents
+
+
+def retrieve_documents(query: str, k: int = 3) -> List[Dict[str, Any]]:
+    """检索相关文档，相同查询在进程内复用检索结果
+    
+    提案迭代过程中输入不变，跨请求也经常出现相同的问题，缓存后无需重复进行向量检索；
+    缓存在 RETRIEVE_CACHE_TTL 秒后过期，索引重建或更新后立即失效。
+    查询中的空白字符会先规范化，仅空白不同的查询视为同一查询。
+    
+    Args:
+        query: 查询文本
+        k: 返回的文档数量
+        
+    Returns:
+        相关文档列表，每个文档包含内容和元数据；文档和其中的元数据都是副本，可以安全修改
+    """
+    normalized = " ".join(query.split())
+    return [{**doc, "metadata": dict(doc.get("metadata") or {})} for doc in _cached_retrieve(normalized, k)]
+
+
+async def rag_retrieve_many(queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+    """批量检索多个查询的相关文档
+    
+    所有查询一次向量化、一次检索索引，每个查询的结果与单独检索相同。
+    
+    Args:
+        queries: 查询文本列表
+        k: 每个查询返回的文档数量
+        
+    Returns:
+        与 queries 顺序一致的检索结果，每个结果为相关文档列表
+    """
+    rag_tool = await asyncio.to_thread(get_rag_tool)
+    return await rag_tool.aretrieve_batch(queries, k=k)
+
+
+def _format_documents(documents: List[Dict[str, Any]]) -> str:
+    """将检索结果整理为工具返回的文本"""
+    if not documents:
+        return "未找到相关文档"
+    return "\n".join(
+        f"文档 {i}:\n{doc['content']}\n"
+        for i, doc in enumerate(documents, 1)
+    )
+
+
+def _format_batch(queries: List[str], results: List[List[Dict[str, Any]]]) -> str:
+    """将批量检索结果按查询分组整理为工具返回的文本"""
+    return "\n".join(
+        f"查询: {query}\n{_format_documents(documents)}"
+        for query, documents in zip(queries, results)
+    )
+
+
+def _rag_search(query: str) -> str:
     """从知识库中搜索并回答问题。
     
     Args:
@@ -84,8 +203,17 @@ def rag_search(query: str) -> str:
     except Exception as e:
         return f"执行 RAG 搜索时出错: {str(e)}"
 
-@tool
-def rag_retrieve(query: str) -> str:
+
+async def _arag_search(query: str) -> str:
+    """rag_search 的异步实现，首次调用时在线程中创建 RAG 工具，避免阻塞事件循环"""
+    try:
+        rag_tool = await asyncio.to_thread(get_rag_tool)
+        return await rag_tool.aquery(query)
+    except Exception as e:
+        return f"执行 RAG 搜索时出错: {str(e)}"
+
+
+def _rag_retrieve(query: str) -> str:
     """从知识库中仅检索相关文档，不生成回答。
     
     Args:
@@ -96,17 +224,54 @@ def rag_retrieve(query: str) -> str:
     """
     try:
         rag_tool = get_rag_tool()
-        documents = rag_tool.retrieve(query)
-        if not documents:
-            return "未找到相关文档"
-        
-        results = []
-        for i, doc in enumerate(documents, 1):
-            results.append(f"文档 {i}:\n{doc.page_content}\n")
+        return _format_documents(rag_tool.retrieve(query))
+    except Exception as e:
+        return f"执行文档检索时出错: {str(e)}"
+
+
+async def _arag_retrieve(query: str) -> str:
+    """rag_retrieve 的异步实现"""
+    try:
+        rag_tool = await asyncio.to_thread(get_rag_tool)
+        return _format_documents(await rag_tool.aretrieve(query))
+    except Exception as e:
+        return f"执行文档检索时出错: {str(e)}"
+
+
+def _rag_retrieve_batch(queries: List[str]) -> str:
+    """一次检索多个查询的相关文档，不生成回答。需要从多个角度查找资料时使用。
+    
+    Args:
+        queries: 要搜索的查询文本列表
         
-        return "\n".join(results)
+    Returns:
+        按查询分组的相关文档内容
+    """
+    try:
+        rag_tool = get_rag_tool()
+        return _format_batch(queries, rag_tool.retrieve_batch(queries))
     except Exception as e:
         return f"执行文档检索时出错: {str(e)}"
 
+
+async def _arag_retrieve_batch(queries: List[str]) -> str:
+    """rag_retrieve_batch 的异步实现"""
+    try:
+        return _format_batch(queries, await rag_retrieve_many(queries))
+    except Exception as e:
+        return f"执行文档检索时出错: {str(e)}"
+
+
+# 同时提供同步和异步实现，LangGraph 节点中 await 工具时直接走异步接口，可以并发执行
+rag_search = StructuredTool.from_function(
+    func=_rag_search, coroutine=_arag_search, name="rag_search"
+)
+rag_retrieve = StructuredTool.from_function(
+    func=_rag_retrieve, coroutine=_arag_retrieve, name="rag_retrieve"
+)
+rag_retrieve_batch = StructuredTool.from_function(
+    func=_rag_retrieve_batch, coroutine=_arag_retrieve_batch, name="rag_retrieve_batch"
+)
+
 # 导出工具列表
-TOOLS = [rag_search, rag_retrieve]
+TOOLS = [rag_search, rag_retrieve, rag_retrieve_batch]
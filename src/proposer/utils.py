@@ -1,41 +1,64 @@
-from langchain_community.chat_models.tongyi import ChatTongyi
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+import asyncio
+import functools
+import logging
 import os
-from typing import Union, Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Type, Union, Optional
 
-def init_custom_chat_model(model_name: str, api_version: str = "v1") -> Union[ChatTongyi, ChatOpenAI]:
+from proposer.bulkhead import estimate_tokens, get_llm_bulkhead
+
+# 两个聊天模型类的导入开销都较大，每次只会用到其中一个，在用到时再导入
+if TYPE_CHECKING:
+    from langchain_community.chat_models.tongyi import ChatTongyi
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+# 通义千问系列视觉和音频模型
+TONGYI_SPECIAL_MODELS = frozenset({
+    "qwen-vl-v1",
+    "qwen-vl-chat-v1",
+    "qwen-audio-turbo",
+    "qwen-vl-plus",
+    "qwen-vl-max"
+})
+
+# 通义千问系列普通模型
+TONGYI_MODELS = frozenset({
+    "qwen-turbo",
+    "qwen-plus",
+    "qwen-max",
+    "qwen-max-1201",
+    "qwen-max-longcontext"
+})
+
+
+@functools.lru_cache(maxsize=8)
+def init_custom_chat_model(
+    model_name: str,
+    max_tokens: Optional[int] = None
+) -> "Union[ChatTongyi, ChatOpenAI]":
     """初始化并返回一个聊天模型实例。
     
     支持通义千问系列模型和通过DashScope兼容OpenAI API的其他模型。
+    相同参数只初始化一次，各智能体共享同一实例；
+    模型实例无调用状态，可在并发的异步调用中安全复用；
+    HTTP 连接由模型 SDK 自行创建和管理。
     
     Args:
         model_name (str): 模型名称，例如 "qwen-max", "deepseek-r1" 等
-        api_version (str, optional): API版本，默认为 "v1"
+        max_tokens (int, optional): 单次生成的最大 token 数，默认不限制
         
     Returns:
         Union[ChatTongyi, ChatOpenAI]: 初始化的聊天模型实例
     """
-    # 通义千问系列视觉和音频模型
-    tongyi_special_models = [
-        "qwen-vl-v1",
-        "qwen-vl-chat-v1",
-        "qwen-audio-turbo",
-        "qwen-vl-plus",
-        "qwen-vl-max"
-    ]
-    
-    # 通义千问系列普通模型
-    tongyi_models = [
-        "qwen-turbo",
-        "qwen-plus",
-        "qwen-max",
-        "qwen-max-1201",
-        "qwen-max-longcontext"
-    ]
-    
     # 如果是通义千问系列模型，使用ChatTongyi
-    if model_name in tongyi_models or model_name in tongyi_special_models:
-        return ChatTongyi(model_name=model_name)
+    if model_name in TONGYI_MODELS or model_name in TONGYI_SPECIAL_MODELS:
+        from langchain_community.chat_models.tongyi import ChatTongyi
+        
+        model_kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+        return ChatTongyi(model_name=model_name, model_kwargs=model_kwargs)
     
     # 否则使用DashScope的OpenAI兼容API
     else:
@@ -43,8 +66,137 @@ def init_custom_chat_model(model_name: str, api_version: str = "v1") -> Union[Ch
         if not api_key:
             raise ValueError("DASHSCOPE_API_KEY environment variable is not set")
         
+        from langchain_openai import ChatOpenAI
+        
         return ChatOpenAI(
             model=model_name,
             api_key=api_key,
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
+            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            max_tokens=max_tokens
         )
+
+
+@functools.lru_cache(maxsize=32)
+def init_structured_model(
+    model_name: str,
+    schema: Type[BaseModel],
+    max_tokens: Optional[int] = None
+) -> Runnable:
+    """获取输出指定结构的聊天模型
+    
+    with_structured_output 需要从 pydantic 模型推导 JSON Schema 并包装工具调用，
+    按模型参数和输出结构缓存后，进程内的各个代理实例共享同一个结构化模型。
+    
+    Args:
+        model_name: 模型名称
+        schema: 输出结构对应的 pydantic 模型
+        max_tokens: 单次生成的最大 token 数
+        
+    Returns:
+        Runnable: 输出 schema 实例的结构化模型
+    """
+    return init_custom_chat_model(model_name, max_tokens).with_structured_output(schema)
+
+
+async def ainvoke_with_retry(
+    runnable: Runnable,
+    input: Any,
+    timeout: Optional[float] = None,
+    max_retries: int = 0,
+    backoff: float = 1.0,
+    max_tokens: Optional[int] = None
+) -> Any:
+    """带超时和重试的模型调用
+    
+    每次调用前先通过进程内共享的调用隔板预留并发和速率额度；
+    单次调用超过 timeout 秒即取消，按指数退避（backoff * 2^n 秒）重试，
+    避免个别卡住的请求拖住整个工作流。
+    
+    Args:
+        runnable: 需要调用的模型
+        input: 模型输入（消息列表）
+        timeout: 单次调用的超时秒数，为None时不限制，不含排队等待的时间
+        max_retries: 超时后的最大重试次数
+        backoff: 首次重试前的等待秒数
+        max_tokens: 本次调用的输出 token 上限，用于预留 TPM 额度
+        
+    Returns:
+        模型响应
+        
+    Raises:
+        asyncio.TimeoutError: 所有尝试均超时
+        BulkheadRejected: 调用隔板为不等待模式且超出限制
+    """
+    tokens = estimate_tokens(input) + (max_tokens or 0)
+    for attempt in range(max_retries + 1):
+        try:
+            async with get_llm_bulkhead().reserve(tokens):
+                return await asyncio.wait_for(runnable.ainvoke(input=input), timeout)
+        except asyncio.TimeoutError:
+            if attempt == max_retries:
+                raise
+            delay = backoff * 2 ** attempt
+            logger.warning("模型调用超时（%s 秒），%.1f 秒后第 %d 次重试", timeout, delay, attempt + 1)
+            await asyncio.sleep(delay)
+
+
+async def astream_with_limits(
+    runnable: Runnable,
+    input: Any,
+    timeout: Optional[float] = None,
+    max_tokens: Optional[int] = None
+) -> AsyncIterator[Any]:
+    """带调用隔板和超时的流式模型调用
+    
+    与 ainvoke_with_retry 一样先通过调用隔板预留并发和速率额度，整个流式输出期间占用一个并发名额；
+    timeout 限制的是等待下一个输出块的时间。输出已经开始后无法重新调用，因此超时不重试。
+    
+    Args:
+        runnable: 需要调用的模型
+        input: 模型输入（消息列表）
+        timeout: 等待下一个输出块的超时秒数，为None时不限制
+        max_tokens: 本次调用的输出 token 上限，用于预留 TPM 额度
+        
+    Yields:
+        模型输出的数据块
+        
+    Raises:
+        asyncio.TimeoutError: 等待输出块超时
+        BulkheadRejected: 调用隔板为不等待模式且超出限制
+    """
+    tokens = estimate_tokens(input) + (max_tokens or 0)
+    async with get_llm_bulkhead().reserve(tokens):
+        stream = runnable.astream(input=input)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(stream), timeout)
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+def format_goals(goals: List[str]) -> str:
+    """将目标列表格式化为提示词中的列表文本
+    
+    Args:
+        goals: 目标列表
+        
+    Returns:
+        每行一个目标的文本
+    """
+    return "\n".join(f"- {goal}" for goal in goals)
+
+
+def format_constraints(constraints: List[Dict[str, str]]) -> str:
+    """将约束条件格式化为提示词中的列表文本
+    
+    Args:
+        constraints: 约束条件列表，每项包含 type 和 value
+        
+    Returns:
+        每行一个约束条件的文本
+    """
+    return "\n".join(f"- {c['type']}: {c['value']}" for c in constraints)
@@ -1,19 +1,111 @@
 import os
+import asyncio
+import functools
+import gzip
+import hashlib
+import importlib.util
+import itertools
 import logging
+import multiprocessing
+import shutil
+import sys
+import threading
 import uuid
 import tempfile
-from typing import List, Dict, Any, Callable, Optional
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+)
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
 from langchain.schema import Document
 from qcloud_cos import CosConfig, CosS3Client
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 from .pdf_processor import PDFProcessor
+from .document_processor import build_metadata_filter
 
 logger = logging.getLogger(__name__)
 
+# 下载PDF写入临时文件时每次读取的字节数
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# 本地缓存下载内容时的 gzip 压缩级别，压缩级别低、CPU 开销小，仍能明显减少磁盘占用
+CACHE_COMPRESS_LEVEL = 1
+
+# 安装了 tiktoken 时按 token 数分割文本，否则按字符数分割
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# COS 客户端连接池的大小；并发下载时每个线程占用一个连接，池太小时多出的连接用完即关，
+# 下次请求需要重新进行 TLS 握手
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
+
+# delete_objects 单次请求最多删除的对象数
+DELETE_BATCH_SIZE = 1000
+
+# 分割时缓存的片段 token 数条目数
+TOKEN_LENGTH_CACHE_SIZE = 4096
+
+# 异步加载时已处理完、等待写入索引的批次数上限
+MAX_PENDING_BATCHES = 4
+
+# 新增文档的对象键后缀：进程启动时随机生成一次前缀，之后按递增序号区分，
+# 不需要每次都读取系统随机数，同一进程生成的键按添加顺序排列
+_DOC_ID_PREFIX = uuid.uuid4().hex[:8]
+_doc_id_sequence = itertools.count()
+
+# 通用分割器的分隔符，按优先级从高到低
+TEXT_SEPARATORS = ["\n\n", "\n", ". ", "? ", "! ", "；", "。", " ", ""]
+
+
+class LoadAborted(RuntimeError):
+    """异步加载被取消或写入阶段已退出时，由处理回调抛出，终止整个加载过程"""
+
+
+def _chunk_metadata(
+    headers: Dict[str, str],
+    base_meta: Dict[str, Any],
+    chunk_id: int,
+    chunk_count: int
+) -> Dict[str, Any]:
+    """构造单个分片的元数据
+    
+    headers 只可能来自 MarkdownHeaderTextSplitter，取值都是标题文本，直接驻留而不逐个判断类型；
+    同一标题下的分割各自带有一份相同的标题文本，驻留后共用同一个字符串对象。
+    通用分割器生成的分片没有标题元数据，只复制公共元数据。
+    
+    Args:
+        headers: 分割器生成的标题元数据
+        base_meta: 同一文件的所有分片共用的元数据
+        chunk_id: 分片序号
+        chunk_count: 文件的分片总数
+        
+    Returns:
+        分片的元数据字典
+    """
+    if headers:
+        return {
+            **{k: sys.intern(v) for k, v in headers.items()},
+            **base_meta,
+            'chunk_id': chunk_id,
+            'chunk_count': chunk_count
+        }
+    return {**base_meta, 'chunk_id': chunk_id, 'chunk_count': chunk_count}
+
+
 class TencentCOSDocumentProcessor:
     """基于腾讯云 COS 的 DocumentProcessor 实现"""
     
-    def __init__(self, secret_id: str, secret_key: str, region: str, bucket: str):
+    def __init__(
+        self,
+        secret_id: str,
+        secret_key: str,
+        region: str,
+        bucket: str,
+        max_workers: int = 16,
+        chunk_tokens: int = 512,
+        chunk_overlap_tokens: int = 50,
+        pdf_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ):
         """初始化 COS 客户端
         
         Args:
@@ -21,24 +113,310 @@ class TencentCOSDocumentProcessor:
             secret_key: COS 的 Secret Key
             region: COS 存储桶所在区域（如 'ap-guangzhou'）
             bucket: COS 存储桶名称
+            max_workers: 加载文档时并发下载的线程数
+            chunk_tokens: 安装了 tiktoken 时每个分片的最大 token 数
+            chunk_overlap_tokens: 安装了 tiktoken 时相邻分片重叠的 token 数
+            pdf_workers: 加载文档时解析PDF的进程数，默认为CPU核数，为0时在当前线程中解析
+            cache_dir: 下载内容的本地缓存目录，默认为当前目录下的 knowledge/cos_cache，
+                为空字符串时不使用缓存
         """
         # 初始化COS配置
         self.config = CosConfig(
             Region=region,
             Secret_id=secret_id,
             Secret_key=secret_key,
-            Scheme="https"
+            Scheme="https",
+            PoolConnections=POOL_CONNECTIONS,
+            PoolMaxSize=max(POOL_MAXSIZE, max_workers)
         )
+        # 客户端内部的 HTTP 会话在所有方法和下载线程之间共用，连接保持复用
         self.client = CosS3Client(self.config)
         self.bucket = bucket
         self.base_prefix = "documents/"  # COS 中的文档存储前缀
+        self.max_workers = max_workers
+        self.pdf_workers = (os.cpu_count() or 1) if pdf_workers is None else pdf_workers
+        self.cache_dir = os.path.join(os.getcwd(), "knowledge", "cos_cache") if cache_dir is None else cache_dir
+        # 已建立索引的向量数据库，由 RAG 工具在索引就绪后设置，用于 search_documents
+        self.vector_store = None
+        
+        # 分割器不保存分割过程中的状态，初始化时构造一次，所有文件共用
+        # Markdown文件按标题层级分割
+        self._md_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=[
+            ("#", "header_1"),
+            ("##", "header_2"),
+            ("###", "header_3"),
+            ("####", "header_4"),
+        ])
+        # 其他文本文件，以及没有标题的Markdown文件使用通用分割器。
+        # 按 token 数分割时分片大小与向量模型的输入长度直接对应，不会因中英文字符的
+        # token 密度不同而产生过长或过短的分片；未安装 tiktoken 时按字符数分割
+        if TIKTOKEN_AVAILABLE:
+            import tiktoken
+            
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+            # 递归分割在合并相邻片段时会反复计算同一片段的长度，按片段缓存 token 数
+            self._token_length = functools.lru_cache(maxsize=TOKEN_LENGTH_CACHE_SIZE)(
+                lambda text: len(self._encoding.encode_ordinary(text))
+            )
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_tokens,
+                chunk_overlap=chunk_overlap_tokens,
+                length_function=self._token_length,
+                separators=TEXT_SEPARATORS
+            )
+            # 分割方式的描述，分割参数变化后已有的分片需要重新生成
+            self.chunking = f"tiktoken:{chunk_tokens}:{chunk_overlap_tokens}"
+        else:
+            self._encoding = None
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1800,
+                chunk_overlap=200,
+                length_function=len,
+                separators=TEXT_SEPARATORS
+            )
+            self.chunking = "chars:1800:200"
+        
+    def _cache_path(self, key: str, etag: str) -> Optional[str]:
+        """获取对象在本地缓存中的路径
+        
+        每个对象键对应一个子目录，其中按 ETag 保存各版本的内容，对象更新后旧版本可以直接清理。
+        
+        Args:
+            key: 对象键
+            etag: 对象的 ETag
+            
+        Returns:
+            缓存文件路径，未启用缓存或没有 ETag 时返回 None
+        """
+        if not self.cache_dir or not etag:
+            return None
+        key_dir = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        version = etag.strip('"')
+        return os.path.join(self.cache_dir, key_dir, f"{version}.gz")
+    
+    def _read_content(self, stream: Any, is_pdf: bool) -> Union[bytes, str]:
+        """读取对象内容：PDF分块写入临时文件并返回路径，其他文件返回完整内容"""
+        if not is_pdf:
+            return stream.read()
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+            try:
+                shutil.copyfileobj(stream, temp_file, DOWNLOAD_CHUNK_SIZE)
+            except BaseException:
+                temp_file.close()
+                os.unlink(temp_file.name)
+                raise
+        return temp_file.name
+    
+    def _write_cache(self, cache_path: str, content: Union[bytes, str]) -> None:
+        """将下载的内容压缩写入本地缓存，并删除同一对象旧版本的缓存
+        
+        先写入临时文件再重命名，并发下载或中途失败时不会留下不完整的缓存文件。
+        
+        Args:
+            cache_path: 缓存文件路径
+            content: 对象内容，或PDF的临时文件路径
+        """
+        key_dir = os.path.dirname(cache_path)
+        os.makedirs(key_dir, exist_ok=True)
+        temp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with gzip.open(temp_path, 'wb', compresslevel=CACHE_COMPRESS_LEVEL) as cache_file:
+                if isinstance(content, bytes):
+                    cache_file.write(content)
+                else:
+                    with open(content, 'rb') as pdf_file:
+                        shutil.copyfileobj(pdf_file, cache_file, DOWNLOAD_CHUNK_SIZE)
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        
+        for name in os.listdir(key_dir):
+            path = os.path.join(key_dir, name)
+            if name.endswith('.gz') and path != cache_path:
+                os.unlink(path)
+    
+    def _download(self, key: str, etag: str = "") -> Union[bytes, str]:
+        """下载单个对象的内容
+        
+        PDF需要落盘后才能解析，直接把响应流分块写入临时文件，
+        不在内存中保留整个文件的内容；其他文件返回完整内容。
+        启用本地缓存时按 (Key, ETag) 优先读取缓存，未命中时从 COS 下载后写入缓存，
+        反复加载同一批文档时不需要重新下载。
+        
+        Args:
+            key: 对象键
+            etag: 对象的 ETag，为空时不使用缓存
+            
+        Returns:
+            PDF返回临时文件路径（由 _process_file 负责删除），其他文件返回对象内容
+        """
+        is_pdf = os.path.splitext(key)[1].lower() == '.pdf'
+        cache_path = self._cache_path(key, etag)
+        
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                with gzip.open(cache_path, 'rb') as cache_file:
+                    return self._read_content(cache_file, is_pdf)
+            except (OSError, EOFError) as e:
+                logger.warning(f"读取缓存失败 {key}，重新下载: {e}")
+        
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        content = self._read_content(response['Body'].get_raw_stream(), is_pdf)
+        
+        if cache_path is not None:
+            try:
+                self._write_cache(cache_path, content)
+            except OSError as e:
+                logger.warning(f"写入缓存失败 {key}: {e}")
+        return content
+    
+    def _iter_objects(self) -> Iterator[Dict[str, Any]]:
+        """分页列出文档前缀下的所有对象（跳过目录）
+        
+        每页最多 1000 个对象。拿到一页后立即在后台线程中请求下一页，
+        调用方处理当前页的对象时下一页的列举请求已经在进行，省去每页一次的请求往返等待。
+        
+        Yields:
+            list_objects 返回的对象信息，包含 Key、ETag、Size 等
+        """
+        def list_page(marker: str) -> Dict[str, Any]:
+            return self.client.list_objects(
+                Bucket=self.bucket,
+                Prefix=self.base_prefix,
+                Marker=marker,
+                MaxKeys=1000
+            )
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(list_page, "")
+            while next_page is not None:
+                response = next_page.result()
+                # 先提交下一页的请求，再返回当前页的对象
+                next_page = (
+                    executor.submit(list_page, response['NextMarker'])
+                    if response.get('IsTruncated', False) else None
+                )
+                for item in response.get('Contents', []):
+                    if not item['Key'].endswith('/'):
+                        yield item
+    
+    def fingerprint(self) -> str:
+        """计算文档集合的指纹
+        
+        只列出对象而不下载内容，根据所有对象的 Key、ETag 和 Size 计算，
+        任何文档新增、删除或修改都会改变指纹；分割方式变化时指纹也会变化。
+        
+        Returns:
+            SHA-256 十六进制摘要
+        """
+        digest = hashlib.sha256(f"{self.chunking}\n".encode('utf-8'))
+        for key, etag, size in sorted(
+            (item['Key'], item.get('ETag', ''), str(item.get('Size', '')))
+            for item in self._iter_objects()
+        ):
+            digest.update(f"{key}\t{etag}\t{size}\n".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def document_versions(self) -> Dict[str, str]:
+        """列出当前所有文档的版本
+        
+        Returns:
+            对象键到 ETag 的映射，与索引中分片元数据的 etag 字段对应
+        """
+        return {item['Key']: item.get('ETag', '') for item in self._iter_objects()}
+    
+    def _iter_downloads(self, items: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Future]]:
+        """在线程池中并发下载对象，按下载完成的顺序返回
+        
+        下载以网络等待为主，多个请求并发可以显著缩短整体耗时；CosS3Client 可以在线程间共享。
+        同时提交的下载数不超过线程数的两倍，已下载但尚未处理的内容不会无限堆积在内存中。
+        
+        Args:
+            items: 需要下载的 (对象键, ETag)
+            
+        Yields:
+            (对象键, 下载任务)，通过 future.result() 获取内容或下载时的异常
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {
+                executor.submit(self._download, key, etag): key
+                for key, etag in itertools.islice(items, self.max_workers * 2)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = pending.pop(future)
+                    # 每完成一个下载就补充提交一个
+                    for next_key, next_etag in itertools.islice(items, 1):
+                        pending[executor.submit(self._download, next_key, next_etag)] = next_key
+                    yield key, future
         
-    def _process_file(self, key: str, content: bytes) -> List[Document]:
+    def _base_metadata(self, key: str, etag: str = "") -> Dict[str, Any]:
+        """构造同一文件的所有文档共用的元数据，每个文件只构造一次
+        
+        Args:
+            key: 文件名
+            etag: 对象的 ETag，用于增量索引时判断文件是否变化
+            
+        Returns:
+            元数据字典
+        """
+        return {
+            'Key': key,
+            'etag': etag,
+            'source': f"cos://{self.bucket}/{key}",
+            'bucket': self.bucket,
+            'created_at': "unknown",
+            'title': os.path.basename(key)
+        }
+    
+    def _add_pdf_metadata(self, key: str, documents: List[Document], etag: str = "") -> List[Document]:
+        """为PDF解析出的每页文档添加通用元数据
+        
+        Args:
+            key: 文件名
+            documents: PDFProcessor.extract_text_from_pdf 返回的文档列表
+            etag: 对象的 ETag
+            
+        Returns:
+            添加元数据后的文档列表
+        """
+        base_meta = self._base_metadata(key, etag)
+        for doc in documents:
+            doc.metadata.update(base_meta)
+        return documents
+    
+    def _fast_split(self, text: str) -> List[Document]:
+        """使用通用分割器分割文本
+        
+        按 token 数分割时先对整篇文本做一次编码，不超过分片大小的文本直接作为一个分片，
+        不再进入递归分割逐段计算长度；较长的文本交给分割器，片段长度通过缓存计算。
+        
+        Args:
+            text: 文本内容
+            
+        Returns:
+            分割后的Document列表
+        """
+        if self._encoding is not None:
+            stripped = text.strip()
+            if not stripped:
+                return []
+            if len(self._encoding.encode_ordinary(stripped)) <= self._text_splitter._chunk_size:
+                return [Document(page_content=stripped, metadata={})]
+        return self._text_splitter.create_documents([text])
+    
+    def _process_file(self, key: str, content: Union[bytes, str], etag: str = "") -> List[Document]:
         """处理单个文件
         
         Args:
             key: 文件名
-            content: 文件内容
+            content: 文件内容；PDF也可以是已下载到本地的临时文件路径，处理后删除
+            etag: 对象的 ETag
             
         Returns:
             Document列表
@@ -48,25 +426,20 @@ class TencentCOSDocumentProcessor:
         
         if ext == '.pdf':
             # 处理PDF文件
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(content)
-                temp_file.flush()
-                try:
-                    documents = PDFProcessor.extract_text_from_pdf(temp_file.name)
-                    # 添加通用元数据
-                    for doc in documents:
-                        doc.metadata.update({
-                            'Key': key,
-                            'source': f"cos://{self.bucket}/{key}",
-                            'bucket': self.bucket,
-                            'created_at': "unknown",
-                            'title': os.path.basename(key)
-                        })
-                    return documents
-                finally:
-                    # 清理临时文件
-                    os.unlink(temp_file.name)
+            if isinstance(content, bytes):
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+                    temp_file.write(content)
+                pdf_path = temp_file.name
+            else:
+                pdf_path = content
+            try:
+                return self._add_pdf_metadata(key, PDFProcessor.extract_text_from_pdf(pdf_path), etag)
+            finally:
+                # 清理临时文件
+                os.unlink(pdf_path)
         else:
+            base_meta = self._base_metadata(key, etag)
+            
             # 处理文本文件
             try:
                 text = content.decode('utf-8')
@@ -80,132 +453,200 @@ class TencentCOSDocumentProcessor:
             if ext == '.md':
                 logger.info(f"使用MarkdownHeaderTextSplitter处理Markdown文件: {key}")
                 
-                # 定义Markdown标题层级
-                headers_to_split_on = [
-                    ("#", "header_1"),
-                    ("##", "header_2"),
-                    ("###", "header_3"),
-                    ("####", "header_4"),
-                ]
-                
                 # 使用Markdown专用分割器
-                md_splitter = MarkdownHeaderTextSplitter(headers_to_split_on=headers_to_split_on)
-                md_splits = md_splitter.split_text(text)
+                md_splits = self._md_splitter.split_text(text)
                 
                 # 如果Markdown分割器没有产生分割（可能没有标题），则使用通用分割器作为后备
                 if md_splits:
                     splits = md_splits
                 else:
                     logger.info(f"Markdown文件没有标题，使用RecursiveCharacterTextSplitter作为后备: {key}")
-                    text_splitter = RecursiveCharacterTextSplitter(
-                        chunk_size=1800,
-                        chunk_overlap=200,
-                        length_function=len,
-                        separators=["\n\n", "\n", ". ", "? ", "! ", "；", "。", " ", ""]
-                    )
-                    splits = text_splitter.create_documents([text])
+                    splits = self._fast_split(text)
             else:
                 # 对其他文本文件使用通用分割器
                 logger.info(f"使用RecursiveCharacterTextSplitter处理文本文件: {key}")
-                text_splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=1800,
-                    chunk_overlap=200,
-                    length_function=len,
-                    separators=["\n\n", "\n", ". ", "? ", "! ", "；", "。", " ", ""]
-                )
-                splits = text_splitter.create_documents([text])
+                splits = self._fast_split(text)
+            
+            base_meta['type'] = 'markdown' if ext == '.md' else 'text'
             
             # 为每个分割添加元数据
+            chunk_count = len(splits)
             for i, split in enumerate(splits):
-                split.metadata.update({
-                    'Key': key,
-                    'source': f"cos://{self.bucket}/{key}",
-                    'type': 'markdown' if ext == '.md' else 'text',
-                    'bucket': self.bucket,
-                    'created_at': "unknown",
-                    'title': os.path.basename(key),
-                    'chunk_id': i,
-                    'chunk_count': len(splits)
-                })
+                split.metadata = _chunk_metadata(split.metadata, base_meta, i, chunk_count)
             
             # 如果没有分割（文本很短），则创建一个文档
             if not splits:
                 logger.info(f"文件内容很短，不需要分割: {key}")
-                doc = Document(
-                    page_content=text,
-                    metadata={
-                        'Key': key,
-                        'source': f"cos://{self.bucket}/{key}",
-                        'type': 'markdown' if ext == '.md' else 'text',
-                        'bucket': self.bucket,
-                        'created_at': "unknown",
-                        'title': os.path.basename(key)
-                    }
-                )
-                return [doc]
+                return [Document(page_content=text, metadata=base_meta)]
             
             return splits
     
     def load_and_index_files(
         self,
-        processing_callback: Callable[[List[Document]], None]
+        processing_callback: Callable[[List[Document]], None],
+        keys: Optional[Iterable[str]] = None
     ) -> None:
         """加载并索引COS中的文档
         
+        PDF解析是CPU密集型操作，受GIL限制无法在线程中并行，下载完成的PDF提交到进程池解析，
+        多个PDF同时占用多个CPU核；文本文件的分割开销较小，仍在当前线程中处理。
+        进程池在 Windows 和 macOS 上以 spawn 方式启动子进程，调用方的入口脚本需要放在
+        ``if __name__ == "__main__":`` 保护之下。
+        
         Args:
-            processing_callback: 文档处理回调函数
+            processing_callback: 文档处理回调函数，抛出 LoadAborted 时停止加载并向上抛出，
+                其他异常只跳过当前文件
+            keys: 只加载这些对象键对应的文档，为None时加载所有文档
         """
+        only_keys = None if keys is None else set(keys)
         try:
-            # 列出所有文档
-            response = self.client.list_objects(
-                Bucket=self.bucket,
-                Prefix=self.base_prefix
-            )
-            
-            if 'Contents' not in response:
-                logger.warning(f"No documents found in bucket {self.bucket}")
-                return
-            
             # 批量处理文档
             batch_size = 10
             current_batch = []
+            file_count = 0
             
-            for item in response['Contents']:
-                key = item['Key']
-                
-                # 跳过目录
-                if key.endswith('/'):
-                    continue
-                    
-                # 获取文件内容
+            def emit(documents: List[Document]) -> None:
+                nonlocal current_batch
+                current_batch.extend(documents)
+                # 达到批处理大小时处理
+                if len(current_batch) >= batch_size:
+                    processing_callback(current_batch)
+                    current_batch = []
+            
+            def collect_pdf(future: Future) -> None:
+                key, pdf_path = pdf_pending.pop(future)
                 try:
-                    response = self.client.get_object(
-                        Bucket=self.bucket,
-                        Key=key
-                    )
-                    content = response['Body'].get_raw_stream().read()
-                    
-                    # 处理文件
-                    documents = self._process_file(key, content)
-                    current_batch.extend(documents)
-                    
-                    # 达到批处理大小时处理
-                    if len(current_batch) >= batch_size:
-                        processing_callback(current_batch)
-                        current_batch = []
-                        
+                    emit(self._add_pdf_metadata(key, future.result(), etags[key]))
+                except LoadAborted:
+                    raise
                 except Exception as e:
                     logger.error(f"处理文件 {key} 时出错: {str(e)}")
-                    continue
+                finally:
+                    # 清理临时文件
+                    os.unlink(pdf_path)
+            
+            # 本次加载的对象键到 ETag 的映射
+            etags: Dict[str, str] = {}
+            
+            def iter_items() -> Iterator[Tuple[str, str]]:
+                for item in self._iter_objects():
+                    if only_keys is None or item['Key'] in only_keys:
+                        etags[item['Key']] = item.get('ETag', '')
+                        yield item['Key'], etags[item['Key']]
+            
+            # 正在子进程中解析的PDF：任务 -> (对象键, 临时文件路径)
+            pdf_pending: Dict[Future, Tuple[str, str]] = {}
+            # 加载通常在后台线程中进行，同时还有下载线程在运行；fork 出的子进程可能继承
+            # 这些线程持有的锁而死锁，因此用 spawn 启动全新的解释器
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=self.pdf_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            ) if self.pdf_workers > 0 else None
+            
+            try:
+                # 分页列出所有文档，并发下载文件内容，按完成顺序依次处理
+                for key, future in self._iter_downloads(iter_items()):
+                    file_count += 1
+                    try:
+                        content = future.result()
+                        
+                        if pdf_executor is not None and os.path.splitext(key)[1].lower() == '.pdf':
+                            # _download 已将PDF写入临时文件，子进程只需要接收文件路径
+                            pdf_pending[pdf_executor.submit(PDFProcessor.extract_text_from_pdf, content)] = (key, content)
+                        else:
+                            # 处理文件
+                            emit(self._process_file(key, content, etags[key]))
+                            
+                    except LoadAborted:
+                        raise
+                    except Exception as e:
+                        logger.error(f"处理文件 {key} 时出错: {str(e)}")
+                        continue
+                    
+                    # 及时收集已经解析完成的PDF
+                    for pdf_future in [f for f in pdf_pending if f.done()]:
+                        collect_pdf(pdf_future)
+                
+                # 等待剩余的PDF解析完成
+                for pdf_future in as_completed(list(pdf_pending)):
+                    collect_pdf(pdf_future)
+            finally:
+                if pdf_executor is not None:
+                    pdf_executor.shutdown(cancel_futures=True)
+                # 异常退出时清理尚未收集的临时文件
+                for _, pdf_path in pdf_pending.values():
+                    os.unlink(pdf_path)
             
             # 处理剩余的文档
             if current_batch:
                 processing_callback(current_batch)
+            
+            if not file_count:
+                logger.warning(f"No documents found in bucket {self.bucket}")
                 
         except Exception as e:
             logger.error(f"加载文档时出错: {str(e)}")
             raise
     
+    async def aload_and_index_files(
+        self,
+        processing_callback: Callable[[List[Document]], None],
+        keys: Optional[Iterable[str]] = None,
+        max_pending_batches: int = MAX_PENDING_BATCHES
+    ) -> None:
+        """以流水线方式加载并索引COS中的文档
+        
+        分为两个阶段，通过有界队列连接：
+        1. 列举、下载、解析和分割文件，即 load_and_index_files，在后台线程中运行
+        2. 调用 processing_callback 向量化并写入索引，在另一个线程中依次处理队列中的批次
+        
+        同步版本中回调执行期间下载和解析都停下等待；这里两个阶段同时进行，
+        总耗时接近较慢的一个阶段，而不是两者之和。队列满时第一阶段暂停，
+        已处理但尚未写入的文档不会无限堆积。
+        
+        Args:
+            processing_callback: 文档处理回调函数，在工作线程中调用
+            keys: 只加载这些对象键对应的文档，为None时加载所有文档
+            max_pending_batches: 等待写入索引的批次数上限
+        """
+        loop = asyncio.get_running_loop()
+        batches: asyncio.Queue = asyncio.Queue(maxsize=max_pending_batches)
+        stopped = threading.Event()
+        
+        def enqueue(batch: List[Document]) -> None:
+            # 在加载线程中调用，队列满时阻塞，直到写入阶段取走批次或加载被中止；
+            # 中止后抛出 LoadAborted，加载线程不再继续列举、下载和解析剩余的文件
+            if stopped.is_set():
+                raise LoadAborted("文档加载已中止")
+            future = asyncio.run_coroutine_threadsafe(batches.put(batch), loop)
+            while True:
+                try:
+                    return future.result(timeout=1.0)
+                except TimeoutError:
+                    if stopped.is_set():
+                        future.cancel()
+                        raise LoadAborted("文档加载已中止")
+        
+        async def produce() -> None:
+            # 加载失败时 TaskGroup 会取消写入阶段，不需要发送结束标记
+            await asyncio.to_thread(self.load_and_index_files, enqueue, keys)
+            await batches.put(None)
+        
+        async def consume() -> None:
+            while (batch := await batches.get()) is not None:
+                try:
+                    await asyncio.to_thread(processing_callback, batch)
+                except Exception as e:
+                    # 与同步版本一致，写入失败的批次记录日志后跳过
+                    logger.error(f"索引 {len(batch)} 个文档时出错: {str(e)}")
+        
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(produce())
+                tg.create_task(consume())
+        finally:
+            stopped.set()
+    
     def clear_all(self) -> None:
         """清空 COS 中的所有文档"""
         logger.info(f"清空 COS 存储桶 {self.bucket} 中的文档")
@@ -214,11 +655,21 @@ class TencentCOSDocumentProcessor:
             response = self.client.list_objects(
                 Bucket=self.bucket,
                 Prefix=self.base_prefix,
-                Marker=marker
+                Marker=marker,
+                MaxKeys=DELETE_BATCH_SIZE
             )
             contents = response.get('Contents', [])
-            for obj in contents:
-                self.client.delete_object(Bucket=self.bucket, Key=obj['Key'])
+            # 每页最多 1000 个对象，正好一次批量删除
+            for start in range(0, len(contents), DELETE_BATCH_SIZE):
+                result = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        'Object': [{'Key': obj['Key']} for obj in contents[start:start + DELETE_BATCH_SIZE]],
+                        'Quiet': 'true'
+                    }
+                )
+                for error in result.get('Error', []):
+                    logger.warning(f"删除文档失败 {error.get('Key')}: {error.get('Message')}")
             if not response.get('IsTruncated', False):
                 break
             marker = response['NextMarker']
@@ -233,7 +684,7 @@ class TencentCOSDocumentProcessor:
         Returns:
             文档ID（COS 中的对象键）
         """
-        doc_id = f"{self.base_prefix}{metadata.get('title', 'doc')}_{os.urandom(8).hex()}"
+        doc_id = f"{self.base_prefix}{metadata.get('title', 'doc')}_{_DOC_ID_PREFIX}{next(_doc_id_sequence):08x}"
         self.client.put_object(
             Bucket=self.bucket,
             Key=doc_id,
@@ -267,9 +718,15 @@ class TencentCOSDocumentProcessor:
     ) -> List[Document]:
         """搜索 COS 中的文档
         
-        注意: COS 不支持原生搜索，此处仅为示例，实际需结合向量存储
+        设置了向量数据库时直接在已建立的索引中进行相似度检索，元数据过滤条件交给向量数据库处理；
+        否则退回逐个下载对象并按元数据过滤（COS 不支持原生搜索）。
         """
         logger.info(f"搜索文档: {query}")
+        if self.vector_store is not None:
+            return self.vector_store.similarity_search(
+                query, k=top_k, filter=build_metadata_filter(filter_dict)
+            )
+        
         results = []
         marker = ""
         while len(results) < top_k:
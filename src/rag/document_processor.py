@@ -2,6 +2,22 @@ from typing import List, Dict, Any, Optional, Callable
 from langchain.schema import Document
 from typing import Protocol
 
+
+def build_metadata_filter(filter_dict: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """将按字段取值过滤的条件转换为向量数据库（Chroma）的 where 过滤条件
+    
+    参数:
+        filter_dict: 元数据字段到期望取值的映射
+    
+    返回值:
+        Chroma 的过滤条件；多个字段时用 $and 组合，没有条件时返回 None
+    """
+    if not filter_dict:
+        return None
+    if len(filter_dict) == 1:
+        return dict(filter_dict)
+    return {"$and": [{key: value} for key, value in filter_dict.items()]}
+
 class DocumentProcessor(Protocol):
     """文档处理器接口"""
     
@@ -30,6 +46,18 @@ class DocumentProcessor(Protocol):
         """
         ...
     
+    def fingerprint(self) -> Optional[str]:
+        """计算当前文档集合的指纹
+        
+        返回值:
+            文档集合的摘要，任何文档新增、删除或修改后都会变化；
+            无法高效计算时返回 None，此时每次初始化都会重建索引。
+        
+        说明:
+            RAG 工具据此判断已有的向量索引是否仍与文档一致，一致时跳过重建。
+        """
+        ...
+    
     def clear_all(self) -> None:
         """清空所有文档和向量数据
         
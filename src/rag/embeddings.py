@@ -1,11 +1,53 @@
 """DashScope Embeddings 实现"""
 
-from typing import List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from langchain_community.embeddings import DashScopeEmbeddings as LangchainDashScopeEmbeddings
+from langchain_community.embeddings.dashscope import embed_with_retry
+
+from .limits import LoopSemaphore
+import asyncio
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# DashScope 单次向量化请求最多包含的文本数
+EMBEDDING_BATCH_SIZE = 25
+
+# 查询向量缓存的最大条目数
+QUERY_CACHE_SIZE = 4096
+
+# 进程内共享的查询向量 LRU 缓存，键为 (模型名称, 查询文本)。
+# 智能体重试和重新规划时经常重复相同的查询，命中缓存时不再请求向量化服务
+_query_cache: "OrderedDict[Tuple[str, str], Tuple[float, ...]]" = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+# 同一事件循环中同时进行的异步向量化调用数上限，可通过环境变量 DASHSCOPE_EMBED_CONCURRENCY 调整
+_embedding_limit = LoopSemaphore(int(os.getenv("DASHSCOPE_EMBED_CONCURRENCY", "8")))
+
+
+def _get_cached_query(key: Tuple[str, str]) -> Optional[List[float]]:
+    """查找缓存的查询向量，命中时返回副本"""
+    with _query_cache_lock:
+        vector = _query_cache.get(key)
+        if vector is None:
+            return None
+        _query_cache.move_to_end(key)
+    return list(vector)
+
+
+def _cache_query(key: Tuple[str, str], vector: List[float]) -> None:
+    """写入查询向量缓存，超出容量时淘汰最久未使用的条目"""
+    with _query_cache_lock:
+        _query_cache[key] = tuple(vector)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+
 class DashScopeEmbeddings(LangchainDashScopeEmbeddings):
     """DashScope Embeddings 实现
     
@@ -13,6 +55,9 @@ class DashScopeEmbeddings(LangchainDashScopeEmbeddings):
     基于 langchain_community.embeddings.DashScopeEmbeddings 的封装。
     """
     
+    # 批量向量化时同时进行的请求数
+    max_concurrency: int = 8
+    
     def __init__(
         self,
         model: str = "text-embedding-v2",
@@ -24,10 +69,107 @@ class DashScopeEmbeddings(LangchainDashScopeEmbeddings):
         Args:
             model: 模型名称，默认为 text-embedding-v2
             api_key: DashScope API Key，如果不提供则使用环境变量
-            **kwargs: 其他参数
+            **kwargs: 其他参数，如 max_concurrency
         """
         super().__init__(
             model=model,
             dashscope_api_key=api_key,
             **kwargs
         )
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量向量化文本
+        
+        父类按每批 EMBEDDING_BATCH_SIZE 个文本依次请求；文本较多时这里先把输入切成
+        若干连续的分片，在线程池中并发请求，再按原顺序拼接结果。
+        每个分片仍由父类负责分批和限流重试。
+        
+        Args:
+            texts: 需要向量化的文本列表
+            
+        Returns:
+            与 texts 顺序一致的向量列表
+        """
+        shard_count = min(self.max_concurrency, -(-len(texts) // EMBEDDING_BATCH_SIZE))
+        if shard_count <= 1:
+            return super().embed_documents(texts)
+        
+        # 分片大小取批大小的整数倍，避免产生不满一批的额外请求
+        batches_per_shard = -(-len(texts) // (EMBEDDING_BATCH_SIZE * shard_count))
+        shard_size = batches_per_shard * EMBEDDING_BATCH_SIZE
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        
+        embed = super().embed_documents
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            results = list(executor.map(embed, shards))
+        
+        logger.debug("并发向量化 %d 个文本，共 %d 个分片", len(texts), len(shards))
+        return [embedding for shard in results for embedding in shard]
+    
+    def embed_query(self, text: str) -> List[float]:
+        """向量化查询文本，相同模型和文本的结果在进程内缓存
+        
+        向量数据库的相似度检索和检索器都通过该方法向量化查询，缓存对它们同样生效。
+        
+        Args:
+            text: 查询文本
+            
+        Returns:
+            查询向量
+        """
+        key = (self.model, text)
+        vector = _get_cached_query(key)
+        if vector is None:
+            vector = super().embed_query(text)
+            _cache_query(key, vector)
+        return vector
+    
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """批量向量化查询文本
+        
+        与逐个调用 embed_query 的结果相同（按查询类型向量化，共用同一缓存），
+        但未命中缓存的查询每 EMBEDDING_BATCH_SIZE 个只发送一次请求。
+        
+        Args:
+            texts: 查询文本列表
+            
+        Returns:
+            与 texts 顺序一致的向量列表
+        """
+        vectors = {text: _get_cached_query((self.model, text)) for text in texts}
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if missing:
+            embeddings = embed_with_retry(self, input=missing, text_type="query", model=self.model)
+            for text, item in zip(missing, embeddings):
+                vectors[text] = item["embedding"]
+                _cache_query((self.model, text), item["embedding"])
+        return [list(vectors[text]) for text in texts]
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """异步向量化查询文本
+        
+        命中缓存时直接返回；否则在线程中调用 embed_query，同时进行的调用数受并发上限限制。
+        
+        Args:
+            text: 查询文本
+            
+        Returns:
+            查询向量
+        """
+        vector = _get_cached_query((self.model, text))
+        if vector is not None:
+            return vector
+        async with _embedding_limit:
+            return await asyncio.to_thread(self.embed_query, text)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """异步批量向量化文本，同时进行的调用数受并发上限限制
+        
+        Args:
+            texts: 需要向量化的文本列表
+            
+        Returns:
+            与 texts 顺序一致的向量列表
+        """
+        async with _embedding_limit:
+            return await asyncio.to_thread(self.embed_documents, texts)
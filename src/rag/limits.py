@@ -0,0 +1,38 @@
+"""RAG 模块的模型调用并发限制"""
+
+import asyncio
+import weakref
+
+
+class LoopSemaphore:
+    """按事件循环分别创建的信号量
+    
+    asyncio.Semaphore 只能在一个事件循环中使用，而 RAG 工具会在不同线程的不同事件循环中被调用
+    （如建立索引时的 asyncio.run 和 LangGraph 节点所在的事件循环），这里为每个事件循环各自
+    创建一个信号量，各事件循环内的并发数分别不超过上限。
+    """
+    
+    def __init__(self, value: int):
+        """初始化信号量
+        
+        Args:
+            value: 每个事件循环中同时进行的调用数上限
+        """
+        self.value = max(1, value)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    def _get(self) -> asyncio.Semaphore:
+        """获取当前事件循环对应的信号量"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.value)
+        return semaphore
+    
+    async def __aenter__(self) -> None:
+        await self._get().acquire()
+    
+    async def __aexit__(self, *exc_info) -> None:
+        self._get().release()
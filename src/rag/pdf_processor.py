@@ -19,42 +19,30 @@ class PDFProcessor:
         documents = []
         
         try:
-            # 打开PDF文件
-            pdf_document = fitz.open(file_path)
-            
-            # 遍历每一页
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                
-                # 提取文本，使用raw=True以获取更好的文本布局
-                blocks = page.get_text("blocks", sort=True)
-                text_blocks = []
-                
-                # 处理每个文本块
-                for block in blocks:
-                    if block[6] == 0:  # 0表示这是文本块
-                        text_blocks.append(block[4])  # block[4]是文本内容
-                
-                # 合并文本块
-                text = "\n".join(text_blocks)
+            # 打开PDF文件，退出时自动关闭，解析出错时也不会泄漏文件句柄
+            with fitz.open(file_path) as pdf_document:
+                total_pages = pdf_document.page_count
                 
-                # 获取页面元数据
-                metadata = {
-                    "source": file_path,
-                    "page": page_num + 1,
-                    "total_pages": len(pdf_document),
-                    "type": "pdf"
-                }
-                
-                # 创建Document对象
-                doc = Document(
-                    page_content=text.strip(),
-                    metadata=metadata
-                )
-                
-                documents.append(doc)
-            
-            pdf_document.close()
+                # 遍历每一页
+                for page_num, page in enumerate(pdf_document, 1):
+                    # 按阅读顺序提取文本块并合并，block[6]为0表示文本块，block[4]是文本内容
+                    text = "\n".join(
+                        block[4] for block in page.get_text("blocks", sort=True) if block[6] == 0
+                    )
+                    
+                    # 获取页面元数据
+                    metadata = {
+                        "source": file_path,
+                        "page": page_num,
+                        "total_pages": total_pages,
+                        "type": "pdf"
+                    }
+                    
+                    # 创建Document对象
+                    documents.append(Document(
+                        page_content=text.strip(),
+                        metadata=metadata
+                    ))
             
         except Exception as e:
             raise Exception(f"处理PDF文件时出错: {str(e)}")
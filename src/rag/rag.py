@@ -1,10 +1,15 @@
 import os
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import AsyncIterator, List, Dict, Any, Optional
+import numpy as np
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain_chroma import Chroma
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
 
 from .embeddings import DashScopeEmbeddings
 from .rag_model import RAGQwenModel
@@ -12,15 +17,119 @@ from .document_processor import DocumentProcessor
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_PROMPT_TEMPLATE = """使用以下上下文来回答问题。如果你不知道答案，就说你不知道，不要试图编造答案。
+# 提示模板中固定的说明
+DEFAULT_PROMPT_PREFIX = """使用以下上下文来回答问题。如果你不知道答案，就说你不知道，不要试图编造答案。
 
-上下文：
+"""
+
+# 提示模板中随每次调用变化的上下文和问题
+DEFAULT_PROMPT_SUFFIX = """上下文：
 {context}
 
 问题：{question}
 
 答案："""
 
+DEFAULT_PROMPT_TEMPLATE = DEFAULT_PROMPT_PREFIX + DEFAULT_PROMPT_SUFFIX
+
+# 问答和检索默认返回的文档数量
+DEFAULT_TOP_K = 3
+
+# 最大边际相关性（MMR）检索：先取 k 的若干倍候选，再兼顾相关性和多样性从中选出 k 个，
+# 避免内容几乎相同的分片重复占用提示长度
+MMR_FETCH_FACTOR = 4
+MMR_LAMBDA_MULT = 0.5
+
+# 候选文档的最低相关度（0-1，越大越相关），低于该值的候选不参与 MMR 选择；
+# 可通过环境变量 RAG_SCORE_THRESHOLD 调整
+DEFAULT_SCORE_THRESHOLD = 0.4
+
+# 没有检索到任何文档时直接返回的答案，不再调用模型
+NO_CONTEXT_ANSWER = "抱歉，知识库中没有找到相关信息。"
+
+# 向量索引（HNSW）的参数，只在创建集合时生效：
+# 按余弦距离检索；每个节点保留更多邻居、建图时搜索更宽，查询时搜索宽度从默认的 10 提高到 64，
+# 以少量建图时间换取更高的检索召回率
+HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 32,
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 64,
+}
+
+# 建立索引时每次写入向量数据库的分片数，可通过环境变量 RAG_EMBED_BATCH 调整。
+# 向量化时每批再按 25 个文本拆分并发请求，默认值对应 DashScopeEmbeddings 默认的并发数附近
+DEFAULT_EMBED_BATCH = 128
+
+
+def build_search_filter(
+    category: Optional[str] = None,
+    tags: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """根据分类和标签构造向量数据库的元数据过滤条件
+    
+    过滤在向量数据库内完成，只返回满足条件的文档，不需要多取候选再在 Python 中筛选。
+    
+    Args:
+        category: 分类，只返回该分类的文档
+        tags: 标签列表，只返回标签为其中之一的文档
+        
+    Returns:
+        Chroma 的 where 过滤条件，没有条件时返回 None
+    """
+    conditions = []
+    if category:
+        conditions.append({"category": category})
+    if tags:
+        conditions.append({"tags": {"$in": list(tags)}})
+    
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+class BufferedVectorStoreWriter:
+    """攒批写入向量数据库的文档处理回调
+    
+    文档处理器每处理几个文件就回调一次，每次写入都会单独请求一次向量化服务。
+    这里先把分片缓存起来，每攒够 flush_threshold 个写入一次，每次写入的分片数固定，
+    既减少向量化请求的次数，也不会因为某次回调的分片特别多而产生过大的请求；
+    处理结束后需要调用 flush() 写入剩余的分片。
+    """
+    
+    def __init__(self, vectorstore: Chroma, flush_threshold: Optional[int] = None):
+        """初始化写入器
+        
+        Args:
+            vectorstore: 目标向量数据库
+            flush_threshold: 每次写入的分片数；为None时读取环境变量 RAG_EMBED_BATCH，
+                未设置时为 DEFAULT_EMBED_BATCH
+        """
+        if flush_threshold is None:
+            flush_threshold = int(os.getenv("RAG_EMBED_BATCH", DEFAULT_EMBED_BATCH))
+        self.vectorstore = vectorstore
+        self.flush_threshold = max(1, flush_threshold)
+        self._buffer: List[Document] = []
+    
+    def __call__(self, splits: List[Document]) -> None:
+        """缓存一批分片，每攒够 flush_threshold 个写入一次向量数据库"""
+        self._buffer.extend(splits)
+        if len(self._buffer) < self.flush_threshold:
+            return
+        
+        full = len(self._buffer) - len(self._buffer) % self.flush_threshold
+        for start in range(0, full, self.flush_threshold):
+            self.vectorstore.add_documents(self._buffer[start:start + self.flush_threshold])
+        self._buffer = self._buffer[full:]
+    
+    def flush(self) -> None:
+        """写入所有缓存的分片"""
+        if self._buffer:
+            self.vectorstore.add_documents(self._buffer)
+            self._buffer = []
+
+
 class RAGTool:
     """RAG工具类
     
@@ -31,7 +140,10 @@ class RAGTool:
         self,
         document_processor: DocumentProcessor,  
         embedding_model: str = "text-embedding-v2",
-        prompt_template: str = DEFAULT_PROMPT_TEMPLATE
+        prompt_template: str = DEFAULT_PROMPT_TEMPLATE,
+        force_rebuild: Optional[bool] = None,
+        background_index: bool = False,
+        score_threshold: Optional[float] = None
     ):
         """初始化RAG工具
         
@@ -39,6 +151,12 @@ class RAGTool:
             document_processor: 文档处理器实现
             embedding_model: DashScope Embedding模型名称
             prompt_template: 提示模板
+            force_rebuild: 是否忽略已有索引强制重建；为None时读取环境变量
+                RAG_FORCE_RECREATE_VECTOR_DB（取值为 1/true/yes 时重建）
+            background_index: 是否在后台线程中检查和建立索引；为True时构造函数立即返回，
+                索引就绪前的查询和检索会等待索引就绪
+            score_threshold: 检索结果的最低相关度；为None时读取环境变量 RAG_SCORE_THRESHOLD，
+                未设置时为 DEFAULT_SCORE_THRESHOLD
         """
         self.document_processor = document_processor
         self.vector_store_dir = os.path.join(os.getcwd(), "knowledge", "vector_store")
@@ -50,27 +168,187 @@ class RAGTool:
         
         self.embeddings = DashScopeEmbeddings(model=embedding_model)
         
+        if score_threshold is None:
+            score_threshold = float(os.getenv("RAG_SCORE_THRESHOLD", DEFAULT_SCORE_THRESHOLD))
+        self.score_threshold = score_threshold
+        
         # 初始化向量数据库
         self.vectorstore = self._init_vectorstore()
         
-        # 加载并索引文档，使用向量存储回调
-        def vector_store_callback(splits: List[Document]):
-            self.vectorstore.add_documents(splits)
-            
-        self.document_processor.load_and_index_files(
-            processing_callback=vector_store_callback
-        )
+        if force_rebuild is None:
+            force_rebuild = os.getenv("RAG_FORCE_RECREATE_VECTOR_DB", "").lower() in ("1", "true", "yes")
+        
+        # 索引就绪（或初始化失败）时设置
+        self._ready = threading.Event()
+        self._index_error: Optional[BaseException] = None
+        
+        # 索引内容每次重建或更新后递增，调用方可以据此让缓存的检索结果失效
+        self.index_version = 0
+        
+        if background_index:
+            threading.Thread(
+                target=self._background_index,
+                args=(embedding_model, prompt_template, force_rebuild),
+                name="rag-index",
+                daemon=True
+            ).start()
+        else:
+            self._prepare_index(embedding_model, prompt_template, force_rebuild)
+    
+    def _prepare_index(self, embedding_model: str, prompt_template: str, force_rebuild: bool) -> None:
+        """检查并建立向量索引，完成后初始化检索链并标记就绪"""
+        # 文档集合与上次建立索引时一致则直接使用已有索引；向量模型和分割方式未变时
+        # 只重新索引变化的文档，否则清空后重建
+        fingerprint = self.document_processor.fingerprint()
+        manifest = {
+            "embedding_model": embedding_model,
+            "chunking": getattr(self.document_processor, "chunking", None),
+            "index": HNSW_METADATA,
+            "fingerprint": fingerprint
+        }
+        previous = None if force_rebuild else self._read_manifest()
+        # 清单一致但集合为空时（如向量数据库文件被单独删除）清单已不可信，需要重新索引
+        if fingerprint is not None and previous == manifest and self.vectorstore._collection.count() > 0:
+            logger.info("文档未变化，复用已有向量索引")
+        else:
+            if (
+                previous is not None
+                and hasattr(self.document_processor, "document_versions")
+                and all(previous.get(key) == manifest[key] for key in ("embedding_model", "chunking", "index"))
+            ):
+                self._update_index()
+            else:
+                self._rebuild_index()
+            self.index_version += 1
+            if fingerprint is not None:
+                self._write_manifest(manifest)
+        
+        # 索引就绪后交给文档处理器，搜索文档时直接使用向量检索
+        if hasattr(self.document_processor, "vector_store"):
+            self.document_processor.vector_store = self.vectorstore
         
         # 初始化检索链
         self.qa_chain = self._init_qa_chain(prompt_template)
+        self._ready.set()
+    
+    def _background_index(self, embedding_model: str, prompt_template: str, force_rebuild: bool) -> None:
+        """在后台线程中建立索引，失败时记录异常，之后的查询会抛出该错误"""
+        try:
+            self._prepare_index(embedding_model, prompt_template, force_rebuild)
+        except Exception as e:
+            logger.error(f"后台建立向量索引失败: {str(e)}")
+            self._index_error = e
+            self._ready.set()
+    
+    def is_ready(self) -> bool:
+        """索引是否已就绪，可用于服务的就绪检查"""
+        return self._ready.is_set() and self._index_error is None
+    
+    def _wait_ready(self) -> None:
+        """等待索引就绪
+        
+        Raises:
+            RuntimeError: 后台建立索引失败
+        """
+        self._ready.wait()
+        if self._index_error is not None:
+            raise RuntimeError("向量索引初始化失败") from self._index_error
+    
+    async def _await_ready(self) -> None:
+        """在事件循环中等待索引就绪，等待期间不阻塞事件循环"""
+        if not self._ready.is_set():
+            await asyncio.to_thread(self._ready.wait)
+        self._wait_ready()
+        
+    def _init_vectorstore(self, collection_metadata: Optional[Dict[str, Any]] = None):
+        """初始化向量数据库
         
-    def _init_vectorstore(self):
-        """初始化向量数据库"""
+        Args:
+            collection_metadata: 集合不存在时创建集合使用的元数据；打开已有集合时不传，
+                Chroma 不支持修改已有集合的距离函数等索引参数
+        """
         return Chroma(
             persist_directory=self.vector_store_dir,
-            embedding_function=self.embeddings
+            embedding_function=self.embeddings,
+            collection_metadata=collection_metadata
         )
 
+    @property
+    def _manifest_path(self) -> str:
+        """索引清单文件路径，与向量数据库存放在同一目录"""
+        return os.path.join(self.vector_store_dir, "manifest.json")
+    
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        """读取上次建立索引时的清单，不存在或无法解析时返回 None"""
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        """在索引建立完成后写入清单"""
+        with open(self._manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    
+    def _remove_manifest(self) -> None:
+        """删除清单，更新索引中途失败时下次启动会重新检查索引"""
+        if os.path.exists(self._manifest_path):
+            os.remove(self._manifest_path)
+    
+    def _rebuild_index(self) -> None:
+        """清空向量数据库并重新加载、索引所有文档"""
+        self._remove_manifest()
+        self.vectorstore.delete_collection()
+        self.vectorstore = self._init_vectorstore(HNSW_METADATA)
+        self._load_documents()
+    
+    def _update_index(self) -> None:
+        """增量更新索引
+        
+        根据分片元数据中记录的对象键和 ETag 与文档处理器当前的文档版本比较：
+        删除已不存在或内容已变化的文档的分片，只下载、向量化新增和变化的文档。
+        """
+        self._remove_manifest()
+        
+        indexed: Dict[str, Any] = {}
+        for metadata in self.vectorstore.get(include=["metadatas"])["metadatas"]:
+            if metadata and "Key" in metadata:
+                indexed[metadata["Key"]] = metadata.get("etag")
+        current = self.document_processor.document_versions()
+        
+        stale = [key for key, etag in indexed.items() if current.get(key) != etag]
+        if stale:
+            self.vectorstore.delete(where={"Key": {"$in": stale}})
+        changed = [key for key, etag in current.items() if indexed.get(key) != etag]
+        logger.info(f"增量更新索引：删除 {len(stale)} 个文档的分片，重新索引 {len(changed)} 个文档")
+        
+        if changed:
+            self._load_documents(changed)
+    
+    def _load_documents(self, keys: Optional[List[str]] = None) -> None:
+        """加载并索引文档，分片攒批后写入向量存储
+        
+        Args:
+            keys: 只加载这些文档，为None时加载所有文档
+        """
+        load_kwargs = {} if keys is None else {"keys": keys}
+        writer = BufferedVectorStoreWriter(self.vectorstore)
+        aload = getattr(self.document_processor, "aload_and_index_files", None)
+        try:
+            asyncio.get_running_loop()
+            in_event_loop = True
+        except RuntimeError:
+            in_event_loop = False
+        if aload is not None and not in_event_loop:
+            # 下载解析与向量化写入同时进行
+            asyncio.run(aload(processing_callback=writer, **load_kwargs))
+        else:
+            self.document_processor.load_and_index_files(
+                processing_callback=writer, **load_kwargs
+            )
+        writer.flush()
+
     def _init_qa_chain(self, prompt_template: str) -> RetrievalQA:
         """初始化问答链
         
@@ -80,17 +358,24 @@ class RAGTool:
         Returns:
             RetrievalQA 链
         """
+        # 查询和检索都通过 _search 完成，问答链只使用其中的文档合并链；
+        # 直接调用问答链时使用下面的 MMR 检索器（不过滤相关度）
         retriever = self.vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 3}
+            search_type="mmr",
+            search_kwargs={
+                "k": DEFAULT_TOP_K,
+                "fetch_k": MMR_FETCH_FACTOR * DEFAULT_TOP_K,
+                "lambda_mult": MMR_LAMBDA_MULT
+            }
         )
         
-        prompt = PromptTemplate(
+        # 流式问答时直接使用提示模板和模型，不经过问答链
+        self._prompt = prompt = PromptTemplate(
             template=prompt_template,
             input_variables=["context", "question"]
         )
         
-        llm = RAGQwenModel()
+        self._llm = llm = RAGQwenModel()
         
         return RetrievalQA.from_chain_type(
             llm=llm,
@@ -99,27 +384,82 @@ class RAGTool:
             return_source_documents=True,
             chain_type_kwargs={"prompt": prompt}
         )
-        
-    def query(
+    
+    def _search_by_vectors(
         self,
-        question: str,
-        category: Optional[str] = None,
-        tags: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
-        """查询知识库
+        query_embeddings: List[List[float]],
+        k: int,
+        search_filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Document]]:
+        """按查询向量检索文档
+        
+        所有查询在向量数据库中一次完成检索：每个查询先取 MMR_FETCH_FACTOR * k 个候选，
+        去掉相关度低于 score_threshold 的候选，再用 MMR 兼顾相关性和多样性选出至多 k 个。
         
         Args:
-            question: 问题
-            category: 按分类筛选
-            tags: 按标签筛选
+            query_embeddings: 查询向量列表
+            k: 每个查询返回的文档数量
+            search_filter: 元数据过滤条件
             
         Returns:
-            包含答案和来源文档的字典
+            与 query_embeddings 顺序一致的文档列表，没有足够相关的文档时为空列表
         """
-        result = self.qa_chain.invoke({"query": question})
+        results = self.vectorstore._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=MMR_FETCH_FACTOR * k,
+            where=search_filter,
+            include=["documents", "metadatas", "distances", "embeddings"]
+        )
+        relevance = self.vectorstore._select_relevance_score_fn()
         
+        selected = []
+        for query_embedding, documents, metadatas, distances, embeddings in zip(
+            query_embeddings,
+            results["documents"],
+            results["metadatas"],
+            results["distances"],
+            results["embeddings"]
+        ):
+            candidates = [
+                i for i, distance in enumerate(distances)
+                if relevance(distance) >= self.score_threshold
+            ]
+            picked = maximal_marginal_relevance(
+                np.array(query_embedding, dtype=np.float32),
+                [embeddings[i] for i in candidates],
+                lambda_mult=MMR_LAMBDA_MULT,
+                k=k
+            )
+            selected.append([
+                Document(page_content=documents[candidates[i]], metadata=metadatas[candidates[i]] or {})
+                for i in picked
+            ])
+        return selected
+    
+    def _search(
+        self,
+        query: str,
+        k: int,
+        search_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """检索单个查询的相关文档"""
+        return self._search_by_vectors([self.embeddings.embed_query(query)], k, search_filter)[0]
+    
+    async def _asearch(
+        self,
+        query: str,
+        k: int,
+        search_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """异步检索单个查询的相关文档，向量数据库的查询在线程中执行"""
+        embedding = await self.embeddings.aembed_query(query)
+        return (await asyncio.to_thread(self._search_by_vectors, [embedding], k, search_filter))[0]
+    
+    @staticmethod
+    def _format_answer(answer: str, docs: List[Document]) -> Dict[str, Any]:
+        """整理答案和来源文档"""
         source_docs = []
-        for doc in result.get("source_documents", []):
+        for doc in docs:
             metadata = doc.metadata
             source_docs.append({
                 "content": doc.page_content,
@@ -129,34 +469,241 @@ class RAGTool:
             })
             
         return {
-            "answer": result["result"],
+            "answer": answer,
             "sources": source_docs
         }
         
+    def query(
+        self,
+        question: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        k: int = DEFAULT_TOP_K
+    ) -> Dict[str, Any]:
+        """查询知识库
+        
+        先检索文档，再用问答链的文档合并链（提示和模型）生成答案；
+        没有检索到文档时直接返回 NO_CONTEXT_ANSWER，不调用模型。
+        
+        Args:
+            question: 问题
+            category: 按分类筛选
+            tags: 按标签筛选
+            k: 检索的文档数量
+            
+        Returns:
+            包含答案和来源文档的字典
+        """
+        self._wait_ready()
+        docs = self._search(question, k, build_search_filter(category, tags))
+        return self._answer(question, docs)
+    
+    def _answer(self, question: str, docs: List[Document]) -> Dict[str, Any]:
+        """基于给定的文档生成答案，没有文档时不调用模型"""
+        if not docs:
+            return self._format_answer(NO_CONTEXT_ANSWER, docs)
+        
+        result = self.qa_chain.combine_documents_chain.invoke(
+            {"input_documents": docs, "question": question}
+        )
+        return self._format_answer(result["output_text"], docs)
+    
+    def answer(self, question: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """基于已检索到的文档回答问题
+        
+        与 retrieve 配合使用，同一次检索的结果既可以直接返回，也可以用来生成答案，
+        不必再检索一次。
+        
+        Args:
+            question: 问题
+            documents: retrieve 返回的文档列表
+            
+        Returns:
+            包含答案和来源文档的字典
+        """
+        self._wait_ready()
+        return self._answer(question, [
+            Document(page_content=doc["content"], metadata=doc["metadata"])
+            for doc in documents
+        ])
+    
+    async def aquery(
+        self,
+        question: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        k: int = DEFAULT_TOP_K
+    ) -> Dict[str, Any]:
+        """异步查询知识库
+        
+        检索和生成都通过异步接口完成，多个查询可以在同一个事件循环中并发进行。
+        
+        Args:
+            question: 问题
+            category: 按分类筛选
+            tags: 按标签筛选
+            k: 检索的文档数量
+            
+        Returns:
+            包含答案和来源文档的字典
+        """
+        await self._await_ready()
+        docs = await self._asearch(question, k, build_search_filter(category, tags))
+        if not docs:
+            return self._format_answer(NO_CONTEXT_ANSWER, docs)
+        
+        result = await self.qa_chain.combine_documents_chain.ainvoke(
+            {"input_documents": docs, "question": question}
+        )
+        return self._format_answer(result["output_text"], docs)
+    
+    async def astream_query(
+        self,
+        question: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        k: int = DEFAULT_TOP_K
+    ) -> AsyncIterator[str]:
+        """流式查询知识库，生成答案的同时逐段返回
+        
+        问答链只在生成结束后返回完整答案；这里先检索文档，再按与问答链相同的方式
+        （文档内容以空行连接）填充提示，流式调用模型，首段答案不必等待整个回答生成完毕。
+        
+        Args:
+            question: 问题
+            category: 按分类筛选
+            tags: 按标签筛选
+            k: 检索的文档数量
+            
+        Yields:
+            答案文本片段
+        """
+        await self._await_ready()
+        docs = await self._asearch(question, k, build_search_filter(category, tags))
+        if not docs:
+            yield NO_CONTEXT_ANSWER
+            return
+        
+        prompt = self._prompt.format(
+            context="\n\n".join(doc.page_content for doc in docs),
+            question=question
+        )
+        async for chunk in self._llm.astream(prompt):
+            if chunk:
+                yield chunk
+        
     def retrieve(
         self,
         query: str,
-        k: int = 3
+        k: int = DEFAULT_TOP_K,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """检索相关文档
         
         Args:
             query: 查询文本
             k: 返回的文档数量
+            category: 按分类筛选
+            tags: 按标签筛选
+            
+        Returns:
+            相关文档列表，每个文档包含内容和元数据
+        """
+        logger.info(f"开始检索，查询：{query[:100]}...")
+        
+        self._wait_ready()
+        docs = self._search(query, k, build_search_filter(category, tags))
+        logger.info(f"向量检索返回 {len(docs)} 个结果")
+        
+        return [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in docs
+        ]
+    
+    async def aretrieve(
+        self,
+        query: str,
+        k: int = DEFAULT_TOP_K,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """异步检索相关文档
+        
+        Args:
+            query: 查询文本
+            k: 返回的文档数量
+            category: 按分类筛选
+            tags: 按标签筛选
             
         Returns:
             相关文档列表，每个文档包含内容和元数据
         """
         logger.info(f"开始检索，查询：{query[:100]}...")
         
-        docs = self.vectorstore.similarity_search(query, k=k)
+        await self._await_ready()
+        docs = await self._asearch(query, k, build_search_filter(category, tags))
         logger.info(f"向量检索返回 {len(docs)} 个结果")
         
-        results = []
-        for doc in docs:
-            results.append({
-                "content": doc.page_content,
-                "metadata": doc.metadata
-            })
+        return [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in docs
+        ]
+    
+    def retrieve_batch(
+        self,
+        queries: List[str],
+        k: int = DEFAULT_TOP_K,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """批量检索相关文档
+        
+        所有查询一次性向量化，再在向量数据库中一次完成检索，
+        不需要为每个查询分别请求向量化服务和检索索引；每个查询的结果与 retrieve 相同。
+        
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的文档数量
+            category: 按分类筛选
+            tags: 按标签筛选
+            
+        Returns:
+            与 queries 顺序一致的检索结果，每个结果为相关文档列表，格式同 retrieve
+        """
+        if not queries:
+            return []
+        logger.info(f"开始批量检索，共 {len(queries)} 个查询")
+        self._wait_ready()
+        
+        if hasattr(self.embeddings, "embed_queries"):
+            query_embeddings = self.embeddings.embed_queries(queries)
+        else:
+            query_embeddings = [self.embeddings.embed_query(query) for query in queries]
+        
+        results = self._search_by_vectors(query_embeddings, k, build_search_filter(category, tags))
+        
+        return [
+            [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+            for docs in results
+        ]
+    
+    async def aretrieve_batch(
+        self,
+        queries: List[str],
+        k: int = DEFAULT_TOP_K,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """异步批量检索相关文档，在线程中执行 retrieve_batch
+        
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的文档数量
+            category: 按分类筛选
+            tags: 按标签筛选
             
-        return results
\ No newline at end of file
+        Returns:
+            与 queries 顺序一致的检索结果
+        """
+        return await asyncio.to_thread(self.retrieve_batch, queries, k, category, tags)
@@ -1,14 +1,35 @@
-from typing import Any, List, Optional, Mapping
-from langchain.callbacks.manager import CallbackManagerForLLMRun
+from typing import Any, AsyncIterator, List, Optional, Mapping
+import functools
+import os
+from langchain.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain.llms.base import LLM
 from langchain.schema import HumanMessage
+from langchain_core.outputs import GenerationChunk
 from pydantic.v1 import Field
 from langchain_community.chat_models import ChatTongyi
 
+from .limits import LoopSemaphore
+
+# 同一事件循环中同时进行的模型调用数上限，可通过环境变量 QWEN_MAX_CONCURRENCY 调整。
+# 并发检索、问答时限制同时发出的请求，避免触发服务端限流后大量重试
+_llm_limit = LoopSemaphore(int(os.getenv("QWEN_MAX_CONCURRENCY", "8")))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_chat_model(model: str, temperature: float) -> ChatTongyi:
+    """获取指定模型和温度的共享 ChatTongyi 实例
+    
+    ChatTongyi 不保存调用之间的状态，相同参数的 RAGQwenModel 共用同一个实例，
+    重复创建 RAG 工具时不再重复初始化 SDK 客户端。
+    """
+    return ChatTongyi(model_name=model, temperature=temperature)
+
 
 class RAGQwenModel(LLM):
     """用于RAG的Qwen模型，基于LangChain的LLM基类"""
 
+    model: str = "qwen-plus"
+    temperature: float = 0.7
     _chat_model: ChatTongyi = Field(default=None)
 
     def __init__(self, **kwargs):
@@ -16,21 +37,21 @@ class RAGQwenModel(LLM):
         
         Args:
             model: 模型名称，默认为qwen-plus
-            api_version: API版本，默认为v1
-            agent_name: agent名称，用于LangSmith tracking
-            temperature: 模型采样温度，控制输出的随机性
+            temperature: 模型采样温度，控制输出的随机性，默认为0.7
         """
         super().__init__(**kwargs)
-        self._chat_model = ChatTongyi(
-            model_name="qwen-plus",
-            temperature=0.7
-        )
+        self._chat_model = _get_chat_model(self.model, self.temperature)
 
     @property
     def _llm_type(self) -> str:
         """返回LLM类型"""
         return "qwen"
 
+    @property
+    def _identifying_params(self) -> Mapping[str, Any]:
+        """返回区分模型配置的参数"""
+        return {"model": self.model, "temperature": self.temperature}
+
     def _call(
         self,
         prompt: str,
@@ -51,3 +72,53 @@ class RAGQwenModel(LLM):
         """
         response = self._chat_model.invoke(prompt)
         return response.content
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """实现LangChain LLM基类的_acall方法
+        
+        基类的默认实现会把同步的 _call 放到线程池中执行，这里直接等待聊天模型的异步接口，
+        在事件循环中调用 ainvoke 时不再经过线程切换。
+        
+        Args:
+            prompt: 输入提示
+            stop: 停止词列表
+            run_manager: 回调管理器
+            **kwargs: 其他参数
+            
+        Returns:
+            str: 模型生成的文本
+        """
+        async with _llm_limit:
+            response = await self._chat_model.ainvoke(prompt)
+        return response.content
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        """实现LangChain LLM基类的_astream方法，逐段返回模型生成的文本
+        
+        Args:
+            prompt: 输入提示
+            stop: 停止词列表
+            run_manager: 回调管理器
+            **kwargs: 其他参数
+            
+        Yields:
+            GenerationChunk: 生成的文本片段
+        """
+        async with _llm_limit:
+            async for message_chunk in self._chat_model.astream(prompt):
+                chunk = GenerationChunk(text=message_chunk.content)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
@@ -1,13 +1,34 @@
 """Utility & helper functions for TongyiChat."""
 
 import os
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
 from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage
-from langchain_community.chat_models.tongyi import ChatTongyi
-from langchain_openai import ChatOpenAI
+
+# 两个聊天模型类的导入开销都较大，每次只会用到其中一个，在用到时再导入
+if TYPE_CHECKING:
+    from langchain_community.chat_models.tongyi import ChatTongyi
+    from langchain_openai import ChatOpenAI
+
+# 通义千问系列视觉和音频模型
+TONGYI_SPECIAL_MODELS = frozenset({
+    "qwen-vl-v1",
+    "qwen-vl-chat-v1",
+    "qwen-audio-turbo",
+    "qwen-vl-plus",
+    "qwen-vl-max"
+})
+
+# 通义千问系列普通模型
+TONGYI_MODELS = frozenset({
+    "qwen-turbo",
+    "qwen-plus",
+    "qwen-max",
+    "qwen-max-1201",
+    "qwen-max-longcontext"
+})
 
 def get_message_text(msg: BaseMessage) -> str:
     """Get the text content of a message."""
@@ -32,7 +53,7 @@ def load_chat_model(fully_specified_name: str) -> BaseChatModel:
     return init_chat_model(model, model_provider=provider)
 
 
-def init_custom_chat_model(model_name: str) -> Union[ChatTongyi, ChatOpenAI]:
+def init_custom_chat_model(model_name: str) -> "Union[ChatTongyi, ChatOpenAI]":
     """初始化并返回一个聊天模型实例。
     
     支持通义千问系列模型和通过DashScope兼容OpenAI API的其他模型。
@@ -43,26 +64,10 @@ def init_custom_chat_model(model_name: str) -> Union[ChatTongyi, ChatOpenAI]:
     Returns:
         Union[ChatTongyi, ChatOpenAI]: 初始化的聊天模型实例
     """
-    # 通义千问系列视觉和音频模型
-    tongyi_special_models = [
-        "qwen-vl-v1",
-        "qwen-vl-chat-v1",
-        "qwen-audio-turbo",
-        "qwen-vl-plus",
-        "qwen-vl-max"
-    ]
-    
-    # 通义千问系列普通模型
-    tongyi_models = [
-        "qwen-turbo",
-        "qwen-plus",
-        "qwen-max",
-        "qwen-max-1201",
-        "qwen-max-longcontext"
-    ]
-    
     # 如果是通义千问系列模型，使用ChatTongyi
-    if model_name in tongyi_models or model_name in tongyi_special_models:
+    if model_name in TONGYI_MODELS or model_name in TONGYI_SPECIAL_MODELS:
+        from langchain_community.chat_models.tongyi import ChatTongyi
+        
         return ChatTongyi(model_name=model_name)
     
     # 否则使用DashScope的OpenAI兼容API
@@ -71,6 +76,8 @@ def init_custom_chat_model(model_name: str) -> Union[ChatTongyi, ChatOpenAI]:
         if not api_key:
             raise ValueError("DASHSCOPE_API_KEY environment variable is not set")
         
+        from langchain_openai import ChatOpenAI
+        
         return ChatOpenAI(
             model=model_name,
             api_key=api_key,
@@ -0,0 +1,41 @@
+"""测试的共享配置"""
+import logging
+import os
+
+import pytest
+
+# 默认只输出警告及以上的日志，调试时可通过环境变量 TEST_LOG_LEVEL 调整（如 DEBUG）
+TEST_LOG_LEVEL = os.environ.get("TEST_LOG_LEVEL", "WARNING").upper()
+logging.basicConfig(level=TEST_LOG_LEVEL)
+
+# 建立索引时每个文件都会输出日志的模块，除非显式使用 DEBUG 级别，否则只保留警告及以上的日志；
+# 需要检查这些日志的测试可以用 caplog.at_level(logging.INFO, logger=...) 临时打开
+NOISY_LOGGERS = ("rag.cos_document_processor",)
+if TEST_LOG_LEVEL != "DEBUG":
+    for name in NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--force-recreate-vector-db",
+        action="store_true",
+        default=False,
+        help="忽略已有的向量索引，重新索引全部 COS 文档（用于定期的全量索引）"
+    )
+    parser.addoption(
+        "--run-slow",
+        action="store_true",
+        default=False,
+        help="运行标记为 slow 的耗时测试（建立索引、逐个调用模型等）"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+
+    skip_slow = pytest.mark.skip(reason="需要 --run-slow 选项才会运行")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
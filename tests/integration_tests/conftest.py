@@ -0,0 +1,95 @@
+"""集成测试的共享配置"""
+from array import array
+import hashlib
+import sqlite3
+import threading
+
+import pytest
+from rag.embeddings import DashScopeEmbeddings
+
+
+class EmbeddingDiskCache:
+    """按 (文本 SHA-256, 模型名称) 保存文档向量的 SQLite 缓存
+
+    向量化在后台索引线程中进行，所有读写都在锁内完成。
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, hashes: list) -> dict:
+        with self._lock:
+            rows = []
+            # SQLite 单条语句的参数数量有限，分批查询
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows += self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch]
+                ).fetchall()
+        return {hash_: array("d", blob).tolist() for hash_, blob in rows}
+
+    def put_many(self, model: str, items: dict) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)",
+                [(hash_, model, array("d", vector).tobytes()) for hash_, vector in items.items()]
+            )
+            self._conn.commit()
+
+    def patch(self, mp: pytest.MonkeyPatch) -> None:
+        """让 DashScopeEmbeddings.embed_documents 先查缓存，只对未命中的文本请求向量化服务
+
+        替换的是类方法，RAG 工具内部（包括后台索引线程）创建的实例同样生效；
+        mp 撤销时恢复原方法。
+        """
+        cache = self
+        embed_documents = DashScopeEmbeddings.embed_documents
+
+        def cached_embed_documents(self, texts):
+            hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+            found = cache.get_many(self.model, list(set(hashes)))
+
+            # 只对未命中的文本（相同文本只算一次）批量向量化，再按原顺序合并
+            missing = {}
+            for hash_, text in zip(hashes, texts):
+                if hash_ not in found:
+                    missing.setdefault(hash_, text)
+            if missing:
+                vectors = embed_documents(self, list(missing.values()))
+                computed = dict(zip(missing, vectors))
+                cache.put_many(self.model, computed)
+                found.update(computed)
+
+            return [found[hash_] for hash_ in hashes]
+
+        mp.setattr(DashScopeEmbeddings, "embed_documents", cached_embed_documents)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@pytest.fixture(scope="session")
+def embedding_disk_cache(request):
+    """在测试会话之间复用文档向量的磁盘缓存
+
+    缓存保存在 .pytest_cache 下；本夹具只提供缓存本身，不替换任何方法，
+    需要复用向量的测试请求 cached_embeddings，会话级夹具使用 EmbeddingDiskCache.patch。
+    """
+    cache = EmbeddingDiskCache(str(request.config.cache.mkdir("embeddings") / "embeddings.db"))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def cached_embeddings(monkeypatch, embedding_disk_cache):
+    """在当前测试期间让文档向量化先查磁盘缓存，未变化的分片不再请求向量化服务"""
+    embedding_disk_cache.patch(monkeypatch)
+    return embedding_disk_cache
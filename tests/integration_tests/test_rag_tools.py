@@ -1,29 +1,61 @@
 import pytest
 import logging
-from proposer.tools import rag_retrieve, rag_search, get_rag_tool
+import re
+from proposer.tools import _format_documents, rag_retrieve, rag_search, get_rag_tool
 from proposer.utils import init_custom_chat_model
 
-# 设置日志
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# 需要建立向量索引并调用模型，只在指定 --run-slow 时运行
+pytestmark = pytest.mark.slow
+
+# 宁波周边游检索结果中应出现的区县名
+DISTRICT_RE = re.compile("|".join(["海曙", "江北", "北仑", "镇海", "鄞州", "奉化", "宁海", "余姚", "宁波"]))
+
+
+@pytest.fixture(scope="session")
+def indexed_rag_tool(request, embedding_disk_cache):
+    """整个测试会话共用一个已建立索引的 RAG 工具
+    
+    get_rag_tool 会按文档清单检查已有的向量索引，只在文档变化时重新索引，
+    多次运行测试可以复用磁盘上的向量数据库；需要强制重建时使用
+    --force-recreate-vector-db 选项运行测试。建立索引时的文档向量通过
+    embedding_disk_cache 在测试会话之间复用。
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        # 环境变量和向量缓存只在建立索引期间生效，不影响之后的测试
+        embedding_disk_cache.patch(mp)
+        if request.config.getoption("--force-recreate-vector-db"):
+            mp.setenv("RAG_FORCE_RECREATE_VECTOR_DB", "true")
+        
+        try:
+            rag_tool = get_rag_tool()
+            # 等待后台索引完成，索引失败时抛出对应的异常
+            rag_tool._wait_ready()
+        except Exception as e:
+            logger.error("RAG index initialization failed: %s", e)
+            pytest.skip(f"RAG index unavailable: {str(e)}")
+    
+    return rag_tool
+
+
+@pytest.fixture(scope="module")
+def model_with_rag_tools():
+    """绑定了 RAG 检索工具的模型，模块内的测试共用"""
+    return init_custom_chat_model("qwen-max").bind_tools([rag_retrieve])
+
+
 class TestRAGTools:
     """RAG工具集成测试类"""
     
-    def test_rag_retrieve_with_model(self):
+    def test_rag_retrieve_with_model(self, model_with_rag_tools):
         """测试RAG检索工具与模型的集成"""
         try:
-            # 初始化模型
-            model = init_custom_chat_model("qwen-max")
-            
-            # 绑定工具
-            model_with_tools = model.bind_tools([rag_retrieve])
-            
             # 执行工具调用
-            response = model_with_tools.invoke("帮我检索关于人工智能的文档")
+            response = model_with_rag_tools.invoke("帮我检索关于人工智能的文档")
             
             # 验证响应
-            logger.info(f"Model response: {response}")
+            logger.info("Model response: %s", response)
             assert response is not None
             
             # 检查工具调用
@@ -37,12 +69,12 @@ class TestRAGTools:
                 result = rag_retrieve.invoke(query)  # 使用 invoke 而不是直接调用
                 
                 # 验证结果
-                logger.info(f"Tool result: {result}")
+                logger.info("Tool result: %s", result)
                 assert result is not None
                 assert isinstance(result, str)
                 
         except Exception as e:
-            logger.error(f"Integration test failed: {str(e)}")
+            logger.error("Integration test failed: %s", e)
             pytest.skip(f"Integration test skipped due to error: {str(e)}")
     
     def test_direct_rag_retrieve_call(self):
@@ -52,7 +84,7 @@ class TestRAGTools:
             result = rag_retrieve.invoke("人工智能技术")  # 使用 invoke 而不是直接调用
             
             # 验证结果
-            logger.info(f"Direct tool result: {result}")
+            logger.info("Direct tool result: %s", result)
             assert result is not None
             assert isinstance(result, str)
             
@@ -61,21 +93,22 @@ class TestRAGTools:
                 assert "文档" in result
             
         except Exception as e:
-            logger.error(f"Direct tool test failed: {str(e)}")
+            logger.error("Direct tool test failed: %s", e)
             pytest.skip(f"Direct tool test skipped due to error: {str(e)}")
     
-    def test_rag_search_and_retrieve_comparison(self):
+    def test_rag_search_and_retrieve_comparison(self, indexed_rag_tool):
         """比较搜索和检索工具的结果"""
         try:
             query = "人工智能的应用"
             
-            # 调用两个工具，使用 invoke 而不是直接调用
-            search_result = rag_search.invoke(query)
-            retrieve_result = rag_retrieve.invoke(query)
+            # 只检索一次，检索结果同时用于整理文档和生成回答
+            documents = indexed_rag_tool.retrieve(query)
+            retrieve_result = _format_documents(documents)
+            search_result = indexed_rag_tool.answer(query, documents)
             
             # 记录结果
-            logger.info(f"Search result: {search_result}")
-            logger.info(f"Retrieve result: {retrieve_result}")
+            logger.info("Search result: %s", search_result)
+            logger.info("Retrieve result: %s", retrieve_result)
             
             # 验证结果
             assert search_result is not None
@@ -94,37 +127,18 @@ class TestRAGTools:
                 assert "文档" in retrieve_result
             
         except Exception as e:
-            logger.error(f"Comparison test failed: {str(e)}")
+            logger.error("Comparison test failed: %s", e)
             pytest.skip(f"Comparison test skipped due to error: {str(e)}")
             
-    def test_ningbo_tour_retrieval(self):
+    def test_ningbo_tour_retrieval(self, indexed_rag_tool):
         """测试检索宁波周边游的文档"""
-        try:            
-            # 设置环境变量强制重新创建向量数据库
-            import os
-            os.environ["RAG_FORCE_RECREATE_VECTOR_DB"] = "true"
-            
-            # 获取RAG工具实例并强制重新索引文档
-            rag_tool = get_rag_tool()
-            logger.info("强制重新索引COS文档...")
-            
-            # 强制重新加载并索引文档
-            def process_documents(documents):
-                logger.info(f"处理 {len(documents)} 个文档")
-                # 打印文档信息，帮助调试
-                for doc in documents:
-                    logger.info(f"文档: {doc.metadata.get('source', 'unknown')}")
-                    logger.info(f"元数据: {doc.metadata}")
-                rag_tool.vectorstore.add_documents(documents)
-                
-            rag_tool.document_processor.load_and_index_files(process_documents)
-            
+        try:
             # 直接调用检索工具
             query = "宁波周边游"
             result = rag_search.invoke(query)
             
             # 记录结果
-            logger.info(f"Ningbo tour retrieval result: {result}")
+            logger.info("Ningbo tour retrieval result: %s", result)
             
             # 验证结果
             assert result is not None
@@ -132,54 +146,24 @@ class TestRAGTools:
             assert "answer" in result
             assert "sources" in result
             
-            # 验证文档内容包含宁波各区
-            districts = ["海曙", "江北", "北仑", "镇海", "鄞州", "奉化", "宁海", "余姚", "宁波"]
-            found_districts = []
-            
-            # 检查回答和来源中是否包含区名
-            for district in districts:
-                if district in result["answer"]:
-                    found_districts.append(district)
-                else:
-                    for source in result["sources"]:
-                        if district in source["content"]:
-                            found_districts.append(district)
-                            break
+            # 验证文档内容包含宁波各区：回答和每个来源只扫描一次
+            found_districts = set(DISTRICT_RE.findall(result["answer"]))
+            for source in result["sources"]:
+                found_districts.update(DISTRICT_RE.findall(source["content"]))
             
             # 确保至少找到一半的区名
             min_districts = 1
-            assert len(found_districts) >= min_districts, f"至少应包含{min_districts}个区名，但只找到了{len(found_districts)}个: {found_districts}"
+            assert len(found_districts) >= min_districts, f"至少应包含{min_districts}个区名，但只找到了{len(found_districts)}个: {sorted(found_districts)}"
             
             logger.info("宁波周边游文档检索测试通过！")
             
         except Exception as e:
-            logger.error(f"Ningbo tour retrieval test failed: {str(e)}")
+            logger.error("Ningbo tour retrieval test failed: %s", e)
             pytest.skip(f"Ningbo tour retrieval test skipped due to error: {str(e)}")
 
-    def test_pdf_document_retrieval(self):
+    def test_pdf_document_retrieval(self, indexed_rag_tool):
         """测试检索PDF文档"""
         try:
-            # 设置环境变量强制重新创建向量数据库
-            import os
-            os.environ["RAG_FORCE_RECREATE_VECTOR_DB"] = "true"
-            
-            # 获取RAG工具实例并强制重新索引文档
-            rag_tool = get_rag_tool()
-            logger.info("强制重新索引COS文档...")
-            
-            # 强制重新加载并索引文档
-            def process_documents(documents):
-                logger.info(f"处理 {len(documents)} 个文档")
-                # 打印PDF文档信息，帮助调试
-                for doc in documents:
-                    if doc.metadata.get('type') == 'pdf':
-                        logger.info(f"PDF文档: {doc.metadata.get('source', 'unknown')}")
-                        logger.info(f"页码: {doc.metadata.get('page', 'unknown')}")
-                        logger.info(f"元数据: {doc.metadata}")
-                rag_tool.vectorstore.add_documents(documents)
-            
-            rag_tool.document_processor.load_and_index_files(process_documents)
-            
             # 测试检索PDF内容
             query = "宁波旅游规划"  # 假设有相关的PDF文档
             result = rag_search.invoke(query)
@@ -196,12 +180,12 @@ class TestRAGTools:
                 if source.get("metadata", {}).get("type") == "pdf"
             ]
             
-            logger.info(f"找到 {len(pdf_sources)} 个PDF来源")
+            logger.info("找到 %s 个PDF来源", len(pdf_sources))
             for source in pdf_sources:
-                logger.info(f"PDF来源: {source['metadata']}")
+                logger.info("PDF来源: %s", source['metadata'])
             
             logger.info("PDF文档检索测试通过！")
             
         except Exception as e:
-            logger.error(f"PDF文档检索测试失败: {str(e)}")
+            logger.error("PDF文档检索测试失败: %s", e)
             pytest.skip(f"PDF文档检索测试跳过，原因: {str(e)}")
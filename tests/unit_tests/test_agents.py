@@ -1,10 +1,84 @@
+import asyncio
 import pytest
 from proposer.agents.critic.core import CriticAgent
-from proposer.agents.optimizer.core import OptimizerAgent
+from proposer.agents.optimizer.core import AnalysisResult, OptimizerAgent, _JsonObjectScanner
 from proposer.agents.proposer.core import ProposerAgent
 from proposer.utils import init_custom_chat_model
-from langchain_core.messages import HumanMessage
-from langchain.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
+
+# 调用模型的测试使用的输入
+CRITIC_INPUT = {
+    "input": "test_input",
+    "proposal_content": "test_proposal",
+    "goals": ["test goal 1", "test goal 2"],
+    "constraints": [{"type": "test", "value": "test"}]
+}
+
+OPTIMIZER_INPUT = {
+    "current_proposal": "这是一个测试提案，需要优化和改进。",
+    "evaluations": [
+        {
+            "detailed_evaluations": {
+                "clarity": {
+                    "score": 6.5,
+                    "suggestions": ["表述需要更清晰", "逻辑需要更连贯"]
+                },
+                "completeness": {
+                    "score": 7.5,
+                    "suggestions": ["可以添加更多细节"]
+                }
+            },
+            "review_result": {
+                "suggestions": ["建议整体结构优化"]
+            },
+            "final_score": 7.0
+        }
+    ],
+    "improvement_history": [
+        {
+            "version": 1,
+            "changes": ["改进了表述", "添加了更多示例"],
+            "feedback": "表述更清晰了，但还需要完善"
+        }
+    ],
+    "references": [
+        {
+            "type": "similar_case",
+            "content": "这是一个相关的参考案例"
+        }
+    ]
+}
+
+PROPOSER_INPUT = {
+    "input": "创建一个项目计划",
+    "constraints": [
+        {
+            "type": "timeline",
+            "value": "3个月内完成"
+        },
+        {
+            "type": "budget",
+            "value": "预算不超过100万"
+        }
+    ],
+    "goals": [
+        "提高系统性能",
+        "优化用户体验"
+    ],
+    "references": [
+        {
+            "type": "case",
+            "content": "类似项目案例：成功在2个月内完成了系统升级，性能提升30%"
+        },
+        {
+            "type": "document",
+            "content": "性能优化最佳实践指南",
+            "metadata": {
+                "source": "技术文档库"
+            }
+        }
+    ]
+}
 
 @pytest.fixture
 def critic_agent():
@@ -33,100 +107,30 @@ def test_proposer_agent_initialization(proposer_agent):
     assert isinstance(proposer_agent, ProposerAgent)
     assert proposer_agent.model is not None
 
+@pytest.mark.slow
 @pytest.mark.asyncio
 async def test_critic_agent_evaluate_proposal(critic_agent):
-    input_data = {
-        "input": "test_input",
-        "proposal_content": "test_proposal",
-        "goals": ["test goal 1", "test goal 2"],
-        "constraints": [{"type": "test", "value": "test"}]
-    }
-    response = await critic_agent.evaluate_proposal(**input_data)
+    response = await critic_agent.evaluate_proposal(**CRITIC_INPUT)
     assert response is not None
 
+@pytest.mark.slow
 @pytest.mark.asyncio
 async def test_optimizer_agent_optimize(optimizer_agent):
     """测试优化器的optimize_proposal方法"""
-    # 准备测试数据
-    input_data = {
-        "current_proposal": "这是一个测试提案，需要优化和改进。",
-        "evaluations": [
-            {
-                "detailed_evaluations": {
-                    "clarity": {
-                        "score": 6.5,
-                        "suggestions": ["表述需要更清晰", "逻辑需要更连贯"]
-                    },
-                    "completeness": {
-                        "score": 7.5,
-                        "suggestions": ["可以添加更多细节"]
-                    }
-                },
-                "review_result": {
-                    "suggestions": ["建议整体结构优化"]
-                },
-                "final_score": 7.0
-            }
-        ],
-        "improvement_history": [
-            {
-                "version": 1,
-                "changes": ["改进了表述", "添加了更多示例"],
-                "feedback": "表述更清晰了，但还需要完善"
-            }
-        ],
-        "references": [
-            {
-                "type": "similar_case",
-                "content": "这是一个相关的参考案例"
-            }
-        ]
-    }
-    
     # 调用优化方法
-    response = await optimizer_agent.optimize_proposal(**input_data)
+    response = await optimizer_agent.optimize_proposal(**OPTIMIZER_INPUT)
     
     # 验证响应
     assert response is not None
     assert isinstance(response, str)
     assert len(response) > 0
 
+@pytest.mark.slow
 @pytest.mark.asyncio
 async def test_proposer_agent_generate(proposer_agent):
     """测试提案生成器的generate方法"""
-    # 准备测试数据
-    input_data = {
-        "input": "创建一个项目计划",
-        "constraints": [
-            {
-                "type": "timeline",
-                "value": "3个月内完成"
-            },
-            {
-                "type": "budget",
-                "value": "预算不超过100万"
-            }
-        ],
-        "goals": [
-            "提高系统性能",
-            "优化用户体验"
-        ],
-        "references": [
-            {
-                "type": "case",
-                "content": "类似项目案例：成功在2个月内完成了系统升级，性能提升30%"
-            },
-            {
-                "type": "document",
-                "content": "性能优化最佳实践指南",
-                "metadata": {
-                    "source": "技术文档库"
-                }
-            }
-        ]
-    }
-    
     # 调用生成方法
+    input_data = PROPOSER_INPUT
     response = await proposer_agent.generate(**input_data)
     
     # 验证响应
@@ -155,15 +159,98 @@ async def test_proposer_agent_generate(proposer_agent):
         invalid_data["goals"] = "invalid goals"  # 应该是列表
         await proposer_agent.generate(**invalid_data)
 
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_all_agents_parallel(critic_agent, optimizer_agent, proposer_agent):
+    """并发调用三个智能体，总耗时约为最慢的一次调用"""
+    evaluation, optimized, proposal = await asyncio.gather(
+        critic_agent.evaluate_proposal(**CRITIC_INPUT),
+        optimizer_agent.optimize_proposal(**OPTIMIZER_INPUT),
+        proposer_agent.generate(**PROPOSER_INPUT)
+    )
+    assert evaluation is not None
+    assert isinstance(optimized, str) and len(optimized) > 0
+    assert isinstance(proposal, str) and len(proposal) > 0
+
+def test_optimizer_analyze_evaluations():
+    """测试评估结果的维度统计"""
+    evaluations = [
+        {"dimensions": {"logic": {"score": 0.6}, "completeness": {"score": 0.8}}},
+        {"dimensions": {"logic": {"score": 0.7}, "feasibility": {"score": 0.9}}},
+    ]
+    
+    analysis = OptimizerAgent._analyze_evaluations(evaluations)
+    
+    assert analysis["avg_scores"] == pytest.approx({"completeness": 8.0, "feasibility": 9.0, "logic": 6.5})
+    assert analysis["key_issues"] == ["logic"]
+    assert OptimizerAgent._analyze_evaluations([]) == {"avg_scores": {}, "key_issues": []}
+
+def test_optimizer_excellence_uses_latest_evaluation(optimizer_agent):
+    """历史平均分达到优秀标准、但最新一轮没有达到时仍需优化"""
+    def evaluation(score):
+        return {"dimensions": {focus: {"score": score} for focus in ("logic", "completeness", "feasibility")}}
+    
+    assert not optimizer_agent._is_already_excellent([evaluation(0.95), evaluation(0.80)])
+    assert optimizer_agent._is_already_excellent([evaluation(0.80), evaluation(0.90)])
+
+def test_optimizer_compact_references():
+    """测试参考资料压缩"""
+    references = [
+        {"type": "document", "content": "甲" * 500, "metadata": {"title": "doc1.md", "source": "cos://b/doc1.md"}},
+        {"type": "document", "content": "乙" * 500, "metadata": {"source": "cos://b/doc2.md"}},
+        {"type": "document", "content": "丙" * 500, "metadata": {}},
+    ]
+    
+    compacted = OptimizerAgent._compact_references(references, content_chars=100, max_chars=250)
+    
+    assert compacted == [
+        {"title": "doc1.md", "content": "甲" * 100},
+        {"title": "cos://b/doc2.md", "content": "乙" * 100},
+    ]
+
+def test_optimizer_coerce_analysis():
+    text = '```json\n{"key_issues": ["可行性不足"], "suggestions": {"feasibility": ["补充预算"]}}\n```'
+    analysis = OptimizerAgent._coerce_analysis(text)
+
+    assert analysis.key_issues == ["可行性不足"]
+    assert analysis.suggestions == {"feasibility": ["补充预算"]}
+    assert OptimizerAgent._coerce_analysis("没有结构化内容") == "没有结构化内容"
+    assert OptimizerAgent._coerce_analysis('{"key_issues": "x"}') == '{"key_issues": "x"}'
+
+def test_analysis_result_to_markdown():
+    analysis = AnalysisResult(key_issues=["预算不清"], suggestions={"feasibility": ["补充预算", "分阶段实施"]})
+    assert analysis.to_markdown() == (
+        "## 关键问题\n- 预算不清\n\n## 改进建议\n\n### feasibility\n- 补充预算\n- 分阶段实施"
+    )
+
+def test_json_object_scanner_stops_at_top_level_close():
+    scanner = _JsonObjectScanner()
+    assert scanner.feed('好的：{"key_issues": ["括号}') == -1
+    assert scanner.feed('\\"在字符串中"], "suggestions": {}') == -1
+    assert scanner.feed('}\n以上是分析') == 1
+
 def test_critic_agent_prompt_templates(critic_agent):
-    assert isinstance(critic_agent.user_prompt_template, PromptTemplate)
-    assert isinstance(critic_agent.system_prompt_template, PromptTemplate)
+    assert isinstance(critic_agent.user_prompt_template, str)
+    assert isinstance(critic_agent.system_message, SystemMessage)
+
+def test_critic_messages_share_prefix_across_focuses():
+    logic = CriticAgent(model="qwen-plus", focus="logic")
+    feasibility = CriticAgent(model="qwen-plus", focus="feasibility")
+    args = ("问题", "提案正文", ["目标"], [{"type": "预算", "value": "100万"}])
+
+    logic_messages = logic._build_messages(*args)
+    feasibility_messages = feasibility._build_messages(*args)
+    assert logic_messages[0].content == feasibility_messages[0].content
+
+    prefix = logic_messages[1].content.split("评估要求：")[0]
+    assert prefix.endswith("提案正文\n\n")
+    assert feasibility_messages[1].content.startswith(prefix)
 
 def test_optimizer_agent_prompt_templates(optimizer_agent):
-    assert isinstance(optimizer_agent.system_prompt, PromptTemplate)
-    assert isinstance(optimizer_agent.optimization_prompt, PromptTemplate)
+    assert isinstance(optimizer_agent.system_message, SystemMessage)
+    assert isinstance(optimizer_agent.optimization_prompt, str)
 
 def test_proposer_agent_prompt_templates(proposer_agent):
-    assert isinstance(proposer_agent.system_prompt, PromptTemplate)
-    assert isinstance(proposer_agent.base_prompt, PromptTemplate)
-    assert isinstance(proposer_agent.rag_prompt, PromptTemplate)
+    assert isinstance(proposer_agent.system_message, SystemMessage)
+    assert isinstance(proposer_agent.base_prompt, str)
+    assert isinstance(proposer_agent.rag_prompt, str)
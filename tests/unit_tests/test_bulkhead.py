@@ -0,0 +1,69 @@
+"""测试LLM调用准入控制"""
+import asyncio
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+from proposer.bulkhead import BulkheadRejected, LLMBulkhead, estimate_tokens, get_llm_bulkhead
+
+
+def test_estimate_tokens_counts_characters():
+    messages = [SystemMessage(content="系统提示"), HumanMessage(content="abc")]
+    assert estimate_tokens(messages) == 7
+
+
+async def _peak_concurrency(bulkhead: LLMBulkhead, calls: int = 6) -> int:
+    running = 0
+    peak = 0
+
+    async def call():
+        nonlocal running, peak
+        async with bulkhead.reserve(10):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return peak
+
+
+@pytest.mark.asyncio
+async def test_limits_concurrency():
+    bulkhead = LLMBulkhead(max_concurrent=2)
+    assert await _peak_concurrency(bulkhead) == 2
+
+
+@pytest.mark.asyncio
+async def test_update_resizes_concurrency_in_place():
+    bulkhead = LLMBulkhead(max_concurrent=1)
+    bulkhead.update(max_concurrent=3, tpm=bulkhead.tpm, rpm=bulkhead.rpm, wait=True)
+    assert await _peak_concurrency(bulkhead) == 3
+
+    # 调小后的名额在之后的调用结束时收回
+    bulkhead.update(max_concurrent=1, tpm=bulkhead.tpm, rpm=bulkhead.rpm, wait=True)
+    await _peak_concurrency(bulkhead, calls=3)
+    assert await _peak_concurrency(bulkhead) == 1
+
+
+def test_bulkhead_per_event_loop():
+    async def current():
+        return get_llm_bulkhead()
+
+    assert asyncio.run(current()) is not asyncio.run(current())
+
+
+@pytest.mark.asyncio
+async def test_rejects_over_rate_without_waiting():
+    bulkhead = LLMBulkhead(tpm=100, rpm=10, wait=False)
+    async with bulkhead.reserve(80):
+        pass
+
+    with pytest.raises(BulkheadRejected):
+        async with bulkhead.reserve(30):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_oversized_call_passes_on_empty_window():
+    bulkhead = LLMBulkhead(tpm=100, wait=False)
+    async with bulkhead.reserve(1000):
+        pass
@@ -0,0 +1,112 @@
+"""测试LLM调用结果缓存"""
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import HumanMessage, SystemMessage
+from proposer.cache import ResponseCache, SemanticCache, make_cache_key, make_messages_key
+
+
+class FakeEmbeddings(Embeddings):
+    """按字符统计生成向量的假向量模型"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [text.count("a"), text.count("b"), text.count("c")]
+
+
+def test_make_cache_key_is_stable():
+    assert make_cache_key("logic", {"b": 1, "a": 2}) == make_cache_key("logic", {"a": 2, "b": 1})
+    assert make_cache_key("logic", "x") != make_cache_key("completeness", "x")
+
+
+def test_make_messages_key_depends_on_namespace_and_role():
+    messages = [SystemMessage(content="s"), HumanMessage(content="u")]
+    assert make_messages_key("analysis", messages) == make_messages_key("analysis", list(messages))
+    assert make_messages_key("analysis", messages) != make_messages_key("optimization", messages)
+    assert make_messages_key("analysis", messages) != make_messages_key(
+        "analysis", [HumanMessage(content="s"), HumanMessage(content="u")]
+    )
+
+
+def test_response_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("proposer.cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(maxsize=2, ttl=10)
+
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+    now[0] += 10
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+@pytest.mark.asyncio
+async def test_exact_match_returns_copy():
+    cache = SemanticCache()
+    await cache.aput("scope", "proposal", {"score": 0.8, "suggestions": ["s1"]})
+
+    cached = await cache.aget("scope", "proposal")
+    assert cached == {"score": 0.8, "suggestions": ["s1"]}
+
+    cached["suggestions"].append("s2")
+    assert (await cache.aget("scope", "proposal"))["suggestions"] == ["s1"]
+    assert await cache.aget("other", "proposal") is None
+
+
+@pytest.mark.asyncio
+async def test_exact_match_evicts_oldest():
+    cache = SemanticCache(maxsize=2)
+    for text in ("a", "b", "c"):
+        await cache.aput("scope", text, text)
+
+    assert await cache.aget("scope", "a") is None
+    assert await cache.aget("scope", "c") == "c"
+
+
+@pytest.mark.asyncio
+async def test_semantic_match_within_scope():
+    cache = SemanticCache(embeddings=FakeEmbeddings(), similarity_threshold=0.99)
+    await cache.aput("scope", "aab", {"score": 0.7})
+
+    assert await cache.aget("scope", "aabaab") == {"score": 0.7}
+    assert await cache.aget("scope", "ccc") is None
+    assert await cache.aget("other", "aabaab") is None
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    """记录向量化次数的假向量模型"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+
+@pytest.mark.asyncio
+async def test_semantic_miss_embeds_once():
+    embeddings = CountingEmbeddings()
+    cache = SemanticCache(embeddings=embeddings)
+    await cache.aput("scope", "aab", 1)
+    assert embeddings.calls == 1
+
+    assert await cache.aget("scope", "ccc") is None
+    await cache.aput("scope", "ccc", 2)
+    assert embeddings.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_scopes_are_bounded():
+    cache = SemanticCache(embeddings=FakeEmbeddings(), similarity_threshold=0.99, max_scopes=2)
+    for scope in ("s1", "s2", "s3"):
+        await cache.aput(scope, "aab", scope)
+
+    assert await cache.aget("s1", "aabaab") is None
+    assert await cache.aget("s3", "aabaab") == "s3"
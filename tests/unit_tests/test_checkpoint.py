@@ -0,0 +1,32 @@
+"""测试检查点压缩序列化"""
+from proposer.checkpoint import COMPRESSED_SUFFIX, ORJSON_TYPE, CompressedSerializer
+
+
+def test_large_values_are_compressed_and_roundtrip():
+    serde = CompressedSerializer()
+    proposals = ["提案内容" * 500, "优化后的提案" * 500]
+
+    type_, data = serde.dumps_typed(proposals)
+    assert type_.endswith(COMPRESSED_SUFFIX)
+    assert serde.loads_typed((type_, data)) == proposals
+
+
+def test_small_values_are_stored_as_is():
+    serde = CompressedSerializer()
+
+    type_, data = serde.dumps_typed({"status": "refine"})
+    assert not type_.endswith(COMPRESSED_SUFFIX)
+    assert serde.loads_typed((type_, data)) == {"status": "refine"}
+
+
+def test_plain_json_uses_orjson_and_other_types_fall_back():
+    serde = CompressedSerializer()
+    evaluation = {"score": 0.75, "dimensions": {"logic": {"score": 0.8, "suggestions": ["补充论证"]}}}
+
+    type_, data = serde.dumps_typed(evaluation)
+    assert type_ == ORJSON_TYPE
+    assert serde.loads_typed((type_, data)) == evaluation
+
+    type_, data = serde.dumps_typed(("a", 1))
+    assert type_ != ORJSON_TYPE
+    assert serde.loads_typed((type_, data)) == ("a", 1)
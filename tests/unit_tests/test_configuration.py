@@ -3,3 +3,14 @@ from react_agent.configuration import Configuration
 
 def test_configuration_empty() -> None:
     Configuration.from_runnable_config({})
+
+
+def test_proposer_configuration_focus_models_hashable() -> None:
+    from proposer.configuration import Configuration as ProposerConfiguration
+
+    configuration = ProposerConfiguration.from_runnable_config(
+        {"configurable": {"critic_focus_models": {"logic": "qwen-max"}}}
+    )
+    assert configuration.critic_focus_models == (("logic", "qwen-max"),)
+    assert not configuration.route_critic_models
+    hash(configuration)
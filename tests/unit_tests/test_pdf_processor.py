@@ -1,11 +1,10 @@
 """测试PDF处理器"""
-import os
 import pytest
 from rag.pdf_processor import PDFProcessor
 
-@pytest.fixture
-def sample_pdf_path(tmp_path):
-    """创建一个示例PDF文件"""
+@pytest.fixture(scope="session")
+def sample_pdf_path(tmp_path_factory):
+    """创建一个示例PDF文件，整个测试会话共用，由 pytest 在会话结束后清理临时目录"""
     # 使用PyMuPDF创建一个简单的PDF文件
     import fitz
     doc = fitz.open()
@@ -34,14 +33,11 @@ def sample_pdf_path(tmp_path):
     )
     
     # 保存PDF文件
-    pdf_path = tmp_path / "test.pdf"
+    pdf_path = tmp_path_factory.mktemp("pdfs") / "test.pdf"
     doc.save(str(pdf_path))
     doc.close()
     
-    yield str(pdf_path)
-    
-    # 清理
-    os.unlink(str(pdf_path))
+    return str(pdf_path)
 
 def test_extract_text_from_pdf(sample_pdf_path):
     """测试从PDF中提取文本"""
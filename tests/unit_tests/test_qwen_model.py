@@ -6,9 +6,9 @@ from langchain_community.chat_models.tongyi import ChatTongyi
 # 确保环境变量已设置
 assert "DASHSCOPE_API_KEY" in os.environ, "DASHSCOPE_API_KEY 环境变量未设置"
 
-@pytest.fixture(params=["qwen-max", "deepseek-v3", "deepseek-r1"])
+@pytest.fixture(params=["qwen-max", "deepseek-v3", "deepseek-r1"], scope="session")
 def chat_model(request):
-    """创建一个ChatTongyi模型实例用于测试"""
+    """创建一个ChatTongyi模型实例用于测试，每个模型在整个测试会话中只创建一次"""
     model = ChatTongyi(model_name=request.param)
     yield model
 
@@ -18,29 +18,23 @@ async def test_model_initialization(chat_model):
     assert chat_model.model_name in ["qwen-max", "deepseek-v3", "deepseek-r1"]
 
 @pytest.mark.asyncio
-async def test_basic_chat(chat_model):
-    """测试基本的对话功能"""
-    messages = [HumanMessage(content="Hello! What's 1+1?")]
-    response = await chat_model.agenerate([messages])
-    assert response.generations[0][0].text is not None
-
-@pytest.mark.asyncio
-async def test_chat_with_system_message(chat_model):
-    """测试带有系统消息的对话"""
-    messages = [
+async def test_batch_chat(chat_model):
+    """一次提交基本对话、带系统消息的对话和带历史记录的对话
+    
+    agenerate 会并发处理多组消息，三个请求只需等待一次往返。
+    """
+    basic = [HumanMessage(content="Hello! What's 1+1?")]
+    with_system = [
         SystemMessage(content="You are a helpful AI assistant."),
         HumanMessage(content="What's your purpose?")
     ]
-    response = await chat_model.agenerate([messages])
-    assert response.generations[0][0].text is not None
-
-@pytest.mark.asyncio
-async def test_chat_with_history(chat_model):
-    """测试带有历史记录的对话"""
-    messages = [
+    with_history = [
         HumanMessage(content="Hi, my name is Alice."),
         AIMessage(content="Hello Alice! Nice to meet you."),
         HumanMessage(content="What's my name?")
     ]
-    response = await chat_model.agenerate([messages])
-    assert "Alice" in response.generations[0][0].text
+    response = await chat_model.agenerate([basic, with_system, with_history])
+    basic_result, system_result, history_result = response.generations
+    assert basic_result[0].text is not None
+    assert system_result[0].text is not None
+    assert "Alice" in history_result[0].text